@@ -0,0 +1,314 @@
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from app.core.config_provider import get_logging_config
+
+T = TypeVar("T")
+
+# Default buckets (seconds) for stage and read durations.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        ...
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, value: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}" for key, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, value: float = 1, **labels: str):
+        self.inc(-value, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in values:
+            bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, state):
+                le = 'le="' + bound + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {count}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {state[-2]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {state[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide metrics rendered in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))
+
+    def histogram(
+        self, name: str, documentation: str, label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "repo_parser_stage_seconds", "Duration of ingest pipeline stages.", ("stage",)
+)
+STAGE_BYTES = registry.counter(
+    "repo_parser_stage_bytes_total", "Bytes processed by ingest pipeline stages.", ("stage",)
+)
+STAGE_FILES = registry.counter(
+    "repo_parser_stage_files_total", "Files processed by ingest pipeline stages.", ("stage",)
+)
+NEO4J_STATEMENTS = registry.counter(
+    "repo_parser_neo4j_statements_total", "Neo4j statements issued, by query.", ("query",)
+)
+NEO4J_ROWS = registry.counter(
+    "repo_parser_neo4j_rows_total", "Rows sent to Neo4j through UNWIND statements, by query.", ("query",)
+)
+NEO4J_SECONDS = registry.histogram(
+    "repo_parser_neo4j_statement_seconds", "Duration of Neo4j statements, by query.", ("query",)
+)
+INGEST_JOBS = registry.counter(
+    "repo_parser_ingest_jobs_total", "Finished ingest jobs, by status.", ("status",)
+)
+INGEST_JOBS_RUNNING = registry.gauge(
+    "repo_parser_ingest_jobs_running", "Ingest jobs currently running."
+)
+FILE_READS = registry.counter(
+    "repo_parser_file_reads_total", "Local repository file reads, by result.", ("result",)
+)
+FILE_READ_BYTES = registry.counter(
+    "repo_parser_file_read_bytes_total", "Characters returned by local repository file reads."
+)
+FILE_READ_SECONDS = registry.histogram(
+    "repo_parser_file_read_seconds", "Duration of local repository file reads."
+)
+INGEST_FILES = registry.counter(
+    "repo_parser_ingest_files_total", "Files produced by the native ingest stream, by classification.", ("kind",)
+)
+
+
+class JobStats:
+    """
+    Per-job counters ("<stage>.seconds", "<stage>.bytes", "neo4j.statements", ...)
+    collected alongside the process-wide metrics while the job is bound.
+    """
+
+    def __init__(self):
+        self._values: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str, value: float):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def to_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {key: round(value, 4) if isinstance(value, float) else value
+                    for key, value in sorted(self._values.items())}
+
+
+_current_job: ContextVar[Optional[JobStats]] = ContextVar("current_job_stats", default=None)
+
+
+@contextmanager
+def bind_job_stats(stats: JobStats):
+    """
+    Attributes everything recorded in this context to `stats`. Context variables do
+    not propagate into pool threads or processes, so work done there only counts
+    towards the process-wide metrics.
+    """
+    token = _current_job.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_job.reset(token)
+
+
+def _add_to_job(key: str, value: float):
+    stats = _current_job.get()
+    if stats is not None:
+        stats.add(key, value)
+
+
+def record_stage(stage: str, seconds: Optional[float] = None, files: int = 0, size: int = 0):
+    """
+    Records a stage's duration and/or the files and bytes it processed.
+    """
+    if seconds is not None:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+        _add_to_job(f"{stage}.seconds", seconds)
+    if files:
+        STAGE_FILES.inc(files, stage=stage)
+        _add_to_job(f"{stage}.files", files)
+    if size:
+        STAGE_BYTES.inc(size, stage=stage)
+        _add_to_job(f"{stage}.bytes", size)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """
+    Times the block as `stage`.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def timed_iter(items: Iterable[T], stage: str) -> Iterator[T]:
+    """
+    Passes items through, timing only the work of producing them (not the consumer's),
+    and records the total as `stage` once the iterable is exhausted or closed.
+    """
+    iterator = iter(items)
+    elapsed = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - started
+                return
+            elapsed += time.perf_counter() - started
+            yield item
+    finally:
+        record_stage(stage, elapsed)
+
+
+def record_statement(query_name: str, rows: int, seconds: float):
+    NEO4J_STATEMENTS.inc(query=query_name)
+    NEO4J_SECONDS.observe(seconds, query=query_name)
+    _add_to_job("neo4j.statements", 1)
+    _add_to_job("neo4j.seconds", seconds)
+    if rows:
+        NEO4J_ROWS.inc(rows, query=query_name)
+        _add_to_job("neo4j.rows", rows)
+
+
+class LogSampler:
+    """
+    Decides which of a stream of repetitive events to log: the first `first` events
+    of each key, then every `every`-th one, so per-file and per-batch messages
+    stay readable (and cheap) on repositories with hundreds of thousands of files.
+    """
+
+    def __init__(self, every: Optional[int] = None, first: int = 5):
+        self.every = max(1, every or get_logging_config()["sample_every"])
+        self.first = first
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def should_log(self, key: str = "") -> bool:
+        with self._lock:
+            count = self._counts[key] = self._counts.get(key, 0) + 1
+        return count <= self.first or count % self.every == 0
+
+    def log(self, logger: logging.Logger, level: int, key: str, message: str):
+        if logger.isEnabledFor(level) and self.should_log(key):
+            logger.log(level, message)
@@ -1,7 +1,51 @@
+import logging
+import threading
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.routes import router as api_router
 from fastapi.middleware.cors import CORSMiddleware
-app = FastAPI(title="GitHub Repo Parser to Neo4j")
+from app.db.session import dispose_engine, warm_up_engine
+from app.services.neo4j_service import close_driver, get_driver
+from app.services.ingest_jobs import shutdown_ingest_job_manager
+from app.modules.code_provider.git_repo.git_cat_file import close_all_readers
+from app.core.config_provider import get_logging_config, get_startup_config
+from app.core.metrics import registry
+
+logging.basicConfig(
+    level=get_logging_config()["level"],
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+def warm_up():
+    # Creates the Neo4j driver, which bootstraps the schema so that the
+    # (repo, full_path) lookups are index seeks from the first ingest on, and
+    # opens a database connection. Runs off the startup path: an unreachable
+    # database is only logged and must not delay or break startup.
+    try:
+        get_driver().verify_connectivity()
+    except Exception as e:
+        logger.error(f"Neo4j warmup failed: {e}")
+    try:
+        warm_up_engine()
+    except Exception as e:
+        logger.error(f"Database warmup failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Drivers, engines and worker pools are all created on first use, so startup
+    # does no I/O beyond optionally scheduling the warmup.
+    if get_startup_config()["warmup"]:
+        threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+    yield
+    # Running ingests finish; queued ones are cancelled and reported as failed.
+    shutdown_ingest_job_manager(wait=True)
+    close_all_readers()
+    close_driver()
+    dispose_engine()
+
+app = FastAPI(title="GitHub Repo Parser to Neo4j", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -12,6 +56,14 @@ app.add_middleware(
 
 app.include_router(api_router, prefix="/api")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Ingest stage durations, byte and file counts, Neo4j statement counts and file
+    read metrics in the Prometheus text format.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,8 +1,11 @@
 import os
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Optional, Tuple
 
 # Import your local repository service
 from app.modules.code_provider.local_repo.local_repo_service import LocalRepoService
+from app.modules.code_provider.file_content import FileContentResult
+from app.modules.code_provider.git_repo.git_object_service import GitObjectRepoService
+from app.modules.code_provider.tree_node import TreeNode
 # Optionally, you might have a GitHub-based service for production use:
 # from app.modules.code_provider.github.github_service import GithubService
 
@@ -12,6 +15,9 @@ class CodeProviderService:
         self.service_instance = self._get_service_instance()
 
     def _get_service_instance(self):
+        # CODE_PROVIDER=git serves any branch or commit straight from the git object store.
+        if os.getenv("CODE_PROVIDER", "local") == "git":
+            return GitObjectRepoService(self.db)
         # Use LocalRepoService if in development mode; otherwise, use the GitHub-based service.
         if os.getenv("isDevelopmentMode", "enabled") == "enabled":
             return LocalRepoService(self.db)
@@ -20,11 +26,35 @@ class CodeProviderService:
             # return GithubService(self.db)
             return LocalRepoService(self.db)
 
-    async def get_project_structure_async(self, project_id: str, path: Optional[str] = None) -> str:
-        return await self.service_instance.get_project_structure_async(project_id, path)
+    async def get_project_tree_async(
+        self, project_id: str, path: Optional[str] = None, max_depth: Optional[int] = None
+    ) -> TreeNode:
+        return await self.service_instance.get_project_tree_async(project_id, path, max_depth=max_depth)
+
+    async def get_project_structure_async(
+        self, project_id: str, path: Optional[str] = None, max_depth: Optional[int] = None
+    ) -> str:
+        return await self.service_instance.get_project_structure_async(project_id, path, max_depth=max_depth)
+
+    async def list_children_async(
+        self, project_id: str, path: Optional[str] = None, cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        return await self.service_instance.list_children_async(project_id, path, cursor=cursor, limit=limit)
+
+    async def iter_project_tree_async(
+        self, project_id: str, path: Optional[str] = None, max_depth: Optional[int] = None
+    ) -> Iterator[Tuple[TreeNode, int]]:
+        return await self.service_instance.iter_project_tree_async(project_id, path, max_depth=max_depth)
 
     def get_file_content(
         self, repo_name: str, file_path: str, start_line: int, end_line: int,
         branch_name: str, project_id: str
     ) -> str:
         return self.service_instance.get_file_content(repo_name, file_path, start_line, end_line, branch_name, project_id)
+
+    def iter_file_contents(
+        self, file_paths: Iterable[str], project_id: str,
+        start_line: int = 0, end_line: int = 0, max_workers: Optional[int] = None
+    ) -> AsyncIterator[FileContentResult]:
+        return self.service_instance.iter_file_contents(file_paths, project_id, start_line, end_line, max_workers)
@@ -0,0 +1,19 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class FileContentResult:
+    """
+    Outcome of reading one file in a batch. Exactly one of `content` and `error`
+    is set; `status_code` carries the HTTP status a single-file read would have
+    failed with (404 for missing files, 500 for read errors).
+    """
+    path: str
+    content: Optional[str] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
@@ -0,0 +1,165 @@
+import logging
+import subprocess
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Specs written per round trip in read_many. All of them must fit in the pipe
+# buffer (64 KiB on Linux) so writing never blocks while git waits for us to read.
+PIPELINE_CHUNK = 64
+
+
+class GitObject(NamedTuple):
+    sha: str
+    type: str
+    data: bytes
+
+
+class TreeEntry(NamedTuple):
+    mode: str
+    name: str
+    sha: str
+
+    @property
+    def is_tree(self) -> bool:
+        return self.mode == "40000"
+
+    @property
+    def is_submodule(self) -> bool:
+        return self.mode == "160000"
+
+
+def parse_tree(data: bytes, sha_length: int = 20) -> List[TreeEntry]:
+    """
+    Parses the raw content of a git tree object ("<mode> <name>\\0<binary sha>" entries).
+    sha_length is 20 for SHA-1 repositories and 32 for SHA-256 ones.
+    """
+    entries = []
+    position = 0
+    length = len(data)
+    while position < length:
+        space = data.index(b" ", position)
+        nul = data.index(b"\0", space)
+        mode = data[position:space].decode("ascii")
+        name = data[space + 1:nul].decode("utf-8", errors="surrogateescape")
+        sha = data[nul + 1:nul + 1 + sha_length].hex()
+        entries.append(TreeEntry(mode, name, sha))
+        position = nul + 1 + sha_length
+    return entries
+
+
+class GitCatFileBatch:
+    """
+    A long-lived `git cat-file --batch` process for one repository.
+
+    Objects are requested by any revision spec git understands ("main:src/app.py",
+    "<sha>^{tree}", ...). One process serves all reads of the repository, so no
+    process is spawned per file; requests from several threads are serialized on
+    a lock, and read_many pipelines up to PIPELINE_CHUNK requests per round trip.
+    The process is restarted transparently if it dies.
+    """
+
+    def __init__(self, repo_path: str, git_binary: str = "git"):
+        self.repo_path = repo_path
+        self.git_binary = git_binary
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def _ensure_process(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                [self.git_binary, "cat-file", "--batch"],
+                cwd=self.repo_path,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        return self._process
+
+    def _read_response(self, process: subprocess.Popen) -> Optional[GitObject]:
+        header = process.stdout.readline()
+        if not header:
+            raise RuntimeError(f"git cat-file exited unexpectedly in {self.repo_path}")
+        header = header.rstrip(b"\n")
+        # "<spec> missing" / "<spec> ambiguous"; the spec itself may contain spaces.
+        if header.endswith((b" missing", b" ambiguous")):
+            return None
+        parts = header.split(b" ")
+        if len(parts) != 3:
+            raise RuntimeError(f"Unexpected git cat-file response in {self.repo_path}: {header!r}")
+        sha, object_type, size = parts[0].decode(), parts[1].decode(), int(parts[2])
+        data = process.stdout.read(size)
+        process.stdout.read(1)  # Trailing newline.
+        return GitObject(sha, object_type, data)
+
+    def read_many(self, specs: Iterable[str]) -> List[Optional[GitObject]]:
+        """
+        Reads objects for all specs, in order; None for specs that do not resolve.
+        Raises ValueError for specs containing a newline, which would desynchronize
+        the request and response streams.
+        """
+        specs = list(specs)
+        for spec in specs:
+            if "\n" in spec or "\r" in spec:
+                raise ValueError(f"Invalid object spec: {spec!r}")
+        results: List[Optional[GitObject]] = []
+        with self._lock:
+            process = self._ensure_process()
+            try:
+                for start in range(0, len(specs), PIPELINE_CHUNK):
+                    chunk = specs[start:start + PIPELINE_CHUNK]
+                    process.stdin.write("".join(f"{spec}\n" for spec in chunk).encode("utf-8"))
+                    process.stdin.flush()
+                    results.extend(self._read_response(process) for _ in chunk)
+            except BaseException:
+                # Unread responses may be left in the pipe, so the stream is out of
+                # sync whatever failed; start a fresh process next time.
+                self._terminate(kill=True)
+                raise
+        return results
+
+    def read(self, spec: str) -> Optional[GitObject]:
+        return self.read_many([spec])[0]
+
+    def _terminate(self, kill: bool = False):
+        if self._process is not None:
+            if kill:
+                # git may be blocked writing responses nobody will read.
+                self._process.kill()
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+            self._process = None
+
+    def close(self):
+        with self._lock:
+            self._terminate()
+
+
+_readers: Dict[str, GitCatFileBatch] = {}
+_readers_lock = threading.Lock()
+
+
+def get_cat_file_reader(repo_path: str) -> GitCatFileBatch:
+    """
+    Returns the shared cat-file process of a repository, starting it on first use.
+    """
+    with _readers_lock:
+        reader = _readers.get(repo_path)
+        if reader is None:
+            reader = _readers[repo_path] = GitCatFileBatch(repo_path)
+        return reader
+
+
+def close_all_readers():
+    with _readers_lock:
+        readers = list(_readers.values())
+        _readers.clear()
+    for reader in readers:
+        reader.close()
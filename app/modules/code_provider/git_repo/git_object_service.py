@@ -0,0 +1,240 @@
+import asyncio
+import logging
+import os
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.config_provider import get_structure_config
+from app.modules.code_provider.file_content import FileContentResult
+from app.modules.code_provider.git_repo.git_cat_file import GitObject, get_cat_file_reader, parse_tree
+from app.modules.code_provider.tree_node import DIRECTORY, FILE, TreeNode, page_children, render_tree
+from app.modules.projects.projects_service import ProjectService
+
+logger = logging.getLogger(__name__)
+
+
+def slice_lines(content: str, start_line: int, end_line: int) -> str:
+    """
+    Applies the get_file_content line-range rules to already loaded content.
+    """
+    if not start_line or start_line == end_line:
+        return content
+    lines = content.splitlines(keepends=True)
+    start = max(start_line - 1, 0)
+    end = end_line if end_line <= len(lines) else len(lines)
+    return "".join(lines[start:end])
+
+
+class GitObjectRepoService:
+    """
+    Serves repository trees and file contents for any branch, tag or commit of a
+    local clone straight from the git object store, without checking anything out.
+
+    All reads of a repository go through its shared `git cat-file --batch` process;
+    tree listings are fetched level by level and file batches are pipelined, so
+    several branches of the same clone can be read concurrently.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.project_manager = ProjectService(db)
+        # Maximum tree depth returned by structure listings; None lists whole trees.
+        self.max_depth = get_structure_config()["max_depth"] or None
+
+    def _get_project(self, project_id: str) -> Tuple[str, str]:
+        """
+        Returns (repo_path, default ref) of a project.
+        """
+        project = self.project_manager.get_project_from_db_by_id_sync(project_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="Project not found")
+        repo_path = project.get("repo_path")
+        if not repo_path:
+            raise HTTPException(status_code=400, detail="Project has no associated local repository")
+        if not os.path.exists(repo_path):
+            raise HTTPException(status_code=404, detail=f"Local repository at {repo_path} not found")
+        return repo_path, project.get("branch_name") or "HEAD"
+
+    def _read_root(self, repo_path: str, ref: str, path: Optional[str]) -> Tuple[TreeNode, GitObject]:
+        path = (path or "").strip("/")
+        root_spec = f"{ref}:{path}" if path else f"{ref}^{{tree}}"
+        root_object = get_cat_file_reader(repo_path).read(root_spec)
+        if root_object is None or root_object.type != "tree":
+            raise HTTPException(status_code=404, detail=f"Path '{path or '/'}' not found at {ref}")
+        root = TreeNode(name=os.path.basename(path) or os.path.basename(repo_path.rstrip("/")), type=DIRECTORY, path=path)
+        return root, root_object
+
+    def _build_tree(self, repo_path: str, ref: str, path: Optional[str], max_depth: Optional[int]) -> TreeNode:
+        reader = get_cat_file_reader(repo_path)
+        root, root_object = self._read_root(repo_path, ref, path)
+        sha_length = len(root_object.sha) // 2
+        level: List[Tuple[TreeNode, bytes]] = [(root, root_object.data)]
+        depth = 0
+        while level:
+            next_level: List[Tuple[TreeNode, str]] = []
+            for node, data in level:
+                for entry in parse_tree(data, sha_length):
+                    if entry.is_submodule:
+                        continue
+                    child_path = f"{node.path}/{entry.name}" if node.path else entry.name
+                    if entry.is_tree:
+                        child = TreeNode(name=entry.name, type=DIRECTORY, path=child_path)
+                        if max_depth is not None and depth + 1 >= max_depth:
+                            child.truncated = True
+                        else:
+                            next_level.append((child, entry.sha))
+                    else:
+                        child = TreeNode(name=entry.name, type=FILE, path=child_path)
+                    node.children.append(child)
+            # One pipelined round trip per tree level.
+            objects = reader.read_many(sha for _, sha in next_level)
+            level = []
+            for (node, _), git_object in zip(next_level, objects):
+                if git_object is None:
+                    node.error = "tree object missing"
+                    continue
+                level.append((node, git_object.data))
+            depth += 1
+        return root
+
+    def _iter_tree(
+        self, repo_path: str, root: TreeNode, root_object: GitObject, max_depth: Optional[int]
+    ) -> Iterator[Tuple[TreeNode, int]]:
+        """
+        Yields (node, depth) in pre-order with children sorted by name, reading one
+        tree object per directory as the consumer advances.
+        """
+        reader = get_cat_file_reader(repo_path)
+        sha_length = len(root_object.sha) // 2
+        stack: List[Tuple[TreeNode, Optional[str], int]] = [(root, None, 0)]
+        while stack:
+            node, sha, depth = stack.pop()
+            if not node.is_directory:
+                yield node, depth
+                continue
+            if max_depth is not None and depth >= max_depth:
+                node.truncated = True
+                yield node, depth
+                continue
+            git_object = root_object if sha is None else reader.read(sha)
+            if git_object is None:
+                node.error = "tree object missing"
+                yield node, depth
+                continue
+            yield node, depth
+            children = []
+            for entry in parse_tree(git_object.data, sha_length):
+                if entry.is_submodule:
+                    continue
+                child_path = f"{node.path}/{entry.name}" if node.path else entry.name
+                child = TreeNode(name=entry.name, type=DIRECTORY if entry.is_tree else FILE, path=child_path)
+                children.append((child, entry.sha, depth + 1))
+            children.sort(key=lambda item: item[0].name, reverse=True)
+            stack.extend(children)
+
+    async def get_project_tree_async(
+        self, project_id: str, path: Optional[str] = None, ref: Optional[str] = None,
+        max_depth: Optional[int] = None
+    ) -> TreeNode:
+        """
+        Returns the tree of `ref` (default: the project's branch) from the object store.
+        """
+        loop = asyncio.get_running_loop()
+        repo_path, default_ref = await loop.run_in_executor(None, self._get_project, project_id)
+        return await loop.run_in_executor(
+            None, self._build_tree, repo_path, ref or default_ref, path, max_depth or self.max_depth
+        )
+
+    async def get_project_structure_async(
+        self, project_id: str, path: Optional[str] = None, ref: Optional[str] = None,
+        max_depth: Optional[int] = None
+    ) -> str:
+        return render_tree(await self.get_project_tree_async(project_id, path, ref, max_depth))
+
+    async def list_children_async(
+        self, project_id: str, path: Optional[str] = None, cursor: Optional[str] = None,
+        limit: Optional[int] = None, ref: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Returns one page of the direct children of `path` at `ref`; only that tree object is read.
+        """
+        directory = await self.get_project_tree_async(project_id, path, ref, max_depth=1)
+        return page_children(directory, cursor, limit or get_structure_config()["page_size"])
+
+    async def iter_project_tree_async(
+        self, project_id: str, path: Optional[str] = None, max_depth: Optional[int] = None,
+        ref: Optional[str] = None
+    ) -> Iterator[Tuple[TreeNode, int]]:
+        """
+        Resolves the project and root tree, then returns a lazy (node, depth) walk of it.
+        """
+        loop = asyncio.get_running_loop()
+        repo_path, default_ref = await loop.run_in_executor(None, self._get_project, project_id)
+        root, root_object = await loop.run_in_executor(None, self._read_root, repo_path, ref or default_ref, path)
+        return self._iter_tree(repo_path, root, root_object, max_depth or self.max_depth)
+
+    def get_file_content(
+        self, repo_name: str, file_path: str, start_line: int, end_line: int,
+        branch_name: str, project_id: str
+    ) -> str:
+        """
+        Reads the file as it is on branch_name (a branch, tag or commit; the project's
+        branch when empty) without touching the working tree.
+        """
+        logger.info(f"Accessing file: {file_path}@{branch_name} for project ID: {project_id}")
+        repo_path, default_ref = self._get_project(project_id)
+        result = self._read_files(repo_path, branch_name or default_ref, [file_path], start_line, end_line)[0]
+        if not result.ok:
+            raise HTTPException(status_code=result.status_code, detail=result.error)
+        return result.content
+
+    def _read_files(
+        self, repo_path: str, ref: str, file_paths: List[str], start_line: int, end_line: int
+    ) -> List[FileContentResult]:
+        objects = get_cat_file_reader(repo_path).read_many(f"{ref}:{p.lstrip('/')}" for p in file_paths)
+        results = []
+        for file_path, git_object in zip(file_paths, objects):
+            if git_object is None or git_object.type != "blob":
+                results.append(FileContentResult(
+                    path=file_path, error=f"File {file_path} not found at {ref}", status_code=404
+                ))
+                continue
+            try:
+                content = git_object.data.decode("utf-8")
+            except UnicodeDecodeError as e:
+                results.append(FileContentResult(
+                    path=file_path, error=f"Error processing file content: {e}", status_code=500
+                ))
+                continue
+            results.append(FileContentResult(path=file_path, content=slice_lines(content, start_line, end_line)))
+        return results
+
+    async def iter_file_contents(
+        self, file_paths: Iterable[str], project_id: str,
+        start_line: int = 0, end_line: int = 0, max_workers: Optional[int] = None,
+        ref: Optional[str] = None, chunk_size: int = 256
+    ) -> AsyncIterator[FileContentResult]:
+        """
+        Reads files of `ref` (default: the project's branch) in pipelined chunks over the
+        repository's cat-file process and yields a FileContentResult per file.
+        max_workers is accepted for interface compatibility; reads of one repository
+        share a single process.
+        """
+        loop = asyncio.get_running_loop()
+        repo_path, default_ref = await loop.run_in_executor(None, self._get_project, project_id)
+        ref = ref or default_ref
+        chunk: List[str] = []
+        for file_path in file_paths:
+            chunk.append(file_path)
+            if len(chunk) >= chunk_size:
+                for result in await loop.run_in_executor(
+                    None, self._read_files, repo_path, ref, chunk, start_line, end_line
+                ):
+                    yield result
+                chunk = []
+        if chunk:
+            for result in await loop.run_in_executor(
+                None, self._read_files, repo_path, ref, chunk, start_line, end_line
+            ):
+                yield result
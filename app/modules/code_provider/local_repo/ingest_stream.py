@@ -0,0 +1,237 @@
+import codecs
+import fnmatch
+import hashlib
+import logging
+import os
+import stat
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Sequence
+
+from app.core.config_provider import get_file_read_config, get_ingest_config
+from app.core.metrics import INGEST_FILES, record_stage, timed_iter
+from app.modules.code_provider.local_repo.repo_walker import RepoWalker
+from app.modules.code_provider.tree_node import TreeNode, iter_sorted, render_ingest_tree
+
+logger = logging.getLogger(__name__)
+
+# FileRecord.kind
+TEXT = "text"
+BINARY = "binary"
+OVERSIZED = "oversized"
+EXCLUDED = "excluded"
+OVER_BUDGET = "over_budget"
+UNREADABLE = "unreadable"
+SYMLINK = "symlink"
+
+_READ_CHUNK = 64 * 1024
+
+
+@dataclass
+class FileRecord:
+    """
+    One file of a repository as produced by RepoIngestStream.
+
+    `path` is relative to the repository root. Only TEXT records carry `content`;
+    the others are listed with the reason their content was left out. `sha256` is
+    the digest of the raw bytes, computed while reading, for text and binary files;
+    oversized files are never opened and excluded files are read only up to the sniff.
+    Symlinks are never followed; their size is the length of the link target, as
+    in git.
+    """
+    path: str
+    kind: str
+    size: int
+    sha256: Optional[str] = None
+    content: Optional[str] = None
+    error: Optional[str] = None
+
+
+def is_binary(head: bytes) -> bool:
+    """
+    Sniffs the leading bytes of a file: NUL bytes or invalid UTF-8 mean binary. A
+    multi-byte sequence cut off at the end of `head` does not count as invalid.
+    """
+    if b"\0" in head:
+        return True
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return True
+    return False
+
+
+class RepoIngestStream:
+    """
+    In-process replacement for the gitingest dump of a local checkout.
+
+    walk() scans the tree with RepoWalker (gitignore and exclude globs applied), so
+    the summary and directory structure are available before any content is read.
+    iter_records() then reads the files in tree order and yields one FileRecord
+    each; only the files in the read-ahead window are held in memory at a time.
+
+    Each file is classified from its first sniff_bytes bytes as text or binary and
+    against the budgets: files above max_file_bytes are OVERSIZED and never opened,
+    files matching skip_content_globs (lockfiles, minified bundles) are EXCLUDED, and
+    once max_repo_bytes of text has been produced further text files are OVER_BUDGET.
+    Symlinks are listed as SYMLINK without reading their target, which may point
+    outside the checkout. Text is decoded incrementally as UTF-8 (invalid bytes replaced after the sniff)
+    while the raw bytes are hashed.
+    """
+
+    def __init__(
+        self,
+        repo_path: str,
+        max_file_bytes: Optional[int] = None,
+        max_repo_bytes: Optional[int] = None,
+        sniff_bytes: Optional[int] = None,
+        skip_content_globs: Optional[Sequence[str]] = None,
+        max_workers: Optional[int] = None,
+        walker: Optional[RepoWalker] = None,
+    ):
+        config = get_ingest_config()
+        self.repo_path = os.path.abspath(repo_path)
+        self.max_file_bytes = config["max_file_bytes"] if max_file_bytes is None else max_file_bytes
+        self.max_repo_bytes = config["max_repo_bytes"] if max_repo_bytes is None else max_repo_bytes
+        self.sniff_bytes = sniff_bytes or config["sniff_bytes"]
+        self.skip_content_globs = list(
+            config["skip_content_globs"] if skip_content_globs is None else skip_content_globs
+        )
+        self.max_workers = max_workers or get_file_read_config()["max_workers"]
+        self.walker = walker or RepoWalker()
+        self.tree: Optional[TreeNode] = None
+        self._counts: Dict[str, int] = {}
+        self._bytes: Dict[str, int] = {}
+        self._text_bytes = 0
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.repo_path.rstrip(os.sep)) or self.repo_path
+
+    def walk(self) -> TreeNode:
+        if self.tree is None:
+            self.tree = self.walker.build_tree(self.repo_path, None, self.repo_path)
+            self.tree.name = self.name
+            if self.walker.errors:
+                logger.warning(f"{len(self.walker.errors)} entries of {self.repo_path} could not be scanned")
+        return self.tree
+
+    @property
+    def file_count(self) -> int:
+        return sum(1 for node, _ in self.walk().iter_nodes() if not node.is_directory)
+
+    def summary(self) -> str:
+        """
+        The repo_info header; its first line names the repository as gitingest's does.
+        """
+        return f"Directory: {self.name}\nFiles analyzed: {self.file_count}"
+
+    def tree_text(self) -> str:
+        return render_ingest_tree(self.walk())
+
+    def _skips_content(self, path: str) -> bool:
+        name = path.rsplit("/", 1)[-1]
+        return any(
+            fnmatch.fnmatch(name, glob) or fnmatch.fnmatch(path, glob) for glob in self.skip_content_globs
+        )
+
+    def classify(self, path: str, size: int, stream: BinaryIO) -> FileRecord:
+        """
+        Classifies a file of `size` bytes whose content `stream` yields (an open file,
+        a git blob's data stream, ...) and reads it if it is text or binary. The stream
+        is not touched for oversized files. The repository budget is checked against
+        the text produced so far but not charged; iter_records charges it.
+        """
+        if self.max_file_bytes and size > self.max_file_bytes:
+            return FileRecord(path, OVERSIZED, size)
+        digest = hashlib.sha256()
+        head = stream.read(self.sniff_bytes)
+        digest.update(head)
+        if is_binary(head):
+            for chunk in iter(lambda: stream.read(_READ_CHUNK), b""):
+                digest.update(chunk)
+            return FileRecord(path, BINARY, size, sha256=digest.hexdigest())
+        if self._skips_content(path):
+            return FileRecord(path, EXCLUDED, size)
+        # The budget only shrinks, so a file over it now is still over it when charged.
+        if self.max_repo_bytes and self._text_bytes + size > self.max_repo_bytes:
+            return FileRecord(path, OVER_BUDGET, size)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        parts = [decoder.decode(head)]
+        size = len(head)
+        for chunk in iter(lambda: stream.read(_READ_CHUNK), b""):
+            digest.update(chunk)
+            parts.append(decoder.decode(chunk))
+            size += len(chunk)
+        parts.append(decoder.decode(b"", final=True))
+        return FileRecord(path, TEXT, size, sha256=digest.hexdigest(), content="".join(parts))
+
+    def _read(self, path: str) -> FileRecord:
+        """
+        Classifies and reads one file of the checkout. Runs on the read-ahead pool.
+        """
+        full_path = os.path.join(self.repo_path, path)
+        try:
+            info = os.lstat(full_path)
+            if stat.S_ISLNK(info.st_mode):
+                return FileRecord(path, SYMLINK, info.st_size)
+            if self.max_file_bytes and info.st_size > self.max_file_bytes:
+                return FileRecord(path, OVERSIZED, info.st_size)
+            # O_NOFOLLOW: the entry may have been replaced by a symlink since the lstat.
+            with os.fdopen(os.open(full_path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0)), "rb") as f:
+                return self.classify(path, info.st_size, f)
+        except OSError as e:
+            logger.warning(f"Cannot read {path}: {e}")
+            return FileRecord(path, UNREADABLE, 0, error=str(e))
+
+    def _charge(self, record: FileRecord) -> FileRecord:
+        """
+        Applies the repository budget in tree order, whatever order the reads finished in.
+        """
+        if record.kind == TEXT and self.max_repo_bytes:
+            if self._text_bytes + record.size > self.max_repo_bytes:
+                record = FileRecord(record.path, OVER_BUDGET, record.size, sha256=record.sha256)
+            else:
+                self._text_bytes += record.size
+        self._counts[record.kind] = self._counts.get(record.kind, 0) + 1
+        self._bytes[record.kind] = self._bytes.get(record.kind, 0) + record.size
+        INGEST_FILES.inc(kind=record.kind)
+        return record
+
+    def _iter_records(self) -> Iterator[FileRecord]:
+        paths = (node.path for node, _ in iter_sorted(self.walk()) if not node.is_directory)
+        window = self.max_workers * 2
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest-read") as executor:
+            pending = deque()
+            try:
+                for path in paths:
+                    pending.append(executor.submit(self._read, path))
+                    if len(pending) >= window:
+                        yield self._charge(pending.popleft().result())
+                while pending:
+                    yield self._charge(pending.popleft().result())
+            finally:
+                # A consumer that stops early should not wait for the whole window to be read.
+                for future in pending:
+                    future.cancel()
+
+    def iter_records(self) -> Iterator[FileRecord]:
+        """
+        Yields a FileRecord per file in the order of the directory structure (pre-order,
+        names sorted), reading up to 2 * max_workers files ahead on a thread pool.
+        """
+        for record in timed_iter(self._iter_records(), "read_files"):
+            if record.kind == TEXT:
+                record_stage("read_files", files=1, size=record.size)
+            yield record
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "files": dict(sorted(self._counts.items())),
+            "bytes": dict(sorted(self._bytes.items())),
+            "text_bytes": self._text_bytes,
+            "max_file_bytes": self.max_file_bytes,
+            "max_repo_bytes": self.max_repo_bytes,
+            "walk_errors": len(self.walker.errors),
+        }
@@ -0,0 +1,105 @@
+import mmap
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config_provider import get_line_index_config
+
+_NEWLINE = re.compile(b"\n")
+
+
+class LineIndex:
+    """
+    Byte offsets of the line starts of one file, valid for a given (mtime, size).
+
+    offsets[i] is where line i (0-based) starts and offsets[-1] is the file size,
+    so the file has len(offsets) - 1 lines, counted the way readlines() counts them.
+    """
+    __slots__ = ("path", "mtime_ns", "size", "offsets")
+
+    def __init__(self, path: str, mtime_ns: int, size: int, offsets: array):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.offsets = offsets
+
+    @property
+    def line_count(self) -> int:
+        return len(self.offsets) - 1
+
+    @classmethod
+    def build(cls, path: str, stat_result: os.stat_result) -> "LineIndex":
+        """
+        Scans the file through a memory map for newlines; the file is never decoded
+        or copied into Python memory as a whole.
+        """
+        offsets = array("Q", [0])
+        size = stat_result.st_size
+        if size:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                offsets.extend(match.end() for match in _NEWLINE.finditer(buffer))
+            if offsets[-1] != size:
+                # Last line without a trailing newline.
+                offsets.append(size)
+        return cls(path, stat_result.st_mtime_ns, size, offsets)
+
+
+class LineIndexCache:
+    """
+    LRU cache of LineIndex objects keyed by file path. Entries are validated against
+    the file's current mtime and size on every lookup and rebuilt when either changed.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or get_line_index_config()["max_entries"]
+        self._entries: "OrderedDict[str, LineIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str) -> LineIndex:
+        stat_result = os.stat(path)
+        with self._lock:
+            index = self._entries.get(path)
+            if index is not None and index.mtime_ns == stat_result.st_mtime_ns and index.size == stat_result.st_size:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return index
+        index = LineIndex.build(path, stat_result)
+        with self._lock:
+            self.misses += 1
+            self._entries[path] = index
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+    def read_range(self, path: str, start_line: int, end_line: int) -> str:
+        """
+        Returns lines start_line..end_line (1-based, inclusive, clamped to the file)
+        with the same slicing rules as a readlines()-based read, reading only the bytes
+        of the requested range.
+        """
+        index = self.get(path)
+        start = min(max(start_line - 1, 0), index.line_count)
+        end = min(end_line, index.line_count)
+        if end <= start:
+            return ""
+        start_offset = index.offsets[start]
+        end_offset = index.offsets[end]
+        with open(path, "rb") as f:
+            f.seek(start_offset)
+            data = f.read(end_offset - start_offset)
+        # Match text-mode reads, which translate Windows line endings.
+        return data.decode("utf-8").replace("\r\n", "\n")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by all LocalRepoService instances, which are created per request.
+line_index_cache = LineIndexCache()
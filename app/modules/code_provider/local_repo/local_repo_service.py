@@ -1,10 +1,20 @@
 import asyncio
 import logging
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Optional, Tuple
 
+from app.core.config_provider import get_file_read_config, get_structure_config
+from app.core.metrics import FILE_READ_BYTES, FILE_READ_SECONDS, FILE_READS
+from app.modules.code_provider.file_content import FileContentResult
+from app.modules.code_provider.local_repo.ingest_stream import RepoIngestStream
+from app.modules.code_provider.local_repo.line_index import line_index_cache
+from app.modules.code_provider.local_repo.repo_walker import RepoWalker
+from app.modules.code_provider.local_repo.structure_cache import structure_cache
+from app.modules.code_provider.tree_node import TreeNode, page_children, render_tree
 from app.modules.projects.projects_service import ProjectService
 
 logger = logging.getLogger(__name__)
@@ -13,7 +23,8 @@ class LocalRepoService:
     def __init__(self, db: Session):
         self.db = db
         self.project_manager = ProjectService(db)
-        self.max_depth = 4  # Maximum recursion depth for folder scanning
+        # Maximum recursion depth for folder scanning; None scans whole trees.
+        self.max_depth = get_structure_config()["max_depth"] or None
 
     def get_repo(self, repo_path: str) -> str:
         """
@@ -26,117 +37,216 @@ class LocalRepoService:
         return repo_path
 
     def _build_directory_tree(
-        self, current_path: str, current_depth: int, max_depth: int, base_dir: str
-    ) -> Dict[str, Any]:
+        self, current_path: str, current_depth: int, max_depth: Optional[int], base_dir: str
+    ) -> TreeNode:
         """
-        Recursively builds a tree representation of the directory.
+        Builds a tree representation of the directory with RepoWalker, which scans
+        directories in parallel and skips ignored, excluded and oversized entries.
         
         Args:
             current_path: Absolute path to the current folder.
-            current_depth: Current recursion depth.
-            max_depth: Maximum allowed depth.
+            current_depth: Depth of current_path below the scan root.
+            max_depth: Maximum allowed depth, or None for no limit.
             base_dir: The base repository directory (for computing relative paths).
         
         Returns:
-            A dictionary representing the directory (or file) structure.
-        """
-        if current_depth >= max_depth:
-            return {
-                "type": "directory",
-                "name": os.path.basename(current_path) or current_path,
-                "children": [{"type": "file", "name": "...", "path": "truncated"}],
-            }
-
-        tree = {
-            "type": "directory",
-            "name": os.path.basename(current_path) or current_path,
-            "children": []
-        }
-        try:
-            for item in os.listdir(current_path):
-                item_path = os.path.join(current_path, item)
-                relative_path = os.path.relpath(item_path, base_dir)
-                if os.path.isdir(item_path):
-                    subtree = self._build_directory_tree(item_path, current_depth + 1, max_depth, base_dir)
-                    tree["children"].append(subtree)
-                else:
-                    # Optionally, you could filter out certain file types here.
-                    tree["children"].append({
-                        "type": "file",
-                        "name": item,
-                        "path": relative_path
-                    })
-        except Exception as e:
-            logger.error(f"Error listing directory {current_path}: {e}")
-        return tree
+            The TreeNode of current_path, with paths relative to base_dir.
+        """
+        remaining = None if max_depth is None else max_depth - current_depth
+        return RepoWalker().build_tree(current_path, remaining, base_dir)
+
+    def get_ingest_stream(self, project_id: str) -> RepoIngestStream:
+        """
+        Returns a RepoIngestStream over a project's repository: its tree, summary and
+        classified file records, in the shape insert_repo_structure accepts.
+        """
+        return RepoIngestStream(self.get_repo(self._get_repo_path(project_id)))
 
-    def _format_tree_structure(self, tree: Dict[str, Any], indent: int = 0) -> str:
+    def _format_tree_structure(self, tree: TreeNode, indent: int = 0) -> str:
         """
         Formats the directory tree as a string with indentation.
         """
-        lines = []
-        prefix = "  " * indent
-        if tree["type"] == "directory":
-            lines.append(f"{prefix}{tree['name']}/")
-        else:
-            lines.append(f"{prefix}{tree['name']}")
-        for child in sorted(tree.get("children", []), key=lambda x: x["name"]):
-            lines.append(self._format_tree_structure(child, indent + 1))
-        return "\n".join(lines)
+        return render_tree(tree, indent)
 
-    async def get_project_structure_async(self, project_id: str, path: Optional[str] = None) -> str:
+    async def get_project_tree_async(
+        self, project_id: str, path: Optional[str] = None, max_depth: Optional[int] = None
+    ) -> TreeNode:
         """
-        Asynchronously retrieves and parses the project structure.
+        Asynchronously retrieves the project structure as typed TreeNodes, down to
+        max_depth levels (default: STRUCTURE_MAX_DEPTH, unlimited unless configured).
+        Trees are served from the shared structure cache while the scanned directories
+        are unchanged; the returned tree must not be modified.
         
         It uses the project manager to get the project details (which include the local repository path),
-        then scans the repository (or subdirectory) and returns a formatted string.
+        then scans the repository (or subdirectory) off the event loop.
         """
         # If your ProjectService does not provide an async version, run the synchronous call in an executor.
         loop = asyncio.get_running_loop()
-        project = await loop.run_in_executor(None, self.project_manager.get_project_from_db_by_id_sync, project_id)
-        if not project:
-            raise HTTPException(status_code=404, detail="Project not found")
-
-        repo_path = project.get("repo_path")
-        if not repo_path:
-            raise HTTPException(status_code=400, detail="Project has no associated local repository")
+        repo_path, start_path = await loop.run_in_executor(None, self._resolve_start_path, project_id, path)
+        return await loop.run_in_executor(
+            None, self._get_cached_tree, project_id, path, start_path, repo_path, max_depth or self.max_depth
+        )
 
+    def _resolve_start_path(self, project_id: str, path: Optional[str]) -> Tuple[str, str]:
+        """
+        Returns (repo_path, absolute path of the requested directory) of a project.
+        """
+        repo_path = self._get_repo_path(project_id)
         # Verify the repository exists
         self.get_repo(repo_path)
-
-        # Determine the starting directory
         start_path = os.path.join(repo_path, path) if path else repo_path
-        tree = self._build_directory_tree(start_path, current_depth=0, max_depth=self.max_depth, base_dir=repo_path)
-        formatted = self._format_tree_structure(tree)
-        return formatted
+        if not os.path.isdir(start_path):
+            raise HTTPException(status_code=404, detail=f"Directory {path} not found in repository")
+        return repo_path, start_path
 
-    def get_file_content(
-        self, repo_name: str, file_path: str, start_line: int, end_line: int,
-        branch_name: str, project_id: str
+    def _get_cached_tree(
+        self, project_id: str, path: Optional[str], start_path: str, repo_path: str, max_depth: Optional[int]
+    ) -> TreeNode:
+        """
+        Returns the tree from the structure cache when it is still valid, otherwise scans and caches it.
+        """
+        key = (project_id, path or "", max_depth)
+        tree = structure_cache.get(key, repo_path)
+        if tree is None:
+            tree = self._build_directory_tree(start_path, 0, max_depth, repo_path)
+            structure_cache.put(key, repo_path, tree)
+        return tree
+
+    async def list_children_async(
+        self, project_id: str, path: Optional[str] = None, cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Returns one page of the direct children of `path` (see tree_node.page_children).
+        Only that directory is scanned, and the listing is cached like full trees.
+        """
+        loop = asyncio.get_running_loop()
+        repo_path, start_path = await loop.run_in_executor(None, self._resolve_start_path, project_id, path)
+        directory = await loop.run_in_executor(None, self._get_cached_tree, project_id, path, start_path, repo_path, 1)
+        return page_children(directory, cursor, limit or get_structure_config()["page_size"])
+
+    async def iter_project_tree_async(
+        self, project_id: str, path: Optional[str] = None, max_depth: Optional[int] = None
+    ) -> Iterator[Tuple[TreeNode, int]]:
+        """
+        Resolves the project and returns a lazy (node, depth) walk of its tree (see
+        RepoWalker.iter_tree). Project errors are raised here; the walk itself scans
+        directories only as it is consumed, so it can feed a streaming response.
+        """
+        loop = asyncio.get_running_loop()
+        repo_path, start_path = await loop.run_in_executor(None, self._resolve_start_path, project_id, path)
+        return RepoWalker().iter_tree(start_path, repo_path, max_depth or self.max_depth)
+
+    async def get_project_structure_async(
+        self, project_id: str, path: Optional[str] = None, max_depth: Optional[int] = None
     ) -> str:
         """
-        Reads the file content from a local repository.
-        (Note: Branch checkout is not implemented here for simplicity.)
+        Returns the project structure rendered as an indented string. Callers that
+        process the tree should use get_project_tree_async instead of parsing this text.
+        """
+        tree = await self.get_project_tree_async(project_id, path, max_depth)
+        return self._format_tree_structure(tree)
+
+    def _get_repo_path(self, project_id: str) -> str:
+        """
+        Resolves the local repository path of a project.
         """
-        logger.info(f"Accessing file: {file_path} for project ID: {project_id}")
         project = self.project_manager.get_project_from_db_by_id_sync(project_id)
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
         repo_path = project.get("repo_path")
         if not repo_path:
             raise HTTPException(status_code=400, detail="Project has no associated local repository")
+        return repo_path
+
+    def _read_file_content(self, repo_path: str, file_path: str, start_line: int, end_line: int) -> str:
+        """
+        Reads a file (or a 1-based, inclusive line range of it) from a resolved repository path.
+        Every read is counted in the file read metrics by result, duration and size.
+        """
         file_full_path = os.path.join(repo_path, file_path)
-        if not os.path.exists(file_full_path):
-            raise HTTPException(status_code=404, detail=f"File {file_path} not found in repository")
+        started = time.perf_counter()
         try:
-            with open(file_full_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-                # If start_line and end_line are not provided (or equal), return full file.
-                if not start_line or start_line == end_line:
-                    return "".join(lines)
-                start = max(start_line - 1, 0)
-                end = end_line if end_line <= len(lines) else len(lines)
-                return "".join(lines[start:end])
+            # If start_line and end_line are not provided (or equal), return full file.
+            if not start_line or start_line == end_line:
+                with open(file_full_path, "r", encoding="utf-8") as f:
+                    content = f.read()
+            else:
+                # Ranges are served from the cached line-offset index, so only the
+                # requested bytes are read.
+                content = line_index_cache.read_range(file_full_path, start_line, end_line)
+        except (FileNotFoundError, IsADirectoryError):
+            FILE_READS.inc(result="not_found")
+            raise HTTPException(status_code=404, detail=f"File {file_path} not found in repository")
         except Exception as e:
+            FILE_READS.inc(result="error")
             logger.error(f"Error reading file {file_path}: {e}", exc_info=True)
             raise HTTPException(status_code=500, detail=f"Error processing file content: {str(e)}")
+        FILE_READ_SECONDS.observe(time.perf_counter() - started)
+        FILE_READS.inc(result="ok")
+        FILE_READ_BYTES.inc(len(content))
+        return content
+
+    def get_file_content(
+        self, repo_name: str, file_path: str, start_line: int, end_line: int,
+        branch_name: str, project_id: str
+    ) -> str:
+        """
+        Reads the file content from a local repository.
+        (Note: Branch checkout is not implemented here for simplicity.)
+        """
+        logger.debug(f"Accessing file: {file_path} for project ID: {project_id}")
+        repo_path = self._get_repo_path(project_id)
+        return self._read_file_content(repo_path, file_path, start_line, end_line)
+
+    def _read_file_result(self, repo_path: str, file_path: str, start_line: int, end_line: int) -> FileContentResult:
+        try:
+            content = self._read_file_content(repo_path, file_path, start_line, end_line)
+            return FileContentResult(path=file_path, content=content)
+        except HTTPException as e:
+            return FileContentResult(path=file_path, error=e.detail, status_code=e.status_code)
+
+    async def iter_file_contents(
+        self, file_paths: Iterable[str], project_id: str,
+        start_line: int = 0, end_line: int = 0, max_workers: Optional[int] = None
+    ) -> AsyncIterator[FileContentResult]:
+        """
+        Reads many files of one project concurrently and yields a FileContentResult
+        per file, in completion order.
+
+        The project is resolved once for the whole batch. Reads run on a thread pool
+        of max_workers threads (FILE_READ_WORKERS by default) and at most twice that
+        many reads are in flight, so arbitrarily long path iterables stay bounded.
+        A failing file produces a result with `error` set instead of aborting the batch.
+        """
+        loop = asyncio.get_running_loop()
+        repo_path = await loop.run_in_executor(None, self._get_repo_path, project_id)
+        workers = max_workers or get_file_read_config()["max_workers"]
+        paths = iter(file_paths)
+        executor = ThreadPoolExecutor(max_workers=workers)
+        in_flight = set()
+
+        def submit_next() -> bool:
+            file_path = next(paths, None)
+            if file_path is None:
+                return False
+            in_flight.add(loop.run_in_executor(
+                executor, self._read_file_result, repo_path, file_path, start_line, end_line
+            ))
+            return True
+
+        try:
+            while len(in_flight) < workers * 2 and submit_next():
+                pass
+            while in_flight:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    in_flight.discard(future)
+                    submit_next()
+                    yield future.result()
+        finally:
+            # Never wait here: this runs on the event loop thread, and a consumer
+            # that stops early would otherwise block it on the reads still running.
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
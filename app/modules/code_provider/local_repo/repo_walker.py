@@ -0,0 +1,298 @@
+import fnmatch
+import logging
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Pattern, Sequence, Tuple
+
+from app.core.config_provider import get_repo_walker_config
+from app.modules.code_provider.tree_node import DIRECTORY, FILE, TreeNode
+
+logger = logging.getLogger(__name__)
+
+# (compiled pattern, negated, directory only, directory of the .gitignore relative to the repo root)
+IgnoreRule = Tuple[Pattern, bool, bool, str]
+
+
+def _translate_gitignore_pattern(pattern: str) -> Pattern:
+    """
+    Translates a gitignore glob into a regex matched against paths relative to the
+    directory holding the .gitignore. Patterns without a slash (other than a trailing
+    one) match at any depth; "**" spans directories, "*" and "?" do not.
+    """
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                regex += "[" + pattern[i + 1:end].replace("!", "^", 1) + "]"
+                i = end
+        else:
+            regex += re.escape(char)
+        i += 1
+    prefix = "" if anchored else "(?:.*/)?"
+    return re.compile(f"^{prefix}{regex}$")
+
+
+def parse_gitignore(content: str, base: str) -> List[IgnoreRule]:
+    """
+    Parses the content of a .gitignore located at `base` (relative to the repo root).
+    """
+    rules = []
+    for raw_line in content.splitlines():
+        line = raw_line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        if line.startswith("\\"):
+            line = line[1:]
+        directory_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        rules.append((_translate_gitignore_pattern(line), negated, directory_only, base))
+    return rules
+
+
+def is_ignored(rules: Sequence[IgnoreRule], relative_path: str, is_dir: bool) -> bool:
+    """
+    Applies gitignore rules in order; the last matching rule wins.
+    """
+    ignored = False
+    for regex, negated, directory_only, base in rules:
+        if directory_only and not is_dir:
+            continue
+        if base:
+            if not relative_path.startswith(base + "/"):
+                continue
+            candidate = relative_path[len(base) + 1:]
+        else:
+            candidate = relative_path
+        if regex.match(candidate):
+            ignored = not negated
+    return ignored
+
+
+class RepoWalker:
+    """
+    Builds the directory tree of a local repository with os.scandir.
+
+    Entry types come from the cached DirEntry data, relative paths are built by string
+    concatenation, and each directory is scanned by a worker thread, so a tree costs
+    roughly one scandir call per directory. Entries matching .gitignore rules (nested
+    .gitignore files included) or the exclude globs are skipped, as are files above
+    max_file_size. Scan errors are logged, recorded in `errors` and reported on the
+    affected directory node instead of being dropped.
+    """
+
+    def __init__(
+        self,
+        exclude_globs: Optional[Sequence[str]] = None,
+        max_file_size: Optional[int] = None,
+        respect_gitignore: bool = True,
+        max_workers: Optional[int] = None,
+    ):
+        config = get_repo_walker_config()
+        self.exclude_globs = list(config["exclude_globs"] if exclude_globs is None else exclude_globs)
+        self.max_file_size = config["max_file_size"] if max_file_size is None else max_file_size
+        self.respect_gitignore = respect_gitignore
+        self.max_workers = max_workers or config["max_workers"]
+        self.errors: List[Tuple[str, str]] = []
+        self._rules_by_directory: Dict[Tuple[str, str], List[IgnoreRule]] = {}
+
+    def _is_excluded(self, name: str, relative_path: str) -> bool:
+        return any(
+            fnmatch.fnmatch(name, glob) or fnmatch.fnmatch(relative_path, glob)
+            for glob in self.exclude_globs
+        )
+
+    def _read_gitignore(self, directory: str, base: str) -> List[IgnoreRule]:
+        try:
+            with open(os.path.join(directory, ".gitignore"), "r", encoding="utf-8", errors="replace") as f:
+                return parse_gitignore(f.read(), base)
+        except OSError as e:
+            self.errors.append((os.path.join(base, ".gitignore"), str(e)))
+            return []
+
+    def _inherited_rules(self, start_path: str, base_dir: str) -> List[IgnoreRule]:
+        """
+        Rules from .gitignore files between the repository root and start_path.
+        """
+        if not self.respect_gitignore:
+            return []
+        relative_start = os.path.relpath(start_path, base_dir)
+        if relative_start == "." or relative_start.startswith(".."):
+            relative_start = ""
+        rules: List[IgnoreRule] = []
+        parts = relative_start.split("/") if relative_start else []
+        for i in range(len(parts)):
+            base = "/".join(parts[:i])
+            directory = os.path.join(base_dir, base) if base else base_dir
+            if os.path.isfile(os.path.join(directory, ".gitignore")):
+                rules.extend(self._read_gitignore(directory, base))
+        return rules
+
+    def includes(self, relative_path: str, base_dir: str, size: Optional[int] = None) -> bool:
+        """
+        Whether build_tree over base_dir would list the file at relative_path: no
+        component of the path matches the exclude globs or the .gitignore rules in
+        effect for it, and (when size is given) the file is within max_file_size.
+        .gitignore files are read once per directory and cached on the walker.
+        """
+        if size is not None and self.max_file_size and size > self.max_file_size:
+            return False
+        parts = relative_path.split("/")
+        rules: List[IgnoreRule] = []
+        for i, name in enumerate(parts):
+            if self.respect_gitignore:
+                rules = rules + self._directory_rules(base_dir, "/".join(parts[:i]))
+            child_relative = "/".join(parts[:i + 1])
+            if self._is_excluded(name, child_relative):
+                return False
+            if rules and is_ignored(rules, child_relative, i < len(parts) - 1):
+                return False
+        return True
+
+    def _directory_rules(self, base_dir: str, base: str) -> List[IgnoreRule]:
+        rules = self._rules_by_directory.get((base_dir, base))
+        if rules is None:
+            directory = os.path.join(base_dir, base) if base else base_dir
+            has_gitignore = os.path.isfile(os.path.join(directory, ".gitignore"))
+            rules = self._read_gitignore(directory, base) if has_gitignore else []
+            self._rules_by_directory[(base_dir, base)] = rules
+        return rules
+
+    def _scan(
+        self, path: str, relative_path: str, rules: List[IgnoreRule]
+    ) -> Tuple[List[TreeNode], List[Tuple[str, str]], List[IgnoreRule], Optional[str]]:
+        """
+        Scans one directory. Returns (file nodes, subdirectories as (path, relative path),
+        the ignore rules in effect for its children, error message or None).
+        """
+        files: List[TreeNode] = []
+        subdirectories: List[Tuple[str, str]] = []
+        try:
+            with os.scandir(path) as iterator:
+                entries = list(iterator)
+        except OSError as e:
+            return files, subdirectories, rules, str(e)
+
+        if self.respect_gitignore and any(entry.name == ".gitignore" for entry in entries):
+            rules = rules + self._read_gitignore(path, relative_path)
+
+        for entry in entries:
+            child_relative = f"{relative_path}/{entry.name}" if relative_path else entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if self._is_excluded(entry.name, child_relative):
+                    continue
+                if rules and is_ignored(rules, child_relative, is_dir):
+                    continue
+                if is_dir:
+                    subdirectories.append((entry.path, child_relative))
+                    continue
+                if self.max_file_size and entry.stat(follow_symlinks=False).st_size > self.max_file_size:
+                    continue
+            except OSError as e:
+                self.errors.append((child_relative, str(e)))
+                logger.warning(f"Skipping {child_relative}: {e}")
+                continue
+            files.append(TreeNode(name=entry.name, type=FILE, path=child_relative))
+        return files, subdirectories, rules, None
+
+    def _root_node(self, start_path: str, base_dir: str) -> TreeNode:
+        relative_start = os.path.relpath(start_path, base_dir)
+        if relative_start == ".":
+            relative_start = ""
+        return TreeNode(name=os.path.basename(start_path) or start_path, type=DIRECTORY, path=relative_start)
+
+    def build_tree(self, start_path: str, max_depth: Optional[int], base_dir: str) -> TreeNode:
+        """
+        Returns the tree rooted at start_path, with paths relative to base_dir.
+        Directories at max_depth are returned unscanned and marked truncated;
+        max_depth=None scans the whole tree.
+        """
+        self.errors = []
+        root = self._root_node(start_path, base_dir)
+        relative_start = root.path
+        rules = self._inherited_rules(start_path, base_dir)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {executor.submit(self._scan, start_path, relative_start, rules): (root, 0)}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node, depth = pending.pop(future)
+                    files, subdirectories, child_rules, error = future.result()
+                    if error:
+                        self.errors.append((node.path, error))
+                        logger.error(f"Error listing directory {node.path or start_path}: {error}")
+                        node.error = error
+                    node.children.extend(files)
+                    for path, child_relative in subdirectories:
+                        child = TreeNode(name=os.path.basename(path), type=DIRECTORY, path=child_relative)
+                        node.children.append(child)
+                        if max_depth is not None and depth + 1 >= max_depth:
+                            child.truncated = True
+                        else:
+                            future_child = executor.submit(self._scan, path, child_relative, child_rules)
+                            pending[future_child] = (child, depth + 1)
+        return root
+
+    def iter_tree(
+        self, start_path: str, base_dir: str, max_depth: Optional[int] = None
+    ) -> Iterator[Tuple[TreeNode, int]]:
+        """
+        Yields (node, depth) in pre-order with children sorted by name, scanning one
+        directory at a time as the consumer advances. Yielded nodes carry no children,
+        so memory stays proportional to the directories pending on the walk, not to
+        the size of the tree. max_depth limits scanning as in build_tree.
+        """
+        self.errors = []
+        root = self._root_node(start_path, base_dir)
+        stack: List[Tuple[TreeNode, str, int, List[IgnoreRule]]] = [
+            (root, start_path, 0, self._inherited_rules(start_path, base_dir))
+        ]
+        while stack:
+            node, path, depth, rules = stack.pop()
+            if not node.is_directory:
+                yield node, depth
+                continue
+            if max_depth is not None and depth >= max_depth:
+                node.truncated = True
+                yield node, depth
+                continue
+            files, subdirectories, child_rules, error = self._scan(path, node.path, rules)
+            if error:
+                self.errors.append((node.path, error))
+                logger.error(f"Error listing directory {node.path or start_path}: {error}")
+                node.error = error
+            yield node, depth
+            children = [(child, os.path.join(path, child.name)) for child in files]
+            children.extend(
+                (TreeNode(name=os.path.basename(sub_path), type=DIRECTORY, path=child_relative), sub_path)
+                for sub_path, child_relative in subdirectories
+            )
+            children.sort(key=lambda item: item[0].name, reverse=True)
+            for child, child_path in children:
+                stack.append((child, child_path, depth + 1, child_rules))
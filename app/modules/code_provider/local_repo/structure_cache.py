@@ -0,0 +1,182 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.core.config_provider import get_structure_cache_config
+from app.core.metrics import registry
+from app.modules.code_provider.tree_node import TreeNode
+
+logger = logging.getLogger(__name__)
+
+# Rough per-node overhead of a TreeNode (object, dataclass fields, list slot) used
+# for the memory budget; name and path lengths are added on top.
+_NODE_OVERHEAD_BYTES = 250
+
+MTIME = "mtime"
+GIT = "git"
+
+_CACHE_LOOKUPS = registry.counter(
+    "repo_parser_structure_cache_lookups_total", "Project tree cache lookups, by result (hit, miss, invalidated).",
+    ("result",),
+)
+_CACHE_EVICTIONS = registry.counter(
+    "repo_parser_structure_cache_evictions_total", "Project trees evicted from the cache for the memory budget."
+)
+_CACHE_ENTRIES = registry.gauge("repo_parser_structure_cache_entries", "Project trees held in the cache.")
+_CACHE_BYTES = registry.gauge("repo_parser_structure_cache_bytes", "Estimated size of the cached project trees.")
+
+
+def estimate_tree_bytes(tree: TreeNode) -> int:
+    return sum(_NODE_OVERHEAD_BYTES + len(node.name) + len(node.path) for node, _ in tree.iter_nodes())
+
+
+def _mtime_stamp(tree: TreeNode, repo_path: str) -> Tuple:
+    """
+    mtimes of every scanned directory plus every .gitignore in the tree. Creating,
+    deleting or renaming an entry changes its directory's mtime, and .gitignore edits
+    change which entries are listed, so an unchanged stamp means an unchanged tree.
+    Truncated directories were not listed and are not part of the stamp.
+    """
+    stamp = []
+    for node, _ in tree.iter_nodes():
+        if (node.is_directory and not node.truncated) or node.name == ".gitignore":
+            path = os.path.join(repo_path, node.path) if node.path else repo_path
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+    return tuple(stamp)
+
+
+def _git_stamp(repo_path: str) -> Optional[Tuple]:
+    """
+    HEAD, the checked-out ref and the index mtime. Cheaper than the mtime stamp, but
+    it only notices changes that touch git (commits, checkouts, staging); returns None
+    when repo_path is not a git checkout.
+    """
+    git_dir = os.path.join(repo_path, ".git")
+    try:
+        with open(os.path.join(git_dir, "HEAD"), "r", encoding="utf-8") as f:
+            head = f.read().strip()
+        index_mtime = os.stat(os.path.join(git_dir, "index")).st_mtime_ns
+    except OSError:
+        return None
+    ref_mtime = None
+    if head.startswith("ref:"):
+        for ref_path in (os.path.join(git_dir, head[4:].strip()), os.path.join(git_dir, "packed-refs")):
+            try:
+                ref_mtime = os.stat(ref_path).st_mtime_ns
+                break
+            except OSError:
+                continue
+    return head, ref_mtime, index_mtime
+
+
+class StructureCache:
+    """
+    In-process LRU cache of project trees keyed by (project_id, path, max_depth).
+
+    Entries are revalidated on every lookup without rescanning the repository:
+    with the "mtime" strategy by re-stat-ing the directories of the cached tree,
+    with the "git" strategy by comparing HEAD, the current ref and the index mtime
+    (falling back to "mtime" outside git checkouts). Entries are evicted least
+    recently used first once their estimated size exceeds max_bytes.
+
+    Cached trees are shared between callers and must be treated as read-only.
+    Lookups, evictions and the cache size are exported on /metrics; stats()
+    reports the same for this instance.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, validation: Optional[str] = None):
+        config = get_structure_cache_config()
+        self.max_bytes = config["max_bytes"] if max_bytes is None else max_bytes
+        self.validation = validation or config["validation"]
+        self._entries: "OrderedDict[Hashable, Tuple[TreeNode, str, Tuple, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def _stamp(self, tree: TreeNode, repo_path: str) -> Tuple:
+        if self.validation == GIT:
+            stamp = _git_stamp(repo_path)
+            if stamp is not None:
+                return (GIT,) + stamp
+        return (MTIME,) + _mtime_stamp(tree, repo_path)
+
+    def get(self, key: Hashable, repo_path: str) -> Optional[TreeNode]:
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            _CACHE_LOOKUPS.inc(result="miss")
+            return None
+        tree, cached_repo_path, stamp, _ = entry
+        if cached_repo_path == repo_path and self._stamp(tree, repo_path) == stamp:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self.hits += 1
+            _CACHE_LOOKUPS.inc(result="hit")
+            return tree
+        with self._lock:
+            self._remove(key)
+            self.invalidations += 1
+            self.misses += 1
+        _CACHE_LOOKUPS.inc(result="invalidated")
+        return None
+
+    def put(self, key: Hashable, repo_path: str, tree: TreeNode):
+        size = estimate_tree_bytes(tree)
+        if size > self.max_bytes:
+            logger.info(f"Tree for {key} ({size} bytes) exceeds the structure cache budget; not cached")
+            return
+        stamp = self._stamp(tree, repo_path)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (tree, repo_path, stamp, size)
+            self.current_bytes += size
+            _CACHE_ENTRIES.inc()
+            _CACHE_BYTES.inc(size)
+            while self.current_bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+                _CACHE_EVICTIONS.inc()
+
+    def _remove(self, key: Hashable):
+        # Caller holds the lock.
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[3]
+            _CACHE_ENTRIES.dec()
+            _CACHE_BYTES.dec(entry[3])
+
+    def clear(self):
+        with self._lock:
+            _CACHE_ENTRIES.dec(len(self._entries))
+            _CACHE_BYTES.dec(self.current_bytes)
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "validation": self.validation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+
+# Shared by all LocalRepoService instances, which are created per request.
+structure_cache = StructureCache()
@@ -0,0 +1,154 @@
+import base64
+import binascii
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+DIRECTORY = "directory"
+FILE = "file"
+
+
+@dataclass
+class TreeNode:
+    """
+    A file or directory of a repository tree as returned by the code providers.
+
+    `path` is relative to the repository root ("" for the root itself). A directory
+    whose children were not scanned because of the depth limit has `truncated` set;
+    `error` holds the reason a directory could not be listed.
+    """
+    name: str
+    type: str
+    path: str
+    children: List["TreeNode"] = field(default_factory=list)
+    truncated: bool = False
+    error: Optional[str] = None
+
+    @property
+    def is_directory(self) -> bool:
+        return self.type == DIRECTORY
+
+    def iter_nodes(self) -> Iterator[Tuple["TreeNode", Optional["TreeNode"]]]:
+        """
+        Yields (node, parent) pairs in pre-order, starting with (self, None).
+        """
+        stack: List[Tuple[TreeNode, Optional[TreeNode]]] = [(self, None)]
+        while stack:
+            node, parent = stack.pop()
+            yield node, parent
+            for child in reversed(node.children):
+                stack.append((child, node))
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"name": self.name, "type": self.type, "path": self.path}
+        if self.is_directory:
+            data["children"] = [child.to_dict() for child in self.children]
+            if self.truncated:
+                data["truncated"] = True
+            if self.error:
+                data["error"] = self.error
+        return data
+
+    def to_record(self) -> Dict[str, Any]:
+        """
+        The node without its children, as listed by paged and streamed structure responses.
+        """
+        data: Dict[str, Any] = {"name": self.name, "type": self.type, "path": self.path}
+        if self.truncated:
+            data["truncated"] = True
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+def render_ingest_tree(tree: TreeNode) -> str:
+    """
+    Formats the tree the way gitingest renders its directory structure: a
+    "Directory structure:" line, "└── root/", then "├── " / "└── " markers behind
+    "│   " or four-space continuation prefixes, children sorted by name. This is
+    the text neo4j_service.parse_directory_structure reads.
+    """
+    lines = ["Directory structure:", f"└── {tree.name}/"]
+    stack: List[Tuple[TreeNode, str, bool]] = []
+
+    def push_children(node: TreeNode, prefix: str):
+        children = sorted(node.children, key=lambda x: x.name)
+        for i in range(len(children) - 1, -1, -1):
+            stack.append((children[i], prefix, i == len(children) - 1))
+
+    push_children(tree, "    ")
+    while stack:
+        node, prefix, is_last = stack.pop()
+        suffix = "/" if node.is_directory else ""
+        lines.append(f"{prefix}{'└── ' if is_last else '├── '}{node.name}{suffix}")
+        if node.is_directory:
+            push_children(node, prefix + ("    " if is_last else "│   "))
+    return "\n".join(lines) + "\n"
+
+
+def encode_cursor(name: str) -> str:
+    return base64.urlsafe_b64encode(name.encode("utf-8", errors="surrogateescape")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> str:
+    """
+    Returns the entry name a cursor points after. Raises ValueError for malformed cursors.
+    """
+    try:
+        return base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8", errors="surrogateescape")
+    except (binascii.Error, UnicodeEncodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def page_children(directory: TreeNode, cursor: Optional[str], limit: int) -> Dict[str, Any]:
+    """
+    One page of a directory's children sorted by name. The cursor is the opaque
+    name of the last entry of the previous page, so entries added or removed while
+    a client pages do not shift the remaining pages. Subdirectories are listed
+    unexpanded (truncated); fetch them by path to descend.
+    """
+    children = sorted(directory.children, key=lambda child: child.name)
+    if cursor:
+        after = decode_cursor(cursor)
+        children = [child for child in children if child.name > after]
+    page = children[:limit]
+    return {
+        "path": directory.path,
+        "children": [child.to_record() for child in page],
+        "next_cursor": encode_cursor(page[-1].name) if len(children) > limit else None,
+        "error": directory.error,
+    }
+
+
+def iter_sorted(tree: TreeNode) -> Iterator[Tuple[TreeNode, int]]:
+    """
+    Yields (node, depth) in pre-order with children sorted by name, the order of
+    render_tree and of the streamed structure walks.
+    """
+    stack: List[Tuple[TreeNode, int]] = [(tree, 0)]
+    while stack:
+        node, depth = stack.pop()
+        yield node, depth
+        for child in sorted(node.children, key=lambda x: x.name, reverse=True):
+            stack.append((child, depth + 1))
+
+
+def render_tree(tree: TreeNode, indent: int = 0) -> str:
+    """
+    Formats the tree as an indented string: two spaces per level, directories
+    suffixed with "/", children sorted by name, and a "..." line under truncated
+    directories.
+    """
+    lines: List[str] = []
+    stack: List[Tuple[TreeNode, int]] = [(tree, indent)]
+    while stack:
+        node, level = stack.pop()
+        prefix = "  " * level
+        if not node.is_directory:
+            lines.append(f"{prefix}{node.name}")
+            continue
+        lines.append(f"{prefix}{node.name}/")
+        if node.truncated:
+            lines.append(f"{prefix}  ...")
+        for child in sorted(node.children, key=lambda x: x.name, reverse=True):
+            stack.append((child, level + 1))
+    return "\n".join(lines)
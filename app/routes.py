@@ -1,46 +1,238 @@
 import asyncio
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import logging
+import re
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
 from app.db.session import get_db_session
-from gitingest import ingest_async
 from app.tools.get_code_file_structure_tool import RepoStructureRequest
-from app.services.neo4j_service import insert_repo_structure
+from app.modules.code_provider.code_provider_service import CodeProviderService
+from app.modules.code_provider.git_repo.git_object_service import slice_lines
+from app.modules.code_provider.tree_node import iter_sorted, render_tree
+from app.modules.projects.projects_service import ProjectService
+from app.services.blob_store import get_blob_store, is_valid_hash
+from app.services.graph_reader import get_graph_reader
+from app.services.incremental_ingest import resolve_local_source
+from app.services.ingest_jobs import get_ingest_job_manager, run_parse_job
+from app.services.repo_snapshot import RepoSnapshot, get_snapshot_store, is_valid_commit
+from app.services.search_index import get_search_index_store
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.post("/repo/parse")
+@router.post("/repo/parse", status_code=202)
 async def parse_github_repo(request: RepoStructureRequest, db: Session = Depends(get_db_session)):
+    """
+    Queues an ingest of the repository and returns its job id right away.
+    While a job for the same repository is queued or running, that job is
+    returned instead of starting another one.
+    """
+    logger.info(f"Parse requested for {request.path} (incremental={request.incremental})")
+    if not request.path:
+        raise HTTPException(status_code=400, detail="path is required")
+
+    repo_key = resolve_local_source(request.path) or request.path
+    job, created = get_ingest_job_manager().submit(
+        repo_key,
+        lambda job: run_parse_job(job, request.path, incremental=request.incremental),
+    )
+    return {
+        "status": job.status,
+        "message": "Repository ingest queued." if created else "Repository ingest already in progress.",
+        "job_id": job.id,
+        "deduplicated": not created
+    }
+
+@router.get("/repo/jobs/{job_id}")
+async def get_ingest_job(job_id: str):
+    """
+    Reports the stage, progress and stage timings of an ingest job.
+    """
+    job = get_ingest_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job.to_dict()
+
+def open_project_snapshot(project_id: str, commit: str, db: Session) -> RepoSnapshot:
+    """
+    The snapshot a full ingest wrote of the project's checkout at `commit` (a full
+    commit id), pinned for the caller; use it in a with block.
+    """
+    if not is_valid_commit(commit):
+        raise HTTPException(status_code=400, detail="commit must be a full hex commit id")
+    project = ProjectService(db).get_project_from_db_by_id_sync(project_id)
+    source = resolve_local_source(project.get("repo_path")) if project else None
+    snapshot = get_snapshot_store().open(source, commit) if source else None
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"No snapshot of project {project_id} at {commit}")
+    return snapshot
+
+@router.get("/projects/{project_id}/structure")
+async def get_project_structure(
+    project_id: str,
+    path: Optional[str] = None,
+    format: str = "json",
+    max_depth: Optional[int] = Query(None, ge=1),
+    commit: Optional[str] = None,
+    db: Session = Depends(get_db_session),
+):
+    """
+    Returns the project tree as nested JSON nodes, as the indented text rendering
+    when format=text, or streamed as NDJSON when format=ndjson: one
+    {name, type, path, depth} object per line in pre-order, produced while the
+    tree is walked, so arbitrarily large trees never build one response in memory.
+
+    With `commit`, the tree is served from the snapshot ingested at that commit
+    instead of being scanned.
+    """
+    if format not in ("json", "text", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'json', 'text' or 'ndjson'")
+    if commit:
+        with await asyncio.to_thread(open_project_snapshot, project_id, commit, db) as snapshot:
+            node = snapshot.tree.find(path or "")
+            if node is None or not snapshot.tree.is_directory(node):
+                raise HTTPException(status_code=404, detail=f"Directory {path} not found at {commit}")
+            tree = snapshot.tree.to_tree_node(node, max_depth)
+        if format == "ndjson":
+            lines = (json.dumps({**n.to_record(), "depth": depth}) + "\n" for n, depth in iter_sorted(tree))
+            return StreamingResponse(lines, media_type="application/x-ndjson")
+    else:
+        service = CodeProviderService(db)
+        if format == "ndjson":
+            walk = await service.iter_project_tree_async(project_id, path, max_depth)
+            lines = (json.dumps({**node.to_record(), "depth": depth}) + "\n" for node, depth in walk)
+            return StreamingResponse(lines, media_type="application/x-ndjson")
+        tree = await service.get_project_tree_async(project_id, path, max_depth)
+    if format == "text":
+        return PlainTextResponse(render_tree(tree))
+    return tree.to_dict()
+
+@router.get("/projects/{project_id}/commits/{commit}/file")
+async def get_snapshot_file(
+    project_id: str,
+    commit: str,
+    path: str,
+    start_line: int = Query(0, ge=0),
+    end_line: int = Query(0, ge=0),
+    db: Session = Depends(get_db_session),
+):
+    """
+    Returns a file (or a 1-based, inclusive line range of it) as it was ingested
+    at `commit`, read from the snapshot's memory-mapped data file.
+    """
+    with await asyncio.to_thread(open_project_snapshot, project_id, commit, db) as snapshot:
+        content = snapshot.read_text(path)
+    if content is None:
+        raise HTTPException(status_code=404, detail=f"File {path} not found at {commit}")
+    return PlainTextResponse(slice_lines(content, start_line, end_line))
+
+@router.get("/projects/{project_id}/children")
+async def get_project_children(
+    project_id: str,
+    path: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    db: Session = Depends(get_db_session),
+):
+    """
+    Lists the direct children of the directory at `path`, one page at a time.
+    Pass the returned next_cursor to get the following page; subdirectories are
+    expanded by requesting them as `path`.
+    """
+    try:
+        return await CodeProviderService(db).list_children_async(project_id, path, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/blobs/{content_hash}")
+def get_blob(content_hash: str):
+    """
+    Returns file content by the content_hash stored on a File node.
+    """
+    if not is_valid_hash(content_hash):
+        raise HTTPException(status_code=400, detail="content_hash must be a sha256 hex digest")
     try:
-        print("Received request:", request)
-
-        summary, directory_structure, additional_data = await ingest_async(request.path)
-
-        # print("Repository Summary:", summary)
-        # print("Directory Structure:", directory_structure)
-        # print("Additional Data:", additional_data)
-
-        if not directory_structure.strip():
-            raise HTTPException(
-                status_code=500,
-                detail="Empty directory structure received from ingest_async."
-            )
-
-        repo_data = {
-            "repo_info": summary.strip(),
-            "directory_structure": directory_structure.strip(),
-            "repo_code": additional_data.strip()
-        }
-        # print("Structured Repository Data:", repo_data)
-
-        # Insert into Neo4j and capture the returned repository id.
-        result = insert_repo_structure(repo_data)
-        # print("Neo4j Insertion Result:", result)
-
-        return {
-            "status": "success",
-            "message": "Repository structure parsed and stored in Neo4j.",
-            "neo4j_repo": result
-        }
-    except Exception as e:
-        print("Error encountered:", str(e))
-        raise HTTPException(status_code=500, detail=str(e))
+        data = get_blob_store().get(content_hash)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Blob {content_hash} not found")
+    return Response(content=data, media_type="text/plain; charset=utf-8")
+
+@router.get("/repo/{repo_name:path}/search")
+def search_repo(
+    repo_name: str,
+    q: str = Query(..., min_length=1),
+    regex: bool = False,
+    case_sensitive: bool = True,
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+):
+    """
+    Searches the files of an ingested repository for a substring, or a Python
+    regular expression with regex=true. The trigram index built at ingest narrows
+    the files to scan; every reported match is verified against the file content.
+    """
+    index = get_search_index_store().open(repo_name)
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"No search index for repository {repo_name}")
+    try:
+        return index.search(q, regex=regex, case_sensitive=case_sensitive, max_results=limit)
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid regular expression: {e}")
+
+
+@router.get("/repo/{repo_name:path}/tree")
+def get_repo_tree(
+    repo_name: str,
+    path: Optional[str] = None,
+    max_depth: Optional[int] = Query(None, ge=0),
+):
+    """
+    Returns the subtree of an ingested repository below `path` (relative to the
+    repository root, default the root) as nested nodes, read from the graph.
+    """
+    tree = get_graph_reader().subtree(repo_name, path, max_depth)
+    if tree is None:
+        raise HTTPException(status_code=404, detail=f"Directory {path or '/'} not found in {repo_name}")
+    return tree
+
+
+@router.get("/repo/{repo_name:path}/children")
+def get_repo_children(repo_name: str, path: Optional[str] = None):
+    """
+    Lists the direct children of a directory of an ingested repository.
+    """
+    children = get_graph_reader().list_directory(repo_name, path)
+    if children is None:
+        raise HTTPException(status_code=404, detail=f"Directory {path or '/'} not found in {repo_name}")
+    return children
+
+
+@router.get("/repo/{repo_name:path}/stats")
+def get_repo_stats(repo_name: str, path: Optional[str] = None):
+    """
+    Returns the file count, bytes, line count and extension histogram of a
+    directory (default: the whole repository), as computed at ingest.
+    """
+    stats = get_graph_reader().directory_stats(repo_name, path)
+    if stats is None:
+        raise HTTPException(status_code=404, detail=f"Directory {path or '/'} not found in {repo_name}")
+    return stats
+
+
+@router.get("/repo/{repo_name:path}/file")
+def get_repo_file(repo_name: str, path: str, content: bool = True):
+    """
+    Returns a file's metadata and, unless content=false, its content from the blob store.
+    """
+    reader = get_graph_reader()
+    metadata = reader.file(repo_name, path)
+    if metadata is None:
+        raise HTTPException(status_code=404, detail=f"File {path} not found in {repo_name}")
+    if not content:
+        return metadata
+    code = reader.file_content(repo_name, path)
+    if code is None:
+        raise HTTPException(status_code=404, detail=f"Content of {path} is not stored")
+    return {**metadata, "content": code}
@@ -0,0 +1,104 @@
+import hashlib
+import os
+import re
+import tempfile
+import zlib
+from typing import Optional, Tuple
+
+from app.core.config_provider import get_blob_store_config
+
+_HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+_COMPRESSED_SUFFIX = ".z"
+
+
+def is_valid_hash(content_hash: str) -> bool:
+    return bool(_HASH_PATTERN.match(content_hash))
+
+
+class LocalBlobStore:
+    """
+    Content-addressed file store on the local filesystem.
+
+    Blobs are keyed by the sha256 of their content (the same value stored as
+    File.content_hash) and sharded as <root>/<h[0:2]>/<h[2:4]>/<h>. Identical
+    content is stored once, whichever repository, branch or path it came from.
+    With compression enabled blobs are zlib-compressed and get a ".z" suffix;
+    reads accept both forms, so the setting can change without rewriting the store.
+    """
+
+    def __init__(self, root: Optional[str] = None, compress: Optional[bool] = None, compression_level: int = 6):
+        config = get_blob_store_config()
+        self.root = root or config["path"]
+        self.compress = config["compress"] if compress is None else compress
+        self.compression_level = compression_level
+
+    def _path(self, content_hash: str) -> str:
+        return os.path.join(self.root, content_hash[:2], content_hash[2:4], content_hash)
+
+    def exists(self, content_hash: str) -> bool:
+        path = self._path(content_hash)
+        return os.path.exists(path) or os.path.exists(path + _COMPRESSED_SUFFIX)
+
+    def put(self, data: bytes) -> Tuple[str, int]:
+        """
+        Stores `data` unless a blob with the same hash exists. Returns (hash, size).
+        """
+        content_hash = hashlib.sha256(data).hexdigest()
+        if self.exists(content_hash):
+            return content_hash, len(data)
+        path = self._path(content_hash)
+        if self.compress:
+            path += _COMPRESSED_SUFFIX
+            payload = zlib.compress(data, self.compression_level)
+        else:
+            payload = data
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file and rename, so readers never see partial blobs.
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return content_hash, len(data)
+
+    def put_text(self, text: str) -> Tuple[str, int]:
+        return self.put(text.encode("utf-8"))
+
+    def get(self, content_hash: str) -> bytes:
+        """
+        Returns the blob content. Raises KeyError if the hash is unknown.
+        """
+        if not is_valid_hash(content_hash):
+            raise KeyError(content_hash)
+        path = self._path(content_hash)
+        try:
+            with open(path + _COMPRESSED_SUFFIX, "rb") as f:
+                return zlib.decompress(f.read())
+        except FileNotFoundError:
+            pass
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(content_hash)
+
+    def get_text(self, content_hash: str) -> str:
+        return self.get(content_hash).decode("utf-8")
+
+
+_default_store: Optional[LocalBlobStore] = None
+
+
+def get_blob_store() -> LocalBlobStore:
+    """
+    Returns the process-wide blob store configured through BLOB_STORE_PATH / BLOB_STORE_COMPRESS.
+    """
+    global _default_store
+    if _default_store is None:
+        _default_store = LocalBlobStore()
+    return _default_store
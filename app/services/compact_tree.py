@@ -0,0 +1,280 @@
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.modules.code_provider.tree_node import DIRECTORY as TREE_DIRECTORY, FILE as TREE_FILE, TreeNode
+
+DIRECTORY = 0
+FILE = 1
+
+
+class CompactTree:
+    """
+    Repository structure stored as parallel arrays instead of one dict per node
+    and per relationship.
+
+    Node i has the name segments[node_segments[i]], the parent node parents[i]
+    (-1 for the root) and the kind kinds[i] (DIRECTORY or FILE). Names are interned
+    in one segment table, so "src", "index.ts" or "__init__.py" are stored once
+    however many directories contain them, and no path string is kept at all:
+    paths are rebuilt from the parent chain on demand. Nodes are appended in
+    pre-order, so a parent always precedes its children.
+
+    Node 0 is the repository (or the listed directory); its name prefixes every
+    path(), matching the paths of parse_file_structure. relative_path() omits it
+    and is relative to the repository root, i.e. prefixed with base_path when the
+    tree starts below the root.
+    File contents and read errors, when loaded, are kept per node index.
+    """
+
+    __slots__ = (
+        "base_path", "segments", "node_segments", "parents", "kinds", "contents", "errors",
+        "_segment_index", "_child_offsets", "_child_indexes",
+    )
+
+    def __init__(self, repository_name: str, base_path: str = ""):
+        self.base_path = base_path.strip("/")
+        self.segments: List[str] = []
+        self._segment_index: Dict[str, int] = {}
+        self.node_segments = array("I")
+        self.parents = array("i")
+        self.kinds = bytearray()
+        self.contents: Dict[int, str] = {}
+        self.errors: Dict[int, Tuple[str, int]] = {}
+        self._child_offsets: Optional[array] = None
+        self._child_indexes: Optional[array] = None
+        self.add_node(-1, repository_name, DIRECTORY)
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def _intern(self, segment: str) -> int:
+        segment_id = self._segment_index.get(segment)
+        if segment_id is None:
+            segment_id = self._segment_index[segment] = len(self.segments)
+            self.segments.append(segment)
+        return segment_id
+
+    def add_node(self, parent: int, name: str, kind: int) -> int:
+        index = len(self.parents)
+        self.node_segments.append(self._intern(name))
+        self.parents.append(parent)
+        self.kinds.append(kind)
+        self._child_offsets = self._child_indexes = None
+        return index
+
+    @property
+    def repository_name(self) -> str:
+        return self.name(0)
+
+    def name(self, index: int) -> str:
+        return self.segments[self.node_segments[index]]
+
+    def is_directory(self, index: int) -> bool:
+        return self.kinds[index] == DIRECTORY
+
+    def path(self, index: int) -> str:
+        parts = []
+        while index != -1:
+            parts.append(self.segments[self.node_segments[index]])
+            index = self.parents[index]
+        return "/".join(reversed(parts))
+
+    def relative_path(self, index: int) -> str:
+        parts = []
+        while index > 0:
+            parts.append(self.segments[self.node_segments[index]])
+            index = self.parents[index]
+        if self.base_path:
+            parts.append(self.base_path)
+        return "/".join(reversed(parts))
+
+    def iter_files(self) -> Iterator[int]:
+        return (i for i, kind in enumerate(self.kinds) if kind == FILE)
+
+    def iter_directories(self) -> Iterator[int]:
+        return (i for i, kind in enumerate(self.kinds) if kind == DIRECTORY)
+
+    def iter_edges(self) -> Iterator[Tuple[int, int]]:
+        """
+        Yields (parent, child) index pairs, the relationships of the tree.
+        """
+        return ((parent, child) for child, parent in enumerate(self.parents) if parent != -1)
+
+    def _build_child_index(self):
+        # Children of a node, grouped per parent in a CSR layout; built on first use.
+        counts = array("I", bytes(4 * (len(self) + 1)))
+        for parent in self.parents:
+            if parent != -1:
+                counts[parent + 1] += 1
+        for i in range(len(self)):
+            counts[i + 1] += counts[i]
+        fill = array("I", counts)
+        indexes = array("I", bytes(4 * max(len(self) - 1, 0)))
+        for child, parent in enumerate(self.parents):
+            if parent != -1:
+                indexes[fill[parent]] = child
+                fill[parent] += 1
+        self._child_offsets, self._child_indexes = counts, indexes
+
+    def children(self, index: int) -> array:
+        if self._child_offsets is None:
+            self._build_child_index()
+        return self._child_indexes[self._child_offsets[index]:self._child_offsets[index + 1]]
+
+    def find(self, relative_path: str) -> Optional[int]:
+        """
+        Returns the node at a repository-relative path, or None.
+        """
+        relative_path = relative_path.strip("/")
+        if self.base_path:
+            if relative_path != self.base_path and not relative_path.startswith(self.base_path + "/"):
+                return None
+            relative_path = relative_path[len(self.base_path):].lstrip("/")
+        index = 0
+        for segment in relative_path.split("/") if relative_path else []:
+            segment_id = self._segment_index.get(segment)
+            if segment_id is None:
+                return None
+            index = next((c for c in self.children(index) if self.node_segments[c] == segment_id), None)
+            if index is None:
+                return None
+        return index
+
+    def set_content(self, index: int, code: str):
+        self.contents[index] = code
+
+    def set_error(self, index: int, detail: str, status_code: int):
+        self.errors[index] = (detail, status_code)
+
+    @classmethod
+    def from_tree_node(cls, tree: TreeNode) -> "CompactTree":
+        """
+        Builds the compact form of a code provider tree. Truncated directories
+        contribute no placeholder children.
+        """
+        compact = cls(tree.name, tree.path)
+        stack: List[Tuple[TreeNode, int]] = [(child, 0) for child in reversed(tree.children)]
+        while stack:
+            node, parent = stack.pop()
+            index = compact.add_node(parent, node.name, DIRECTORY if node.is_directory else FILE)
+            for child in reversed(node.children):
+                stack.append((child, index))
+        return compact
+
+    @classmethod
+    def from_nested(cls, repository_name: str, nodes: List[Dict[str, Any]]) -> "CompactTree":
+        """
+        Builds the compact form of nested { name, type, children } nodes, such as
+        neo4j_service.parse_directory_structure returns; `nodes` are the children
+        of the repository node.
+        """
+        compact = cls(repository_name)
+        stack: List[Tuple[Dict[str, Any], int]] = [(node, 0) for node in reversed(nodes)]
+        while stack:
+            node, parent = stack.pop()
+            is_directory = node["type"] == "directory"
+            index = compact.add_node(parent, node["name"], DIRECTORY if is_directory else FILE)
+            for child in reversed(node.get("children", [])):
+                stack.append((child, index))
+        return compact
+
+    @classmethod
+    def from_arrays(
+        cls, segments: List[str], node_segments: Sequence[int], parents: Sequence[int],
+        kinds: Sequence[int], base_path: str = "",
+    ) -> "CompactTree":
+        """
+        Wraps existing tables without copying them, e.g. memoryviews over a mapped
+        snapshot file. Trees built this way are read-only unless the tables are
+        growable arrays.
+        """
+        compact = cls.__new__(cls)
+        compact.base_path = base_path.strip("/")
+        compact.segments = segments
+        compact._segment_index = {segment: i for i, segment in enumerate(segments)}
+        compact.node_segments = node_segments
+        compact.parents = parents
+        compact.kinds = kinds
+        compact.contents = {}
+        compact.errors = {}
+        compact._child_offsets = compact._child_indexes = None
+        return compact
+
+    @classmethod
+    def from_structure_text(cls, structure_str: str) -> "CompactTree":
+        """
+        Parses the indented text rendering (see parse_file_structure for the format)
+        straight into the compact form. "..." lines under truncated directories are skipped.
+        """
+        lines = [line for line in structure_str.splitlines() if line.strip()]
+        if not lines:
+            raise ValueError("Empty structure string")
+        compact = cls(lines[0].strip().rstrip("/"))
+        stack: List[Tuple[int, int]] = [(0, 0)]  # (indent level, node index)
+        for line in lines[1:]:
+            node_name = line.strip()
+            if node_name == "...":
+                continue
+            level = (len(line) - len(line.lstrip(" "))) // 2
+            is_directory = node_name.endswith("/")
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            parent = stack[-1][1] if stack else 0
+            index = compact.add_node(parent, node_name.rstrip("/") if is_directory else node_name,
+                                     DIRECTORY if is_directory else FILE)
+            if is_directory:
+                stack.append((level, index))
+        return compact
+
+    def to_tree_node(self, index: int = 0, max_depth: Optional[int] = None) -> TreeNode:
+        """
+        Expands the subtree at `index` into code provider TreeNodes. Directories at
+        max_depth below it are returned without children and marked truncated.
+        """
+        root = TreeNode(
+            name=self.name(index), type=TREE_DIRECTORY if self.is_directory(index) else TREE_FILE,
+            path=self.relative_path(index),
+        )
+        stack: List[Tuple[TreeNode, int, int]] = [(root, index, 0)]
+        while stack:
+            node, node_index, depth = stack.pop()
+            if not node.is_directory:
+                continue
+            if max_depth is not None and depth >= max_depth:
+                node.truncated = True
+                continue
+            prefix = f"{node.path}/" if node.path else ""
+            for child in self.children(node_index):
+                name = self.name(child)
+                child_node = TreeNode(
+                    name=name, type=TREE_DIRECTORY if self.is_directory(child) else TREE_FILE, path=prefix + name
+                )
+                node.children.append(child_node)
+                stack.append((child_node, child, depth + 1))
+        return root
+
+    def to_parsed_structure(self) -> Dict[str, Any]:
+        """
+        Expands into the dict shape of tree_to_parsed_structure, for consumers that
+        still expect it. File nodes include "code" or "error" when contents were loaded.
+        """
+        repository_name = self.repository_name
+        files = []
+        directories = []
+        for index in range(len(self)):
+            if self.kinds[index] == DIRECTORY:
+                directories.append({"name": self.name(index), "path": self.path(index)})
+                continue
+            file_node = {"name": self.name(index), "path": self.path(index), "relative_path": self.relative_path(index)}
+            if index in self.contents:
+                file_node["code"] = self.contents[index]
+            elif index in self.errors:
+                detail, status_code = self.errors[index]
+                file_node["error"] = {"detail": detail, "status_code": status_code}
+            files.append(file_node)
+        return {
+            "repository": {"name": repository_name, "url": f"https://github.com/user/{repository_name}"},
+            "files": files,
+            "directories": directories,
+            "relationships": [{"from": self.path(p), "to": self.path(c)} for p, c in self.iter_edges()],
+        }
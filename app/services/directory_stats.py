@@ -0,0 +1,143 @@
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def file_extension(name: str) -> str:
+    """
+    Lower-cased extension without the dot; "" for names without one (including
+    dotfiles such as ".gitignore").
+    """
+    dot = name.rfind(".")
+    return name[dot + 1:].lower() if dot > 0 else ""
+
+
+def count_lines(code: str) -> int:
+    return code.count("\n") + 1 if code else 0
+
+
+def parent_path(full_path: str) -> str:
+    return full_path.rsplit("/", 1)[0] if "/" in full_path else ""
+
+
+class DirectoryStats:
+    """
+    Rollup of the files below a directory: recursive file count, total bytes,
+    line count and a histogram of file extensions.
+    """
+    __slots__ = ("file_count", "total_bytes", "line_count", "extensions")
+
+    def __init__(self, file_count: int = 0, total_bytes: int = 0, line_count: int = 0,
+                 extensions: Optional[Counter] = None):
+        self.file_count = file_count
+        self.total_bytes = total_bytes
+        self.line_count = line_count
+        self.extensions = extensions if extensions is not None else Counter()
+
+    def add(self, other: "DirectoryStats", sign: int = 1):
+        self.file_count += sign * other.file_count
+        self.total_bytes += sign * other.total_bytes
+        self.line_count += sign * other.line_count
+        for extension, count in other.extensions.items():
+            self.extensions[extension] += sign * count
+            # Deltas may hold negative counts; only zeros are dropped.
+            if not self.extensions[extension]:
+                del self.extensions[extension]
+
+    def to_properties(self) -> Dict[str, Any]:
+        """
+        Node properties; Neo4j has no map properties, so the histogram is stored as
+        parallel extensions / extension_counts lists, most frequent first.
+        """
+        histogram = sorted(
+            ((extension, count) for extension, count in self.extensions.items() if count > 0),
+            key=lambda item: (-item[1], item[0]),
+        )
+        return {
+            "file_count": self.file_count,
+            "total_bytes": self.total_bytes,
+            "line_count": self.line_count,
+            "extensions": [extension for extension, _ in histogram],
+            "extension_counts": [count for _, count in histogram],
+        }
+
+    @classmethod
+    def from_properties(cls, properties: Dict[str, Any]) -> "DirectoryStats":
+        return cls(
+            properties.get("file_count") or 0,
+            properties.get("total_bytes") or 0,
+            properties.get("line_count") or 0,
+            Counter(dict(zip(properties.get("extensions") or [], properties.get("extension_counts") or []))),
+        )
+
+
+class DirectoryAggregator:
+    """
+    Computes DirectoryStats for every directory of a repository in one bottom-up pass.
+
+    Files are added with their full_path as their content streams in (add_file),
+    which only touches the stats of the file's own directory; rollup() then folds
+    every directory into its parent, deepest first, so each directory is visited
+    once whatever the size of the tree. Files directly under the repository (no
+    root directory) count towards the repository totals only.
+    """
+
+    def __init__(self):
+        self._direct: Dict[str, DirectoryStats] = {}
+
+    def _stats(self, directory: str) -> DirectoryStats:
+        stats = self._direct.get(directory)
+        if stats is None:
+            stats = self._direct[directory] = DirectoryStats()
+        return stats
+
+    def add_file(self, full_path: str, size: int = 0, line_count: int = 0, count: bool = True):
+        """
+        Adds a file's bytes and lines to its directory; count=False adds only those,
+        for files already counted through add_files.
+        """
+        stats = self._stats(parent_path(full_path))
+        if count:
+            stats.file_count += 1
+            stats.extensions[file_extension(full_path.rsplit("/", 1)[-1])] += 1
+        stats.total_bytes += size
+        stats.line_count += line_count
+
+    def add_files(self, full_paths: Iterable[str]):
+        """
+        Counts files (and their extensions) known from the tree before any content is read.
+        """
+        for full_path in full_paths:
+            self.add_file(full_path)
+
+    def rollup(self, directories: Iterable[str]) -> Tuple[List[Dict[str, Any]], DirectoryStats]:
+        """
+        Returns one row per directory ({ full_path, **stats properties }) and the
+        repository totals. `directories` are the full_paths of all Directory nodes;
+        empty directories get zero rows.
+        """
+        totals: Dict[str, DirectoryStats] = {directory: DirectoryStats() for directory in directories}
+        for directory, stats in self._direct.items():
+            totals.setdefault(directory, DirectoryStats()).add(stats)
+        repository = totals.pop("", DirectoryStats())
+        # Children have more separators than their parents, so sorting by depth
+        # (deepest first) completes every directory before it is folded upwards.
+        for directory in sorted(totals, key=lambda path: path.count("/"), reverse=True):
+            totals.get(parent_path(directory), repository).add(totals[directory])
+        rows = [{"full_path": directory, **stats.to_properties()} for directory, stats in totals.items()]
+        return rows, repository
+
+
+def chain_deltas(file_deltas: Iterable[Tuple[str, DirectoryStats]], root: str) -> Dict[str, DirectoryStats]:
+    """
+    Sums per-file deltas (full_path, signed stats) into a delta for every ancestor
+    directory of each file, keyed by full_path; the key "" holds the repository
+    delta. Incremental updates apply these to the affected ancestor chains only.
+    """
+    deltas: Dict[str, DirectoryStats] = {"": DirectoryStats()}
+    for full_path, delta in file_deltas:
+        deltas[""].add(delta)
+        directory = parent_path(full_path)
+        while directory and (not root or directory == root or directory.startswith(root + "/")):
+            deltas.setdefault(directory, DirectoryStats()).add(delta)
+            directory = parent_path(directory)
+    return deltas
@@ -1,14 +1,17 @@
 import asyncio
 from sqlalchemy.orm import Session
-from app.tools.get_code_file_structure_tool import get_code_file_structure_tool, RepoStructureRequest
+from app.modules.code_provider.tree_node import TreeNode
+from app.services.compact_tree import CompactTree
+from app.services.symbol_extractor import SymbolExtractionPipeline, resolve_imports
+from app.tools.get_code_file_structure_tool import RepoStructureRequest
 
 async def get_repo_structure(request: RepoStructureRequest, db: Session) -> str:
     """
-    Uses GetCodeFileStructureTool to fetch the repository structure asynchronously.
+    Fetches the repository structure asynchronously through the project's code provider.
     This returns an indented textual representation of the repository's tree.
     """
-    tool = get_code_file_structure_tool(db)
-    return await tool.coroutine(project_id=request.project_id, path=request.path)
+    from app.modules.code_provider.code_provider_service import CodeProviderService
+    return await CodeProviderService(db).get_project_structure_async(request.project_id, request.path)
 
 def parse_file_structure(structure_str: str) -> dict:
     """
@@ -80,6 +83,39 @@ def parse_file_structure(structure_str: str) -> dict:
         "relationships": relationships
     }
 
+def tree_to_parsed_structure(tree: TreeNode) -> dict:
+    """
+    Convert a structured repository tree into the same dictionary shape that
+    parse_file_structure produces, without going through the text format.
+
+    The tree root is the repository; node paths are prefixed with its name, and
+    each file additionally keeps its "relative_path" inside the repository.
+    Truncated directories contribute no placeholder children.
+    """
+    repository_name = tree.name
+    repository = {"name": repository_name, "url": f"https://github.com/user/{repository_name}"}
+    files = []
+    directories = [{"name": repository_name, "path": repository_name}]
+    relationships = []
+    full_paths = {id(tree): repository_name}
+    for node, parent in tree.iter_nodes():
+        if parent is None:
+            continue
+        parent_path = full_paths[id(parent)]
+        current_path = f"{parent_path}/{node.name}"
+        if node.is_directory:
+            full_paths[id(node)] = current_path
+            directories.append({"name": node.name, "path": current_path})
+        else:
+            files.append({"name": node.name, "path": current_path, "relative_path": node.path})
+        relationships.append({"from": parent_path, "to": current_path})
+    return {
+        "repository": repository,
+        "files": files,
+        "directories": directories,
+        "relationships": relationships
+    }
+
 def summarize_structure(parsed_data: dict) -> str:
     """
     Create a plain text summary of the parsed repository structure.
@@ -93,34 +129,82 @@ def summarize_structure(parsed_data: dict) -> str:
     summary += "Files:\n" + "\n".join([f"  - {f['path']}" for f in files])
     return summary
 
-async def get_structure_and_code(request: RepoStructureRequest, db: Session, branch_name: str) -> dict:
+async def get_structure_and_code(
+    request: RepoStructureRequest, db: Session, branch_name: str, local_service=None
+) -> dict:
     """
-    For a local repository, fetch the repository structure as an indented string,
-    parse it into a dictionary, and enrich it with file contents.
+    For a local repository, fetch the repository structure as a tree of typed nodes,
+    convert it into a dictionary, and enrich it with file contents.
 
-    It uses the LocalRepoService to retrieve both structure and file content.
+    It uses the LocalRepoService (or the given `local_service`) to retrieve both
+    structure and file content.
+    Files that could not be read carry an "error" entry ({ detail, status_code })
+    instead of "code".
     Returns the enriched dictionary.
     """
-    from app.modules.code_provider.local_repo.local_repo_service import LocalRepoService
-    local_service = LocalRepoService(db)
-    structure_str = await local_service.get_project_structure_async(request.project_id, request.path)
-    parsed_data = parse_file_structure(structure_str)
-    # Enrich each file node with code content.
-    repo_name = parsed_data["repository"]["name"]
-    # For demonstration, we use the project ID from the request.
-    project_id = request.project_id
-    for file_node in parsed_data.get("files", []):
-        file_path = file_node["path"]
-        try:
-            content = local_service.get_file_content(
-                repo_name,
-                file_path,
-                0, 0,  # Retrieve the entire file.
-                branch_name,
-                project_id
-            )
-            file_node["code"] = content
-        except Exception as e:
-            file_node["code"] = f"Error retrieving file: {str(e)}"
+    if local_service is None:
+        from app.modules.code_provider.local_repo.local_repo_service import LocalRepoService
+        local_service = LocalRepoService(db)
+    tree = await local_service.get_project_tree_async(request.project_id, request.path)
+    parsed_data = tree_to_parsed_structure(tree)
+    # Enrich each file node with code content; reads run concurrently and
+    # results arrive in completion order.
+    files_by_path = {fn["relative_path"]: fn for fn in parsed_data.get("files", [])}
+    # Branch checkout is not supported by the local provider; branch_name is informational.
+    async for result in local_service.iter_file_contents(list(files_by_path), request.project_id):
+        file_node = files_by_path[result.path]
+        if result.ok:
+            file_node["code"] = result.content
+        else:
+            file_node["error"] = {"detail": result.error, "status_code": result.status_code}
     parsed_data["file_contents"] = {fn["path"]: fn.get("code", "") for fn in parsed_data.get("files", [])}
     return parsed_data
+
+async def get_compact_structure_and_code(
+    request: RepoStructureRequest, db: Session, branch_name: str, local_service=None
+) -> CompactTree:
+    """
+    get_structure_and_code for large repositories: returns a CompactTree holding the
+    structure as interned parallel arrays and each file's content (or read error)
+    under its node index, instead of per-node and per-relationship dicts plus a
+    second file_contents mapping. to_parsed_structure() gives the dict form when needed.
+    """
+    if local_service is None:
+        from app.modules.code_provider.local_repo.local_repo_service import LocalRepoService
+        local_service = LocalRepoService(db)
+    tree = await local_service.get_project_tree_async(request.project_id, request.path)
+    compact = CompactTree.from_tree_node(tree)
+    del tree
+    # Resolve each path to its node once; find() would rescan children per result.
+    indexes_by_path = {compact.relative_path(index): index for index in compact.iter_files()}
+    async for result in local_service.iter_file_contents(indexes_by_path, request.project_id):
+        index = indexes_by_path[result.path]
+        if result.ok:
+            compact.set_content(index, result.content)
+        else:
+            compact.set_error(index, result.error, result.status_code)
+    return compact
+
+def extract_structure_symbols(parsed_data: dict) -> dict:
+    """
+    Parsing stage for the output of get_structure_and_code: extracts classes,
+    functions and imports of every file with a registered language extractor
+    (Python via ast) on a process pool.
+
+    Each such file node gains "symbols" (kind, name, qualified_name, line, end_line),
+    "imports" (repository paths the file imports) and "external_imports"
+    (module names that do not resolve inside the repository).
+    Returns the same dictionary.
+    """
+    files = parsed_data.get("files", [])
+    with SymbolExtractionPipeline() as pipeline:
+        pipeline.add_all((fn["relative_path"], fn["code"]) for fn in files if "code" in fn)
+        results = {result["path"]: result for result in pipeline.results()}
+    known_paths = {fn["relative_path"] for fn in files}
+    for file_node in files:
+        result = results.get(file_node["relative_path"])
+        if result is None:
+            continue
+        file_node["symbols"] = result["symbols"]
+        file_node["imports"], file_node["external_imports"] = resolve_imports(result, known_paths)
+    return parsed_data
@@ -0,0 +1,95 @@
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+# gitingest frames every file of the dump as:
+#
+#   ================================================
+#   FILE: src/app/page.jsx
+#   ================================================
+#   <file content>
+#
+BLOCK_DELIMITER = "=" * 48
+
+# Older gitingest releases write "File:", newer ones "FILE:". Symlinks get a
+# "SYMLINK:" header and are skipped along with their body.
+FILE_HEADER_PREFIXES = ("FILE:", "File:")
+SKIPPED_HEADER_PREFIXES = ("SYMLINK:", "Symlink:")
+
+_SKIP = object()
+
+
+def _iter_lines(text: str) -> Iterator[str]:
+    """
+    Yields the lines of `text` (with their line endings) without building a list of them.
+    """
+    start = 0
+    length = len(text)
+    while start < length:
+        end = text.find("\n", start)
+        if end == -1:
+            yield text[start:]
+            return
+        yield text[start:end + 1]
+        start = end + 1
+
+
+def _is_delimiter(line: str) -> bool:
+    return line.rstrip("\r\n") == BLOCK_DELIMITER
+
+
+def _parse_header(line: str) -> Optional[object]:
+    """
+    Returns the file path for a file header line, _SKIP for headers of blocks that are
+    not files, or None if the line is not a block header.
+    """
+    header = line.strip()
+    for prefix in FILE_HEADER_PREFIXES:
+        if header.startswith(prefix):
+            return header[len(prefix):].strip()
+    if header.startswith(SKIPPED_HEADER_PREFIXES):
+        return _SKIP
+    return None
+
+
+def iter_code_blocks(repo_code: Union[str, Iterable[str]]) -> Iterator[Tuple[str, str]]:
+    """
+    Streams (path, code) pairs out of a gitingest code dump, one file at a time.
+
+    `repo_code` is either the dump as a string or any iterable of lines, such as an
+    open file, so only the file currently being assembled is held in memory.
+    A block starts at a delimiter / header / delimiter triple; delimiter lines inside
+    file content that are not followed by a header are kept as content.
+    Paths are relative to the repository root, exactly as written in the header;
+    code is stripped of surrounding whitespace.
+    """
+    lines = _iter_lines(repo_code) if isinstance(repo_code, str) else iter(repo_code)
+    current_path: Optional[object] = None
+    buffer: List[str] = []
+    pending: List[str] = []  # Lookahead for a possible delimiter/header/delimiter triple.
+
+    def _consume_pending_line():
+        line = pending.pop(0)
+        if current_path is not None and current_path is not _SKIP:
+            buffer.append(line)
+
+    for line in lines:
+        pending.append(line)
+        while pending:
+            if not _is_delimiter(pending[0]):
+                _consume_pending_line()
+                continue
+            if len(pending) < 3:
+                break
+            header = _parse_header(pending[1])
+            if header is None or not _is_delimiter(pending[2]):
+                _consume_pending_line()
+                continue
+            if current_path is not None and current_path is not _SKIP:
+                yield current_path, "".join(buffer).strip()
+            current_path = header
+            buffer = []
+            pending.clear()
+
+    while pending:
+        _consume_pending_line()
+    if current_path is not None and current_path is not _SKIP:
+        yield current_path, "".join(buffer).strip()
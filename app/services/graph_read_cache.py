@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.core.config_provider import get_graph_read_config
+
+MISSING = object()
+
+
+class GraphReadCache:
+    """
+    Bounded LRU cache of graph read results with a time-to-live.
+
+    Keys start with the repository name. invalidate(repo) drops that repository's
+    entries and bumps its generation; a result computed from a read that started
+    before the invalidation is not stored, so a concurrent rewrite cannot leave
+    stale entries behind. The cache is per process; the TTL bounds how long other
+    workers keep serving results of a repository rewritten elsewhere.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        config = get_graph_read_config()
+        self.max_entries = config["cache_entries"] if max_entries is None else max_entries
+        self.ttl = config["cache_ttl"] if ttl is None else ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def generation(self, repo: str) -> int:
+        with self._lock:
+            return self._generations.get(repo, 0)
+
+    def get(self, key: Tuple) -> Any:
+        """
+        Returns the cached value, or MISSING.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple, value: Any, generation: int):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if self._generations.get(key[0], 0) != generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, repo: str):
+        with self._lock:
+            self._generations[repo] = self._generations.get(repo, 0) + 1
+            for key in [key for key in self._entries if key[0] == repo]:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+
+# Shared by all readers; insert_repo_structure and incremental_ingest invalidate it.
+graph_read_cache = GraphReadCache()
+
+
+def invalidate_repository(repo: str):
+    graph_read_cache.invalidate(repo)
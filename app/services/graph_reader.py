@@ -0,0 +1,323 @@
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config_provider import get_graph_read_config
+from app.core.metrics import registry, record_statement
+from app.services.blob_store import LocalBlobStore, get_blob_store
+from app.services.graph_read_cache import MISSING, GraphReadCache, graph_read_cache
+from app.services.neo4j_service import get_driver, query_name, register_query_names, to_full_path
+
+logger = logging.getLogger(__name__)
+
+# Read statements. Every lookup is labeled and goes through the (repo, full_path)
+# index; subtrees are selected by full_path prefix on the same index instead of
+# variable-length CONTAINS traversals. Only the listed properties are returned,
+# never whole nodes.
+GET_REPOSITORY_QUERY = """
+MATCH (r:Repository {name: $repo})
+RETURN r.name AS name, r.root AS root, r.source AS source, r.last_commit AS last_commit
+"""
+
+GET_DIRECTORY_QUERY = """
+MATCH (d:Directory {repo: $repo, full_path: $full_path})
+RETURN d.full_path AS full_path
+"""
+
+LIST_DIRECTORY_QUERY = """
+MATCH (:Directory {repo: $repo, full_path: $full_path})-[:CONTAINS]->(c)
+RETURN c.name AS name, c.full_path AS full_path, c:Directory AS is_directory,
+       c.size AS size, c.content_hash AS content_hash
+ORDER BY name
+"""
+
+LIST_REPOSITORY_ROOT_QUERY = """
+MATCH (:Repository {name: $repo})-[:HAS_DIRECTORY]->(c)
+RETURN c.name AS name, c.full_path AS full_path, c:Directory AS is_directory,
+       c.size AS size, c.content_hash AS content_hash
+ORDER BY name
+"""
+
+# Depth is the number of path segments; $max_segments (null for unlimited) keeps
+# deeper nodes out before the LIMIT, and shallower nodes sort first, so a
+# truncated subtree loses its deepest levels rather than arbitrary rows.
+SUBTREE_DIRECTORIES_QUERY = """
+MATCH (d:Directory {repo: $repo})
+WHERE d.full_path STARTS WITH $prefix
+WITH d, size(split(d.full_path, "/")) AS segments
+WHERE $max_segments IS NULL OR segments <= $max_segments
+RETURN d.name AS name, d.full_path AS full_path
+ORDER BY segments, full_path
+LIMIT $limit
+"""
+
+SUBTREE_FILES_QUERY = """
+MATCH (f:File {repo: $repo})
+WHERE f.full_path STARTS WITH $prefix
+WITH f, size(split(f.full_path, "/")) AS segments
+WHERE $max_segments IS NULL OR segments <= $max_segments
+RETURN f.name AS name, f.full_path AS full_path, f.size AS size, f.content_hash AS content_hash
+ORDER BY segments, full_path
+LIMIT $limit
+"""
+
+GET_FILE_QUERY = """
+MATCH (f:File {repo: $repo, full_path: $full_path})
+RETURN f.name AS name, f.full_path AS full_path, f.size AS size, f.content_hash AS content_hash
+"""
+
+# Rollups written at ingest (see directory_stats); one node read per request.
+GET_DIRECTORY_STATS_QUERY = """
+MATCH (d:Directory {repo: $repo, full_path: $full_path})
+RETURN d.file_count AS file_count, d.total_bytes AS total_bytes, d.line_count AS line_count,
+       d.extensions AS extensions, d.extension_counts AS extension_counts
+"""
+
+GET_REPOSITORY_STATS_QUERY = """
+MATCH (r:Repository {name: $repo})
+RETURN r.file_count AS file_count, r.total_bytes AS total_bytes, r.line_count AS line_count,
+       r.extensions AS extensions, r.extension_counts AS extension_counts
+"""
+
+register_query_names(globals())
+
+_CACHE_HITS = registry.counter(
+    "repo_parser_graph_read_cache_hits_total", "Graph reads served from the read cache, by kind.", ("kind",)
+)
+_CACHE_MISSES = registry.counter(
+    "repo_parser_graph_read_cache_misses_total", "Graph reads that went to Neo4j, by kind.", ("kind",)
+)
+
+def _parent_path(full_path: str) -> str:
+    return full_path.rsplit("/", 1)[0] if "/" in full_path else ""
+
+
+class GraphReader:
+    """
+    Read API over the repository graph for subtrees, directory listings and files.
+
+    Paths are relative to the repository root, as in the rest of the API, and are
+    mapped to full_path keys through Repository.root. Results are served from the
+    shared GraphReadCache while valid; file contents come from the blob store by
+    the File node's content_hash.
+    """
+
+    def __init__(
+        self, neo4j_driver=None, cache: Optional[GraphReadCache] = None,
+        blob_store: Optional[LocalBlobStore] = None,
+    ):
+        self.driver = neo4j_driver
+        self.cache = cache or graph_read_cache
+        self.blob_store = blob_store
+        config = get_graph_read_config()
+        self.max_cached_content = config["max_cached_content"]
+        self.max_subtree_nodes = config["max_subtree_nodes"]
+
+    def _read(self, query: str, **params) -> List[Dict[str, Any]]:
+        driver = self.driver if self.driver is not None else get_driver()
+        started = time.perf_counter()
+        with driver.session() as session:
+            records = session.execute_read(lambda tx: [record.data() for record in tx.run(query, **params)])
+        record_statement(query_name(query), 0, time.perf_counter() - started)
+        return records
+
+    def _cached(self, kind: str, repo: str, args: Tuple, load: Callable[[], Any], cacheable=lambda value: True) -> Any:
+        key = (repo, kind) + args
+        value = self.cache.get(key)
+        if value is not MISSING:
+            _CACHE_HITS.inc(kind=kind)
+            return value
+        _CACHE_MISSES.inc(kind=kind)
+        generation = self.cache.generation(repo)
+        value = load()
+        if cacheable(value):
+            self.cache.put(key, value, generation)
+        return value
+
+    def repository(self, repo: str) -> Optional[Dict[str, Any]]:
+        def load():
+            records = self._read(GET_REPOSITORY_QUERY, repo=repo)
+            return records[0] if records else None
+        return self._cached("repository", repo, (), load)
+
+    def _full_path(self, repo: str, path: Optional[str]) -> Optional[Tuple[str, str]]:
+        """
+        Returns (root, full_path) for a repository-relative path, or None if the
+        repository is unknown. The repository root itself maps to (root, root).
+        """
+        repository = self.repository(repo)
+        if repository is None:
+            return None
+        root = repository.get("root") or ""
+        path = (path or "").strip("/")
+        return root, to_full_path(root, path) if path else root
+
+    @staticmethod
+    def _relative(root: str, full_path: str) -> str:
+        return full_path[len(root) + 1:] if root and full_path.startswith(root + "/") else full_path
+
+    def list_directory(self, repo: str, path: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        The direct children of a directory as { name, path, type, size, content_hash },
+        sorted by name; None if the repository or directory does not exist.
+        """
+        resolved = self._full_path(repo, path)
+        if resolved is None:
+            return None
+        root, full_path = resolved
+
+        def load():
+            if full_path:
+                records = self._read(LIST_DIRECTORY_QUERY, repo=repo, full_path=full_path)
+                if not records and not self._read(GET_DIRECTORY_QUERY, repo=repo, full_path=full_path):
+                    return None
+            else:
+                records = self._read(LIST_REPOSITORY_ROOT_QUERY, repo=repo)
+            return [self._entry(root, record) for record in records]
+        return self._cached("children", repo, (full_path,), load)
+
+    def _entry(self, root: str, record: Dict[str, Any]) -> Dict[str, Any]:
+        entry = {
+            "name": record["name"],
+            "path": self._relative(root, record["full_path"]),
+            "type": "directory" if record.get("is_directory") else "file",
+        }
+        if entry["type"] == "file":
+            entry["size"] = record.get("size")
+            entry["content_hash"] = record.get("content_hash")
+        return entry
+
+    def subtree(self, repo: str, path: Optional[str] = None, max_depth: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        The nested tree below a directory, down to max_depth levels, as
+        { name, path, type, children } nodes (files also carry size and content_hash).
+        Trees larger than max_subtree_nodes lose their deepest levels first and are
+        marked "truncated".
+        None if the repository or directory does not exist.
+        """
+        resolved = self._full_path(repo, path)
+        if resolved is None:
+            return None
+        root, full_path = resolved
+
+        def load():
+            prefix = f"{full_path}/" if full_path else ""
+            limit = self.max_subtree_nodes + 1
+            base_segments = full_path.count("/") + 1 if full_path else 0
+            max_segments = base_segments + max_depth if max_depth is not None else None
+            directories = self._read(
+                SUBTREE_DIRECTORIES_QUERY, repo=repo, prefix=prefix, max_segments=max_segments, limit=limit
+            )
+            files = self._read(
+                SUBTREE_FILES_QUERY, repo=repo, prefix=prefix, max_segments=max_segments, limit=limit
+            )
+            if full_path and not directories and not files and not self._read(
+                GET_DIRECTORY_QUERY, repo=repo, full_path=full_path
+            ):
+                return None
+            truncated = len(directories) + len(files) > self.max_subtree_nodes
+            relative = self._relative(root, full_path) if full_path != root else ""
+            tree = {"name": relative.rsplit("/", 1)[-1] if relative else repo, "path": relative,
+                    "type": "directory", "children": []}
+            nodes = {full_path: tree}
+            directories = sorted(directories, key=lambda record: record["full_path"])
+            for record in directories:
+                nodes[record["full_path"]] = {
+                    "name": record["name"], "path": self._relative(root, record["full_path"]),
+                    "type": "directory", "children": [],
+                }
+            # Parents sort before their children, so every parent is linked in by now.
+            for record in directories:
+                parent = nodes.get(_parent_path(record["full_path"]))
+                if parent is not None:
+                    parent["children"].append(nodes[record["full_path"]])
+            for record in files:
+                parent = nodes.get(_parent_path(record["full_path"]))
+                if parent is not None:
+                    parent["children"].append({**self._entry(root, record), "type": "file"})
+            for node in nodes.values():
+                node["children"].sort(key=lambda child: child["name"])
+            if truncated:
+                tree["truncated"] = True
+            return tree
+        return self._cached("subtree", repo, (full_path, max_depth), load)
+
+    def directory_stats(self, repo: str, path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        The aggregates stored at ingest for a directory (the whole repository by
+        default): { path, file_count, total_bytes, line_count, extensions } with
+        extensions mapping each extension to its file count, most frequent first.
+        None if the directory does not exist; counts are None for repositories
+        ingested before aggregates were written.
+        """
+        resolved = self._full_path(repo, path)
+        if resolved is None:
+            return None
+        root, full_path = resolved
+
+        def load():
+            if path and path.strip("/"):
+                records = self._read(GET_DIRECTORY_STATS_QUERY, repo=repo, full_path=full_path)
+            else:
+                records = self._read(GET_REPOSITORY_STATS_QUERY, repo=repo)
+            if not records:
+                return None
+            record = records[0]
+            return {
+                "path": self._relative(root, full_path) if full_path != root else "",
+                "file_count": record["file_count"],
+                "total_bytes": record["total_bytes"],
+                "line_count": record["line_count"],
+                "extensions": dict(zip(record["extensions"] or [], record["extension_counts"] or [])),
+            }
+        return self._cached("stats", repo, (full_path,), load)
+
+    def file(self, repo: str, path: str) -> Optional[Dict[str, Any]]:
+        """
+        File metadata { name, path, size, content_hash }, or None.
+        """
+        resolved = self._full_path(repo, path)
+        if resolved is None:
+            return None
+        root, full_path = resolved
+
+        def load():
+            records = self._read(GET_FILE_QUERY, repo=repo, full_path=full_path)
+            if not records:
+                return None
+            return {**self._entry(root, records[0]), "type": "file"}
+        return self._cached("file", repo, (full_path,), load)
+
+    def file_content(self, repo: str, path: str) -> Optional[str]:
+        """
+        The file's content from the blob store, or None if the file or its blob is missing.
+        Contents up to max_cached_content bytes are cached.
+        """
+        metadata = self.file(repo, path)
+        if metadata is None or not metadata.get("content_hash"):
+            return None
+        content_hash = metadata["content_hash"]
+
+        def load():
+            try:
+                return (self.blob_store or get_blob_store()).get_text(content_hash)
+            except KeyError:
+                logger.warning(f"Blob {content_hash} of {repo}/{path} is missing from the blob store")
+                return None
+        return self._cached(
+            "content", repo, (content_hash,), load,
+            cacheable=lambda value: value is not None and len(value) <= self.max_cached_content,
+        )
+
+
+_default_reader: Optional[GraphReader] = None
+
+
+def get_graph_reader() -> GraphReader:
+    """
+    Returns the process-wide reader over the shared driver, cache and blob store.
+    """
+    global _default_reader
+    if _default_reader is None:
+        _default_reader = GraphReader()
+    return _default_reader
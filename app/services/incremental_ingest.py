@@ -0,0 +1,472 @@
+import logging
+import os
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from app.services.neo4j_service import (
+    GraphBatchWriter,
+    LINK_DIRECTORIES_QUERY,
+    LINK_FILES_QUERY,
+    LINK_ROOT_DIRECTORIES_QUERY,
+    LINK_ROOT_FILES_QUERY,
+    MERGE_DIRECTORIES_QUERY,
+    MERGE_FILES_QUERY,
+    MERGE_SKIPPED_FILES_QUERY,
+    DELETE_FILE_SYMBOLS_QUERY,
+    SET_DIRECTORY_AGGREGATES_QUERY,
+    SET_REPOSITORY_AGGREGATES_QUERY,
+    SymbolWriter,
+    content_hash,
+    get_driver,
+    register_query_names,
+    store_file_content,
+    to_full_path,
+)
+from app.core.config_provider import get_search_index_config, get_symbol_extraction_config
+from app.core.metrics import stage_timer
+from app.modules.code_provider.local_repo.ingest_stream import SYMLINK, TEXT, FileRecord, RepoIngestStream
+from app.modules.code_provider.local_repo.repo_walker import RepoWalker
+from app.services.directory_stats import DirectoryStats, chain_deltas, file_extension, parent_path
+from app.services.search_index import SearchIndexStore, TrigramIndexBuilder, get_search_index_store
+from app.services.symbol_extractor import SymbolExtractionPipeline
+from app.services.blob_store import LocalBlobStore, get_blob_store
+from app.services.graph_read_cache import invalidate_repository
+
+logger = logging.getLogger(__name__)
+
+# Git file mode of symlinks; their blob holds the link target, never the target's content.
+_SYMLINK_MODE = 0o120000
+
+GET_REPOSITORY_STATE_QUERY = """
+MATCH (r:Repository {source: $source})
+RETURN r.name AS name, r.root AS root, r.last_commit AS last_commit,
+       r.file_count AS file_count, r.total_bytes AS total_bytes, r.line_count AS line_count,
+       r.extensions AS extensions, r.extension_counts AS extension_counts
+LIMIT 1
+"""
+
+GET_FILE_HASHES_QUERY = """
+UNWIND $paths AS path
+MATCH (f:File {repo: $repo, full_path: path})
+RETURN f.full_path AS full_path, f.content_hash AS content_hash, f.size AS size, f.line_count AS line_count,
+       f.skipped AS skipped, f.sha256 AS sha256
+"""
+
+GET_EXISTING_FILES_QUERY = """
+UNWIND $paths AS path
+MATCH (f:File {repo: $repo, full_path: path})
+RETURN f.full_path AS full_path
+"""
+
+GET_DIRECTORY_AGGREGATES_QUERY = """
+UNWIND $paths AS path
+MATCH (d:Directory {repo: $repo, full_path: path})
+RETURN d.full_path AS full_path, d.file_count AS file_count, d.total_bytes AS total_bytes,
+       d.line_count AS line_count, d.extensions AS extensions, d.extension_counts AS extension_counts
+"""
+
+DELETE_FILES_QUERY = """
+UNWIND $rows AS row
+MATCH (f:File {repo: $repo, full_path: row.full_path})
+DETACH DELETE f
+"""
+
+# Only directories left without children are removed; callers pass one depth
+# level per statement, deepest first, so emptied parents are seen as empty.
+DELETE_EMPTY_DIRECTORIES_QUERY = """
+UNWIND $rows AS row
+MATCH (d:Directory {repo: $repo, full_path: row.full_path})
+WHERE NOT (d)-[:CONTAINS]->()
+DETACH DELETE d
+"""
+
+SET_LAST_COMMIT_QUERY = """
+MATCH (r:Repository {name: $repo})
+SET r.last_commit = $commit
+"""
+
+register_query_names(globals())
+
+
+def resolve_local_source(path: Optional[str]) -> Optional[str]:
+    """
+    Returns the absolute path if `path` is a local directory, otherwise None (remote URL).
+    """
+    if path and os.path.isdir(path):
+        return os.path.abspath(path)
+    return None
+
+
+def get_head_commit(repo_path: str) -> Optional[str]:
+    """
+    Returns the HEAD commit of a local git checkout, or None if it is not a git repository.
+    """
+    # GitPython runs `git version` when imported, so it is only loaded when needed.
+    from git import Repo
+    from git.exc import InvalidGitRepositoryError, NoSuchPathError
+
+    try:
+        return Repo(repo_path).head.commit.hexsha
+    except (InvalidGitRepositoryError, NoSuchPathError, ValueError):
+        return None
+
+
+def is_clean_checkout(repo_path: str) -> bool:
+    """
+    True if the working tree matches HEAD (no modified, staged or untracked files),
+    so what an ingest reads from disk is exactly the HEAD commit.
+    """
+    from git import Repo
+    from git.exc import GitCommandError, InvalidGitRepositoryError, NoSuchPathError
+
+    try:
+        return not Repo(repo_path).is_dirty(untracked_files=True)
+    except (GitCommandError, InvalidGitRepositoryError, NoSuchPathError):
+        return False
+
+
+def _ancestors(full_path: str, root: str) -> List[str]:
+    """
+    Directory full_paths between the repository root (exclusive) and the file, outermost first.
+    """
+    parts = full_path.split("/")[:-1]
+    ancestors = ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+    if root:
+        return [a for a in ancestors if a.startswith(root + "/")]
+    return ancestors
+
+
+def _probe_path(commit_tree, relative_paths: Iterable[str], walker: RepoWalker, source_path: str) -> Optional[str]:
+    """
+    A file of a commit tree next to the most deeply nested of `relative_paths`, that
+    the walker lists: the nearest existing ancestor directory is listed (one tree
+    object per level, like `git ls-tree <commit> <dir>/`), never the whole tree.
+    """
+    deepest = max(relative_paths, key=lambda path: path.count("/"), default=None)
+    if deepest is None:
+        return None
+    directory = parent_path(deepest)
+    while directory:
+        try:
+            tree = commit_tree / directory
+        except KeyError:
+            directory = parent_path(directory)
+            continue
+        for blob in tree.blobs:
+            if walker.includes(blob.path, source_path, blob.size):
+                return blob.path
+        directory = parent_path(directory)
+    return None
+
+
+def update_aggregates(
+    writer: GraphBatchWriter,
+    repo_name: str,
+    root: str,
+    repository: Dict[str, Any],
+    file_rows: List[Dict[str, Any]],
+    deleted_full_paths: Set[str],
+    stored_files: Dict[str, Dict[str, Any]],
+):
+    """
+    Adjusts the directory aggregates of an incremental update: every written or
+    deleted file contributes the difference to its previous version, and only the
+    directories on those files' ancestor chains (plus the Repository node) are read
+    and rewritten.
+    """
+    file_deltas = []
+    for row in file_rows:
+        previous = stored_files.get(row["full_path"])
+        delta = DirectoryStats(total_bytes=row["size"], line_count=row["line_count"])
+        if previous is None:
+            delta.file_count = 1
+            delta.extensions[file_extension(row["name"])] = 1
+        else:
+            delta.total_bytes -= previous["size"] or 0
+            delta.line_count -= previous["line_count"] or 0
+        file_deltas.append((row["full_path"], delta))
+    for full_path in deleted_full_paths:
+        previous = stored_files.get(full_path)
+        if previous is None:
+            continue
+        file_deltas.append((full_path, DirectoryStats(
+            -1, -(previous["size"] or 0), -(previous["line_count"] or 0),
+            Counter({file_extension(full_path.rsplit("/", 1)[-1]): -1}),
+        )))
+    if not file_deltas:
+        return
+    deltas = chain_deltas(file_deltas, root)
+    repository_delta = deltas.pop("")
+    current = {
+        record["full_path"]: DirectoryStats.from_properties(record)
+        for record in writer.read(GET_DIRECTORY_AGGREGATES_QUERY, paths=sorted(deltas), repo=repo_name)
+    }
+    rows = []
+    for full_path, delta in deltas.items():
+        stats = current.get(full_path) or DirectoryStats()
+        stats.add(delta)
+        rows.append({"full_path": full_path, **stats.to_properties()})
+    writer.write_rows(SET_DIRECTORY_AGGREGATES_QUERY, rows, repo=repo_name)
+    totals = DirectoryStats.from_properties(repository)
+    totals.add(repository_delta)
+    writer.run(SET_REPOSITORY_AGGREGATES_QUERY, repo=repo_name, **totals.to_properties())
+
+
+def incremental_ingest(
+    source_path: str,
+    batch_size: Optional[int] = None,
+    dry_run: bool = False,
+    neo4j_driver=None,
+    blob_store: Optional[LocalBlobStore] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    search_index_store: Optional[SearchIndexStore] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Updates an already ingested local checkout using the git diff between the
+    Repository node's last_commit and the current HEAD.
+
+    Only added, modified, renamed and deleted files are touched: changed files are
+    read from the HEAD commit, classified like a full native ingest (walker
+    excludes and .gitignore, binary, oversized and skip-glob files), and stored in
+    the blob store and re-pointed when their content hash differs; files from
+    deleted, renamed-away or newly excluded paths are removed in batches together
+    with any directories left empty. The search index is rebuilt from the previous index
+    plus the written files, so unchanged files are not re-read, and directory
+    aggregates are adjusted along the ancestor chains of the touched files only.
+    Nothing here walks the whole repository: imports of the changed files are
+    resolved against the graph. With dry_run the stored graph is read and the
+    update planned as usual, but nothing is written.
+
+    Returns None when an incremental update is not possible (not a git repository,
+    never ingested, the recorded commit is unknown, or the graph's file keys do
+    not match that commit); the caller should then run a full ingest.
+    """
+    head_commit = get_head_commit(source_path)
+    if head_commit is None:
+        return None
+    from git import Repo
+    from git.exc import BadName, GitCommandError
+
+    # A dry run still reads the stored graph, which the update is planned against.
+    writer = GraphBatchWriter(
+        neo4j_driver if neo4j_driver is not None else get_driver(),
+        batch_size=batch_size, dry_run=dry_run, progress=progress,
+    )
+    records = writer.read(GET_REPOSITORY_STATE_QUERY, source=source_path)
+    if not records or not records[0]["last_commit"]:
+        return None
+    repo_name = records[0]["name"]
+    root = records[0]["root"] or ""
+    last_commit = records[0]["last_commit"]
+
+    repo = Repo(source_path)
+    try:
+        diff = repo.commit(last_commit).diff(head_commit)
+    except (BadName, GitCommandError, ValueError) as e:
+        logger.warning(f"Cannot diff {source_path} from {last_commit}: {e}")
+        return None
+
+    # Changed blobs go through the same filters and classification as a full native
+    # ingest: paths the walker would not list (exclude globs, .gitignore, size limit)
+    # are treated as removed, and binary, oversized or skip-glob files are written
+    # as skipped File nodes without content. The repository budget only applies to
+    # full ingests.
+    walker = RepoWalker()
+    classifier = RepoIngestStream(source_path, max_repo_bytes=0, walker=walker)
+    changed: Dict[str, str] = {}
+    skipped: Dict[str, FileRecord] = {}
+    relative_paths: Dict[str, str] = {}
+    deleted = set()
+    for item in diff:
+        if item.change_type == "D":
+            deleted.add(item.a_path)
+            continue
+        if item.change_type == "R":
+            deleted.add(item.a_path)
+        if item.b_blob is None:
+            continue
+        if not walker.includes(item.b_path, source_path, item.b_blob.size):
+            deleted.add(item.b_path)
+            continue
+        if item.b_mode == _SYMLINK_MODE:
+            record = FileRecord(item.b_path, SYMLINK, item.b_blob.size)
+        else:
+            record = classifier.classify(item.b_path, item.b_blob.size, item.b_blob.data_stream)
+        full_path = to_full_path(root, item.b_path)
+        if record.kind == TEXT:
+            # Stripped like the code blocks of a full ingest, so content hashes match.
+            changed[full_path] = record.content.strip()
+        else:
+            skipped[full_path] = record
+        relative_paths[full_path] = item.b_path
+    deleted_full_paths = {to_full_path(root, path) for path in deleted} - set(relative_paths)
+
+    # Files of the previous commit the walker lists must already be in the graph
+    # under the same full_path. Graphs written before the directory structure
+    # parser handled nested "│   " prefixes keyed nested files wrongly, and
+    # updating those in place would add duplicates next to the stale nodes; any
+    # mismatch (including changed .gitignore rules) gets a full ingest instead.
+    expected_paths = [
+        item.a_path for item in diff
+        if item.a_blob is not None and walker.includes(item.a_path, source_path, item.a_blob.size)
+    ]
+    expected = {to_full_path(root, path) for path in expected_paths}
+    if not any("/" in path for path in expected_paths):
+        # Only top-level files (or only additions) were touched; check one nested
+        # file next to the changes, so a wrongly keyed graph is still caught.
+        probe = _probe_path(repo.commit(last_commit).tree, relative_paths.values(), walker, source_path)
+        if probe is not None:
+            expected.add(to_full_path(root, probe))
+
+    # Skip files whose stored content hash already matches (e.g. mode-only changes).
+    # Sizes and line counts of the stored versions feed the directory aggregate deltas.
+    stored_files = {
+        record["full_path"]: record
+        for record in writer.read(
+            GET_FILE_HASHES_QUERY, paths=sorted(set(relative_paths) | deleted_full_paths | expected), repo=repo_name
+        )
+    }
+    missing = expected - set(stored_files)
+    if missing:
+        logger.warning(
+            f"{len(missing)} files of {repo_name} at {last_commit[:8]} are not in the graph under the "
+            f"expected paths, e.g. {sorted(missing)[:5]}; running a full ingest instead"
+        )
+        return None
+    blob_store = blob_store or get_blob_store()
+    file_rows = []
+    for full_path, code in changed.items():
+        stored = stored_files.get(full_path)
+        if stored is not None and stored["content_hash"] == content_hash(code):
+            continue
+        file_rows.append({
+            "full_path": full_path,
+            "name": full_path.rsplit("/", 1)[-1],
+            **store_file_content(code, blob_store, dry_run),
+        })
+    skipped_rows = []
+    for full_path, record in skipped.items():
+        stored = stored_files.get(full_path)
+        if (stored is not None and stored["skipped"] == record.kind and stored["size"] == record.size
+                and stored["sha256"] == record.sha256):
+            continue
+        skipped_rows.append({
+            "full_path": full_path, "name": full_path.rsplit("/", 1)[-1],
+            "kind": record.kind, "size": record.size, "sha256": record.sha256, "line_count": 0,
+        })
+
+    # New files may live in new directories; MERGE makes re-sending existing ones a no-op.
+    directory_rows: Dict[str, Dict[str, str]] = {}
+    directory_edges: Dict[str, Dict[str, str]] = {}
+    file_edges = []
+    # Without a single root directory, top-level entries hang off the Repository node.
+    root_directories: Dict[str, Dict[str, str]] = {}
+    root_files = []
+    for row in file_rows + skipped_rows:
+        parent = root
+        for directory in _ancestors(row["full_path"], root):
+            directory_rows[directory] = {"full_path": directory, "name": directory.rsplit("/", 1)[-1]}
+            if parent:
+                directory_edges[directory] = {"parent": parent, "child": directory}
+            else:
+                root_directories[directory] = {"full_path": directory}
+            parent = directory
+        if parent:
+            file_edges.append({"parent": parent, "child": row["full_path"]})
+        else:
+            root_files.append({"full_path": row["full_path"]})
+
+    if not dry_run:
+        invalidate_repository(repo_name)
+    writer.write_rows(MERGE_DIRECTORIES_QUERY, directory_rows.values(), repo=repo_name)
+    writer.write_rows(MERGE_FILES_QUERY, file_rows, repo=repo_name)
+    writer.write_rows(MERGE_SKIPPED_FILES_QUERY, skipped_rows, repo=repo_name)
+    writer.write_rows(LINK_DIRECTORIES_QUERY, directory_edges.values(), repo=repo_name)
+    writer.write_rows(LINK_FILES_QUERY, file_edges, repo=repo_name)
+    writer.write_rows(LINK_ROOT_DIRECTORIES_QUERY, root_directories.values(), repo=repo_name)
+    writer.write_rows(LINK_ROOT_FILES_QUERY, root_files, repo=repo_name)
+
+    symbol_stats = None
+    if get_symbol_extraction_config()["enabled"]:
+        written_paths = {relative_paths[row["full_path"]] for row in file_rows + skipped_rows}
+
+        def lookup_paths(candidates: List[str]) -> List[str]:
+            # Import targets are resolved against the graph (plus this update's
+            # files, which a dry run does not write), not the whole HEAD tree.
+            full_paths = {to_full_path(root, path): path for path in candidates}
+            found = {
+                record["full_path"]
+                for record in writer.read(GET_EXISTING_FILES_QUERY, paths=sorted(full_paths), repo=repo_name)
+            }
+            return [
+                path for full_path, path in full_paths.items()
+                if (full_path in found or path in written_paths) and full_path not in deleted_full_paths
+            ]
+
+        symbol_writer = SymbolWriter(writer, repo_name, root, replace=True, lookup_paths=lookup_paths)
+        with SymbolExtractionPipeline(on_result=symbol_writer.add) as symbol_pipeline:
+            symbol_pipeline.add_all((relative_paths[row["full_path"]], changed[row["full_path"]]) for row in file_rows)
+            symbol_pipeline.flush()
+        symbol_stats = symbol_writer.finish()
+        # Symbols of removed files, and of files that lost their content, would
+        # otherwise be left behind.
+        writer.write_rows(
+            DELETE_FILE_SYMBOLS_QUERY,
+            ({"full_path": p} for p in sorted(deleted_full_paths | {row["full_path"] for row in skipped_rows})),
+            repo=repo_name,
+        )
+
+    writer.write_rows(DELETE_FILES_QUERY, ({"full_path": p} for p in sorted(deleted_full_paths)), repo=repo_name)
+    emptied_by_depth = defaultdict(set)
+    for full_path in deleted_full_paths:
+        for directory in _ancestors(full_path, root):
+            emptied_by_depth[directory.count("/")].add(directory)
+    for depth in sorted(emptied_by_depth, reverse=True):
+        writer.write_rows(
+            DELETE_EMPTY_DIRECTORIES_QUERY,
+            ({"full_path": p} for p in sorted(emptied_by_depth[depth])),
+            repo=repo_name,
+        )
+
+    if records[0]["file_count"] is None:
+        logger.info(f"{repo_name} has no directory aggregates; they are computed by the next full ingest")
+    else:
+        with stage_timer("aggregates"):
+            update_aggregates(
+                writer, repo_name, root, records[0], file_rows + skipped_rows, deleted_full_paths, stored_files
+            )
+
+    search_index_stats = None
+    if get_search_index_config()["enabled"] and not dry_run:
+        search_index_store = search_index_store or get_search_index_store()
+        previous_index = search_index_store.open(repo_name)
+        if previous_index is None:
+            logger.info(f"No search index for {repo_name}; it is built by the next full ingest")
+        else:
+            index_builder = TrigramIndexBuilder(repo_name, commit=head_commit)
+            rewritten = {relative_paths[row["full_path"]] for row in file_rows + skipped_rows}
+            index_builder.add_from(previous_index, exclude_paths=rewritten | deleted)
+            for row in file_rows:
+                index_builder.add(relative_paths[row["full_path"]], row["content_hash"], changed[row["full_path"]])
+            search_index_stats = search_index_store.write(index_builder)
+
+    writer.run(SET_LAST_COMMIT_QUERY, repo=repo_name, commit=head_commit)
+    if not dry_run:
+        # Drops whatever reads cached while the update was being written.
+        invalidate_repository(repo_name)
+    logger.info(
+        f"Incremental ingest of {repo_name}: {last_commit[:8]}..{head_commit[:8]}, "
+        f"{len(file_rows)} files written, {len(skipped_rows)} skipped, {len(deleted_full_paths)} removed"
+    )
+    return {
+        "repo": repo_name,
+        "mode": "incremental",
+        "from_commit": last_commit,
+        "to_commit": head_commit,
+        "files_written": len(file_rows),
+        "files_skipped": len(skipped_rows),
+        "files_deleted": len(deleted_full_paths),
+        "symbols": symbol_stats,
+        "search_index": search_index_stats,
+        "write_stats": writer.stats(),
+    }
@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config_provider import get_ingest_config, get_ingest_job_config
+from app.core.metrics import INGEST_JOBS, INGEST_JOBS_RUNNING, JobStats, bind_job_stats, record_stage
+from app.modules.code_provider.local_repo.ingest_stream import RepoIngestStream
+from app.services.incremental_ingest import (
+    get_head_commit,
+    incremental_ingest,
+    is_clean_checkout,
+    resolve_local_source,
+)
+from app.services.neo4j_service import insert_repo_structure
+from app.services.repo_snapshot import get_snapshot_store
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+@dataclass
+class IngestJob:
+    """
+    State of one repository ingest as reported by GET /api/repo/jobs/{id}.
+
+    `stage` is the pipeline step currently running, `stage_timings` the wall-clock
+    seconds of every finished step, and `progress` free-form counters the steps
+    publish while they run (e.g. graph rows written so far). `stats` collects the
+    durations, byte and file counts and Neo4j statement counts the pipeline records
+    (see app.core.metrics) while the job runs.
+    """
+    id: str
+    repo_key: str
+    status: str = QUEUED
+    stage: Optional[str] = None
+    progress: Dict[str, Any] = field(default_factory=dict)
+    stage_timings: Dict[str, float] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    stats: JobStats = field(default_factory=JobStats)
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    @contextmanager
+    def stage_timer(self, stage: str):
+        """
+        Marks `stage` as current and records its duration when it ends.
+        """
+        self.stage = stage
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stage_timings[stage] = round(elapsed, 4)
+            record_stage(stage, elapsed)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "repo": self.repo_key,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": dict(self.progress),
+            "stage_timings": dict(self.stage_timings),
+            "metrics": self.stats.to_dict(),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class IngestJobManager:
+    """
+    Runs ingest jobs on a bounded thread pool, off the event loop.
+
+    Submissions are deduplicated per repository: while a job for the same repo key
+    is queued or running, submitting again returns that job instead of starting a
+    second one. Finished jobs are kept for status queries up to `history_size`,
+    oldest evicted first.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, history_size: Optional[int] = None):
+        config = get_ingest_job_config()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or config["max_workers"], thread_name_prefix="ingest"
+        )
+        self.history_size = history_size or config["history_size"]
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._active_by_repo: Dict[str, IngestJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, repo_key: str, run: Callable[[IngestJob], Dict[str, Any]]) -> Tuple[IngestJob, bool]:
+        """
+        Queues `run(job)` for the repository. Returns (job, created); created is False
+        when an active job for the same repository was returned instead.
+        """
+        with self._lock:
+            existing = self._active_by_repo.get(repo_key)
+            if existing is not None and existing.active:
+                return existing, False
+            job = IngestJob(id=uuid.uuid4().hex, repo_key=repo_key)
+            self._jobs[job.id] = job
+            self._active_by_repo[repo_key] = job
+            self._evict_finished()
+        future = self.executor.submit(self._run, job, run)
+        future.add_done_callback(lambda f: self._cancelled(job) if f.cancelled() else None)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: IngestJob, run: Callable[[IngestJob], Dict[str, Any]]):
+        job.status = RUNNING
+        job.started_at = time.time()
+        INGEST_JOBS_RUNNING.inc()
+        try:
+            with bind_job_stats(job.stats):
+                job.result = run(job)
+            job.status = SUCCEEDED
+        except Exception as e:
+            logger.error(f"Ingest job {job.id} for {job.repo_key} failed in stage {job.stage}: {e}", exc_info=True)
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            INGEST_JOBS_RUNNING.dec()
+            INGEST_JOBS.inc(status=job.status)
+            logger.info(
+                f"Ingest job {job.id} for {job.repo_key} {job.status} in "
+                f"{job.finished_at - job.started_at:.2f}s; stages: {job.stage_timings}"
+            )
+            with self._lock:
+                if self._active_by_repo.get(job.repo_key) is job:
+                    del self._active_by_repo[job.repo_key]
+
+    def _cancelled(self, job: IngestJob):
+        # A queued job dropped at shutdown never reaches _run.
+        job.status = FAILED
+        job.error = "Cancelled: the server shut down before the job started"
+        job.finished_at = time.time()
+        INGEST_JOBS.inc(status=job.status)
+        logger.info(f"Ingest job {job.id} for {job.repo_key} cancelled before it started")
+        with self._lock:
+            if self._active_by_repo.get(job.repo_key) is job:
+                del self._active_by_repo[job.repo_key]
+
+    def _evict_finished(self):
+        # Caller holds the lock. Active jobs are never evicted.
+        if len(self._jobs) <= self.history_size:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if not job.active]:
+            if len(self._jobs) <= self.history_size:
+                break
+            del self._jobs[job_id]
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stops the pool: queued jobs are cancelled and marked failed, running ones
+        finish (and are waited for when `wait` is set).
+        """
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def run_parse_job(job: IngestJob, path: str, incremental: bool = False) -> Dict[str, Any]:
+    """
+    The /repo/parse pipeline: optional incremental update, otherwise a full ingest
+    followed by the graph write. Runs on an IngestJobManager worker thread.
+
+    Local checkouts are read by RepoIngestStream, which streams classified file
+    records into the graph write (INGEST_PRODUCER=gitingest restores the gitingest
+    dump); remote URLs always go through gitingest.
+
+    A full ingest of a local checkout whose HEAD already has a snapshot rebuilds
+    the graph from the snapshot instead of running gitingest; otherwise a clean
+    checkout gets a snapshot written at the end of the ingest.
+    """
+    source = resolve_local_source(path)
+    if incremental and source:
+        with job.stage_timer("incremental"):
+            # Falls back to a full ingest when the checkout was never ingested
+            # or its last ingested commit can no longer be diffed against.
+            result = incremental_ingest(source, progress=job.progress.update)
+        if result is not None:
+            return result
+
+    commit = get_head_commit(source) if source else None
+    # Snapshots are keyed by commit, so they only stand for a checkout without local changes.
+    clean = bool(commit) and is_clean_checkout(source)
+    if not clean:
+        # Local changes are read from the working tree, so the graph matches no
+        # commit. Leaving Repository.last_commit unset makes the next incremental
+        # request run a full ingest instead of diffing from HEAD past those changes.
+        commit = None
+    snapshot = get_snapshot_store().open(source, commit) if clean else None
+    if snapshot is not None:
+        job.progress["snapshot"] = commit
+        with snapshot, job.stage_timer("graph_write"):
+            return insert_repo_structure(snapshot.to_parsed_data(), progress=job.progress.update)
+
+    if source and get_ingest_config()["producer"] == "native":
+        stream = RepoIngestStream(source)
+        with job.stage_timer("walk"):
+            stream.walk()
+        job.progress["files"] = stream.file_count
+        repo_data = {
+            "repo_info": stream.summary(),
+            "directory_structure": stream.tree_text(),
+            # Read lazily while the graph is written, a read-ahead window at a time.
+            "files": stream.iter_records(),
+            "source": source,
+            "commit": commit,
+            "snapshot": clean,
+        }
+        with job.stage_timer("graph_write"):
+            result = insert_repo_structure(repo_data, progress=job.progress.update)
+        result["ingest"] = stream.stats()
+        return result
+
+    from gitingest import ingest_async
+
+    with job.stage_timer("ingest"):
+        summary, directory_structure, additional_data = asyncio.run(ingest_async(path))
+    if not directory_structure.strip():
+        raise ValueError("Empty directory structure received from ingest_async.")
+    record_stage("ingest", size=len(additional_data))
+
+    repo_data = {
+        "repo_info": summary.strip(),
+        "directory_structure": directory_structure.strip(),
+        # Not stripped: the block parser strips each file, and copying a
+        # multi-gigabyte dump just to trim it would double peak memory.
+        "repo_code": additional_data,
+        "source": source,
+        "commit": commit,
+        "snapshot": clean,
+    }
+    del summary, additional_data
+
+    with job.stage_timer("graph_write"):
+        return insert_repo_structure(repo_data, progress=job.progress.update)
+
+
+_default_manager: Optional[IngestJobManager] = None
+
+
+def get_ingest_job_manager() -> IngestJobManager:
+    global _default_manager
+    if _default_manager is None:
+        _default_manager = IngestJobManager()
+    return _default_manager
+
+
+def shutdown_ingest_job_manager(wait: bool = True):
+    """
+    Shuts down the default manager if one was started; running jobs finish first when `wait` is set.
+    """
+    global _default_manager
+    manager, _default_manager = _default_manager, None
+    if manager is not None:
+        manager.shutdown(wait=wait)
@@ -0,0 +1,41 @@
+import logging
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+# Directory and File nodes are keyed by (repo, full_path) so that several
+# repositories can share one database. Each uniqueness constraint is backed by a
+# composite range index, which is what the labeled MERGE/MATCH lookups in
+# neo4j_service.py seek on. The single-property repo indexes serve repo-wide
+# scans such as clearing or re-counting one repository.
+SCHEMA_STATEMENTS: List[str] = [
+    "CREATE CONSTRAINT repository_name IF NOT EXISTS "
+    "FOR (r:Repository) REQUIRE r.name IS UNIQUE",
+    "CREATE CONSTRAINT directory_repo_full_path IF NOT EXISTS "
+    "FOR (d:Directory) REQUIRE (d.repo, d.full_path) IS UNIQUE",
+    "CREATE CONSTRAINT file_repo_full_path IF NOT EXISTS "
+    "FOR (f:File) REQUIRE (f.repo, f.full_path) IS UNIQUE",
+    "CREATE CONSTRAINT class_repo_full_path_name IF NOT EXISTS "
+    "FOR (c:Class) REQUIRE (c.repo, c.full_path, c.qualified_name) IS UNIQUE",
+    "CREATE CONSTRAINT function_repo_full_path_name IF NOT EXISTS "
+    "FOR (fn:Function) REQUIRE (fn.repo, fn.full_path, fn.qualified_name) IS UNIQUE",
+    "CREATE CONSTRAINT module_repo_name IF NOT EXISTS "
+    "FOR (m:Module) REQUIRE (m.repo, m.name) IS UNIQUE",
+    "CREATE INDEX repository_source IF NOT EXISTS FOR (r:Repository) ON (r.source)",
+    "CREATE INDEX directory_repo IF NOT EXISTS FOR (d:Directory) ON (d.repo)",
+    "CREATE INDEX file_repo IF NOT EXISTS FOR (f:File) ON (f.repo)",
+]
+
+
+def ensure_schema(neo4j_driver) -> int:
+    """
+    Creates the constraints and indexes the graph queries rely on.
+    All statements are idempotent, so this is safe to run on every startup.
+
+    Returns the number of schema statements executed.
+    """
+    with neo4j_driver.session() as session:
+        for statement in SCHEMA_STATEMENTS:
+            session.run(statement).consume()
+    logger.info(f"Neo4j schema ensured ({len(SCHEMA_STATEMENTS)} statements)")
+    return len(SCHEMA_STATEMENTS)
@@ -1,163 +1,806 @@
-import os
-from neo4j import GraphDatabase
-from app.core.config_provider import get_neo4j_config
-
-neo4j_config = get_neo4j_config()
-driver = GraphDatabase.driver(
-    neo4j_config["uri"],
-    auth=(neo4j_config["username"], neo4j_config["password"]),
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from app.core.config_provider import (
+    get_neo4j_config,
+    get_ingest_config,
+    get_search_index_config,
+    get_snapshot_config,
+    get_symbol_extraction_config,
 )
+from app.core.metrics import LogSampler, record_stage, record_statement, stage_timer, timed_iter
+from app.modules.code_provider.local_repo.ingest_stream import TEXT, FileRecord
+from app.services.blob_store import LocalBlobStore, get_blob_store
+from app.services.compact_tree import CompactTree
+from app.services.directory_stats import DirectoryAggregator, count_lines
+from app.services.gitingest_parser import iter_code_blocks
+from app.services.graph_read_cache import invalidate_repository
+from app.services.neo4j_schema import ensure_schema
+from app.services.repo_snapshot import SnapshotStore, get_snapshot_store
+from app.services.search_index import SearchIndexStore, TrigramIndexBuilder, get_search_index_store
+from app.services.symbol_extractor import CLASS, SymbolExtractionPipeline, get_extractor, resolve_imports
 
-def insert_repo_structure(parsed_data: dict):
-    print("Parsed Data:", parsed_data)
+logger = logging.getLogger(__name__)
+
+# The driver is created on first use (get_driver) instead of at import, so workers
+# start without importing or connecting to neo4j; close_driver() releases its pool.
+_driver = None
+_schema_ensured = False
+_driver_lock = threading.Lock()
+
+
+def get_driver():
+    """
+    Returns the shared Neo4j driver, creating it on first call with the pool settings
+    of get_neo4j_config. The schema (see neo4j_schema.ensure_schema) is bootstrapped
+    the first time the driver is handed out; if the database is unreachable that is
+    only logged and retried on the next call.
+    """
+    global _driver, _schema_ensured
+    with _driver_lock:
+        if _driver is None:
+            from neo4j import GraphDatabase
+
+            config = get_neo4j_config()
+            _driver = GraphDatabase.driver(
+                config["uri"],
+                auth=(config["username"], config["password"]),
+                max_connection_pool_size=config["max_connection_pool_size"],
+                connection_acquisition_timeout=config["connection_acquisition_timeout"],
+                connection_timeout=config["connection_timeout"],
+            )
+        if not _schema_ensured:
+            try:
+                ensure_schema(_driver)
+                _schema_ensured = True
+            except Exception as e:
+                logger.error(f"Could not ensure Neo4j schema: {e}")
+        return _driver
+
+
+def close_driver():
+    global _driver, _schema_ensured
+    with _driver_lock:
+        driver, _driver, _schema_ensured = _driver, None, False
+    if driver is not None:
+        driver.close()
+
+# Bulk write statements. Every statement consumes a list of row maps through
+# UNWIND so a whole batch of nodes or edges is written in one round trip.
+# Directory and File lookups always go through the (repo, full_path) key that
+# neo4j_schema.ensure_schema indexes, so each edge costs one index seek.
+MERGE_REPOSITORY_QUERY = """
+MERGE (r:Repository {name: $repo})
+SET r.info = $info, r.directory_structure = $structure, r.root = $root,
+    r.source = $source, r.last_commit = $commit
+RETURN r
+"""
+
+MERGE_DIRECTORIES_QUERY = """
+UNWIND $rows AS row
+MERGE (d:Directory {repo: $repo, full_path: row.full_path})
+SET d.name = row.name
+"""
+
+# File contents live in the blob store; File nodes only reference them by
+# content_hash and size. Full ingests create File nodes first and attach the
+# content references as code blocks stream in (SET_FILE_CONTENT_QUERY);
+# incremental updates write both at once (MERGE_FILES_QUERY). Files the native
+# ingest stream left without content (binary, oversized, ...) record why in
+# File.skipped instead (SET_FILE_SKIPPED_QUERY, MERGE_SKIPPED_FILES_QUERY).
+MERGE_FILE_NODES_QUERY = """
+UNWIND $rows AS row
+MERGE (f:File {repo: $repo, full_path: row.full_path})
+SET f.name = row.name
+"""
+
+SET_FILE_CONTENT_QUERY = """
+UNWIND $rows AS row
+MATCH (f:File {repo: $repo, full_path: row.full_path})
+SET f.content_hash = row.content_hash, f.size = row.size, f.line_count = row.line_count
+REMOVE f.code, f.skipped, f.sha256
+"""
+
+SET_FILE_SKIPPED_QUERY = """
+UNWIND $rows AS row
+MATCH (f:File {repo: $repo, full_path: row.full_path})
+SET f.skipped = row.kind, f.size = row.size, f.sha256 = row.sha256
+REMOVE f.code, f.content_hash, f.line_count
+"""
+
+MERGE_FILES_QUERY = """
+UNWIND $rows AS row
+MERGE (f:File {repo: $repo, full_path: row.full_path})
+SET f.name = row.name, f.content_hash = row.content_hash, f.size = row.size, f.line_count = row.line_count
+REMOVE f.code, f.skipped, f.sha256
+"""
+
+MERGE_SKIPPED_FILES_QUERY = """
+UNWIND $rows AS row
+MERGE (f:File {repo: $repo, full_path: row.full_path})
+SET f.name = row.name, f.skipped = row.kind, f.size = row.size, f.sha256 = row.sha256
+REMOVE f.code, f.content_hash, f.line_count
+"""
+
+LINK_DIRECTORIES_QUERY = """
+UNWIND $rows AS row
+MATCH (parent:Directory {repo: $repo, full_path: row.parent})
+MATCH (child:Directory {repo: $repo, full_path: row.child})
+MERGE (parent)-[:CONTAINS]->(child)
+"""
+
+LINK_FILES_QUERY = """
+UNWIND $rows AS row
+MATCH (parent:Directory {repo: $repo, full_path: row.parent})
+MATCH (child:File {repo: $repo, full_path: row.child})
+MERGE (parent)-[:CONTAINS]->(child)
+"""
+
+LINK_ROOT_DIRECTORIES_QUERY = """
+MATCH (r:Repository {name: $repo})
+UNWIND $rows AS row
+MATCH (d:Directory {repo: $repo, full_path: row.full_path})
+MERGE (r)-[:HAS_DIRECTORY]->(d)
+"""
+
+LINK_ROOT_FILES_QUERY = """
+MATCH (r:Repository {name: $repo})
+UNWIND $rows AS row
+MATCH (f:File {repo: $repo, full_path: row.full_path})
+MERGE (r)-[:HAS_DIRECTORY]->(f)
+"""
+
+# Rollups of the files below each directory (see directory_stats), so size and
+# composition questions are answered by one node instead of a CONTAINS* scan.
+SET_DIRECTORY_AGGREGATES_QUERY = """
+UNWIND $rows AS row
+MATCH (d:Directory {repo: $repo, full_path: row.full_path})
+SET d.file_count = row.file_count, d.total_bytes = row.total_bytes, d.line_count = row.line_count,
+    d.extensions = row.extensions, d.extension_counts = row.extension_counts
+"""
+
+SET_REPOSITORY_AGGREGATES_QUERY = """
+MATCH (r:Repository {name: $repo})
+SET r.file_count = $file_count, r.total_bytes = $total_bytes, r.line_count = $line_count,
+    r.extensions = $extensions, r.extension_counts = $extension_counts
+"""
+
+# Symbol graph. Class and Function nodes are keyed by (repo, full_path,
+# qualified_name) and hang off their File through DEFINES; IMPORTS points at a
+# File when the import resolves inside the repository and at a Module otherwise.
+# A file's previous symbols and imports are dropped before it is rewritten.
+DELETE_FILE_SYMBOLS_QUERY = """
+UNWIND $rows AS row
+MATCH (f:File {repo: $repo, full_path: row.full_path})
+OPTIONAL MATCH (f)-[:DEFINES]->(s)
+DETACH DELETE s
+WITH DISTINCT f
+OPTIONAL MATCH (f)-[i:IMPORTS]->()
+DELETE i
+"""
+
+MERGE_CLASSES_QUERY = """
+UNWIND $rows AS row
+MATCH (f:File {repo: $repo, full_path: row.full_path})
+MERGE (s:Class {repo: $repo, full_path: row.full_path, qualified_name: row.qualified_name})
+SET s.name = row.name, s.line = row.line, s.end_line = row.end_line
+MERGE (f)-[:DEFINES]->(s)
+"""
+
+MERGE_FUNCTIONS_QUERY = """
+UNWIND $rows AS row
+MATCH (f:File {repo: $repo, full_path: row.full_path})
+MERGE (s:Function {repo: $repo, full_path: row.full_path, qualified_name: row.qualified_name})
+SET s.name = row.name, s.line = row.line, s.end_line = row.end_line
+MERGE (f)-[:DEFINES]->(s)
+"""
+
+LINK_FILE_IMPORTS_QUERY = """
+UNWIND $rows AS row
+MATCH (f:File {repo: $repo, full_path: row.full_path})
+MATCH (t:File {repo: $repo, full_path: row.target})
+MERGE (f)-[:IMPORTS]->(t)
+"""
+
+LINK_MODULE_IMPORTS_QUERY = """
+UNWIND $rows AS row
+MATCH (f:File {repo: $repo, full_path: row.full_path})
+MERGE (m:Module {repo: $repo, name: row.module})
+MERGE (f)-[:IMPORTS]->(m)
+"""
+
+# Query text -> name used as the "query" label of the Neo4j statement metrics.
+QUERY_NAMES: Dict[str, str] = {}
+
+
+def register_query_names(namespace: Dict[str, Any]):
+    """
+    Names every *_QUERY string constant of a module namespace after the constant,
+    e.g. MERGE_DIRECTORIES_QUERY -> "merge_directories".
+    """
+    for name, value in namespace.items():
+        if name.endswith("_QUERY") and isinstance(value, str):
+            QUERY_NAMES[value] = name[:-len("_QUERY")].lower()
+
+
+def query_name(query: str) -> str:
+    return QUERY_NAMES.get(query, "other")
+
+
+register_query_names(globals())
+
+
+class GraphBatchWriter:
+    """
+    Sends row batches to Neo4j as UNWIND statements, one write transaction per batch.
+
+    In dry-run mode no writes are sent; statements and rows are only counted so the
+    write plan for a repository can be inspected or benchmarked without a database.
+    Reads still go to the driver if one is given, so plans that depend on the
+    stored graph (incremental updates) can be dry-run against it.
+    If given, `progress` is called with the current stats after every write.
+    Every statement is also recorded in the Neo4j metrics under its query name.
+    """
+
+    def __init__(
+        self,
+        neo4j_driver=None,
+        batch_size: Optional[int] = None,
+        dry_run: bool = False,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        self.driver = neo4j_driver if neo4j_driver is not None else (None if dry_run else get_driver())
+        self.batch_size = max(1, batch_size or get_ingest_config()["batch_size"])
+        self.dry_run = dry_run
+        self.progress = progress
+        self.statements = 0
+        self.rows = 0
+        self.transactions = 0
+        self._log_sampler = LogSampler()
+
+    def run(self, query: str, **params) -> Optional[Any]:
+        """
+        Runs a single statement in its own write transaction and returns the first record.
+        """
+        self.statements += 1
+        self.transactions += 1
+        record = None
+        started = time.perf_counter()
+        if not self.dry_run:
+            with self.driver.session() as session:
+                record = session.execute_write(lambda tx: tx.run(query, **params).single())
+        record_statement(query_name(query), 0, time.perf_counter() - started)
+        self._report_progress()
+        return record
+
+    def write_rows(self, query: str, rows: Iterable[Dict[str, Any]], **params) -> int:
+        """
+        Writes rows in chunks of batch_size. Rows may be any iterable, so callers can
+        stream them without materializing the full list. Returns the number of rows written.
+        """
+        written = 0
+        batch: List[Dict[str, Any]] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                written += self._flush(query, batch, params)
+                batch = []
+        if batch:
+            written += self._flush(query, batch, params)
+        return written
+
+    def read(self, query: str, **params) -> List[Any]:
+        """
+        Runs a read statement and returns all records (none in dry-run mode without a driver).
+        """
+        self.statements += 1
+        self.transactions += 1
+        if self.driver is None:
+            record_statement(query_name(query), 0, 0.0)
+            return []
+        started = time.perf_counter()
+        with self.driver.session() as session:
+            records = session.execute_read(lambda tx: list(tx.run(query, **params)))
+        record_statement(query_name(query), 0, time.perf_counter() - started)
+        return records
+
+    def _flush(self, query: str, batch: List[Dict[str, Any]], params: Dict[str, Any]) -> int:
+        self.statements += 1
+        self.transactions += 1
+        self.rows += len(batch)
+        name = query_name(query)
+        started = time.perf_counter()
+        if not self.dry_run:
+            with self.driver.session() as session:
+                session.execute_write(lambda tx: tx.run(query, rows=batch, **params).consume())
+        elapsed = time.perf_counter() - started
+        record_statement(name, len(batch), elapsed)
+        self._log_sampler.log(
+            logger, logging.DEBUG, name, f"{name}: wrote {len(batch)} rows in {elapsed * 1e3:.1f} ms"
+        )
+        self._report_progress()
+        return len(batch)
+
+    def _report_progress(self):
+        if self.progress is not None:
+            self.progress(self.stats())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "dry_run": self.dry_run,
+            "batch_size": self.batch_size,
+            "statements": self.statements,
+            "rows": self.rows,
+            "transactions": self.transactions,
+        }
+
+
+def parse_directory_structure(structure_str: str) -> List[Dict[str, Any]]:
+    """
+    Parses the gitingest directory tree ("├── name" / "└── name" lines) into nested nodes.
+    Each node is { name, type, children, full_path }.
+    """
+    lines = structure_str.splitlines()
+    tree_nodes = []
+    stack = []
+    for line in lines:
+        if "──" not in line:
+            continue
+        # Indentation level is the column of the tree marker; deeper lines are
+        # prefixed with "│   " rather than spaces, so leading spaces alone undercount.
+        indent = line.index("──")
+        # Remove tree markers ("└──" or "├──") and extra spaces:
+        name = line.split("──", 1)[1].strip()
+        # Symlinks are listed as "name -> target"; the node is the link itself.
+        if " -> " in name:
+            name = name.split(" -> ", 1)[0]
+        # Determine type: directory if name ends with '/', else file.
+        node_type = "directory" if name.endswith("/") else "file"
+        if node_type == "directory":
+            name = name.rstrip("/")
+        # Initialize the node; full_path will be updated based on hierarchy.
+        node = {"name": name, "type": node_type, "children": [], "full_path": name}
+        # Pop from stack until finding a parent with lower indent.
+        while stack and stack[-1]["indent"] >= indent:
+            stack.pop()
+        if stack:
+            parent_node = stack[-1]["node"]
+            node["full_path"] = parent_node["full_path"] + "/" + name
+            parent_node["children"].append(node)
+        else:
+            tree_nodes.append(node)
+        # Push the current node with its indent onto the stack.
+        stack.append({"node": node, "indent": indent})
+    return tree_nodes
+
+
+def flatten_tree(tree: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Flattens the nested tree into node and edge row lists, grouped by label so that
+    every statement can use labeled matches.
+    """
+    rows = {
+        "directories": [],
+        "files": [],
+        "directory_edges": [],
+        "file_edges": [],
+        "root_directories": [],
+        "root_files": [],
+    }
+    stack = [(node, None) for node in reversed(tree)]
+    while stack:
+        node, parent_full_path = stack.pop()
+        is_directory = node["type"] == "directory"
+        entry = {"full_path": node["full_path"], "name": node["name"]}
+        if is_directory:
+            rows["directories"].append(entry)
+        else:
+            rows["files"].append(entry)
+        if parent_full_path is None:
+            rows["root_directories" if is_directory else "root_files"].append({"full_path": node["full_path"]})
+        else:
+            rows["directory_edges" if is_directory else "file_edges"].append(
+                {"parent": parent_full_path, "child": node["full_path"]}
+            )
+        for child in reversed(node.get("children", [])):
+            stack.append((child, node["full_path"]))
+    return rows
+
+
+def get_tree_root(tree: List[Dict[str, Any]]) -> str:
+    """
+    gitingest renders the repository directory itself as the single top-level node.
+    Returns its full_path, which prefixes every other path in the tree ("" if absent).
+    """
+    if len(tree) == 1 and tree[0]["type"] == "directory":
+        return tree[0]["full_path"]
+    return ""
+
+
+def to_full_path(root: str, relative_path: str) -> str:
+    """
+    Maps a path relative to the repository root (as used in gitingest file headers
+    and git diffs) to the full_path key of its graph node.
+    """
+    return f"{root}/{relative_path}" if root else relative_path
+
+
+def content_hash(code: str) -> str:
+    """
+    Hash stored as File.content_hash; it is also the file's key in the blob store
+    and is used to skip rewriting unchanged files.
+    """
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def store_file_content(code: str, blob_store: LocalBlobStore, dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Puts the code into the blob store and returns the properties that reference it
+    from a File node. In dry-run mode nothing is stored.
+    """
+    if dry_run:
+        code_hash, size = content_hash(code), len(code.encode("utf-8"))
+    else:
+        code_hash, size = blob_store.put_text(code)
+    return {"content_hash": code_hash, "size": size, "line_count": count_lines(code)}
+
+
+# Symbol results resolved per path lookup when SymbolWriter has no known_paths.
+_RESOLVE_BATCH = 256
+
+
+class _RecordingPaths(set):
+    """
+    An always-empty path set that records the membership tests made against it,
+    i.e. every path an import resolver could resolve to.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.queried: Set[str] = set()
+
+    def __contains__(self, path) -> bool:
+        self.queried.add(path)
+        return False
+
+
+class SymbolWriter:
+    """
+    Writes symbol extraction results (see symbol_extractor.extract_file_symbols) as
+    Class/Function nodes with DEFINES edges and IMPORTS edges, replacing whatever the
+    files defined before. known_paths are the repository-relative paths of all files,
+    used to resolve imports to File nodes.
+
+    Results are added one at a time, e.g. as SymbolExtractionPipeline.on_result, and
+    their rows are buffered per statement and sent in batches of the writer's
+    batch_size, so only one batch per statement is held however large the
+    repository. Pending deletes are always flushed before any other buffer, so a
+    file's old symbols are gone before its new ones are written; callers that
+    cleared every file up front (delete_existing_symbols) pass replace=False to
+    skip them. Call finish() to flush the rest; it returns counts of what was written.
+
+    Without known_paths, imports are resolved through lookup_paths(candidates),
+    which returns the candidate paths that exist: results are held in groups of
+    _RESOLVE_BATCH, every path their imports could resolve to is collected, and
+    one lookup per group answers them, so the repository's file list is never needed.
+    """
+
+    def __init__(
+        self, writer: "GraphBatchWriter", repo_name: str, root: str, known_paths: Optional[Iterable[str]] = None,
+        replace: bool = True, lookup_paths: Optional[Callable[[List[str]], Iterable[str]]] = None,
+    ):
+        self.writer = writer
+        self.repo_name = repo_name
+        self.root = root
+        self.known_paths = set(known_paths) if known_paths is not None else None
+        self.replace = replace
+        self.lookup_paths = lookup_paths
+        self._pending: List[Dict[str, Any]] = []
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {
+            query: [] for query in (
+                DELETE_FILE_SYMBOLS_QUERY, MERGE_CLASSES_QUERY, MERGE_FUNCTIONS_QUERY,
+                LINK_FILE_IMPORTS_QUERY, LINK_MODULE_IMPORTS_QUERY,
+            )
+        }
+        self._counts = {"files": 0, "classes": 0, "functions": 0, "imports": 0}
+
+    def _append(self, query: str, row: Dict[str, Any]):
+        buffer = self._buffers[query]
+        buffer.append(row)
+        if len(buffer) >= self.writer.batch_size:
+            if query != DELETE_FILE_SYMBOLS_QUERY:
+                self._flush(DELETE_FILE_SYMBOLS_QUERY)
+            self._flush(query)
+
+    def _flush(self, query: str):
+        rows, self._buffers[query] = self._buffers[query], []
+        self.writer.write_rows(query, rows, repo=self.repo_name)
+
+    def add(self, result: Dict[str, Any]):
+        if self.known_paths is not None:
+            self._write(result, self.known_paths)
+            return
+        self._pending.append(result)
+        if len(self._pending) >= _RESOLVE_BATCH:
+            self._resolve_pending()
+
+    def _resolve_pending(self):
+        pending, self._pending = self._pending, []
+        candidates = _RecordingPaths()
+        for result in pending:
+            resolve_imports(result, candidates)
+        known = set(self.lookup_paths(sorted(candidates.queried))) if candidates.queried else set()
+        for result in pending:
+            self._write(result, known)
+
+    def _write(self, result: Dict[str, Any], known_paths: Set[str]):
+        full_path = to_full_path(self.root, result["path"])
+        if self.replace:
+            self._append(DELETE_FILE_SYMBOLS_QUERY, {"full_path": full_path})
+        self._counts["files"] += 1
+        for symbol in result["symbols"]:
+            row = {
+                "full_path": full_path,
+                "name": symbol["name"],
+                "qualified_name": symbol["qualified_name"],
+                "line": symbol["line"],
+                "end_line": symbol["end_line"],
+            }
+            if symbol["kind"] == CLASS:
+                self._append(MERGE_CLASSES_QUERY, row)
+                self._counts["classes"] += 1
+            else:
+                self._append(MERGE_FUNCTIONS_QUERY, row)
+                self._counts["functions"] += 1
+        targets, modules = resolve_imports(result, known_paths)
+        for target in targets:
+            self._append(LINK_FILE_IMPORTS_QUERY, {"full_path": full_path, "target": to_full_path(self.root, target)})
+        for module in modules:
+            self._append(LINK_MODULE_IMPORTS_QUERY, {"full_path": full_path, "module": module})
+        self._counts["imports"] += len(targets) + len(modules)
+
+    def finish(self) -> Dict[str, int]:
+        if self._pending:
+            self._resolve_pending()
+        # Dicts keep insertion order: deletes first.
+        for query in self._buffers:
+            self._flush(query)
+        return dict(self._counts)
+
+
+def delete_existing_symbols(writer: "GraphBatchWriter", repo_name: str, full_paths: Iterable[str]):
+    """
+    Removes the symbols and imports of every file a symbol extractor handles, in
+    full batches, so a following SymbolWriter(replace=False) only has to add.
+    """
+    writer.write_rows(
+        DELETE_FILE_SYMBOLS_QUERY,
+        ({"full_path": full_path} for full_path in full_paths if get_extractor(full_path) is not None),
+        repo=repo_name,
+    )
+
+
+def extract_repo_name(repo_info: str) -> str:
+    """
+    Extracts the repository name from the gitingest summary. Remote sources start with
+    "Repository: <owner/name>", local directories with "Directory: <path>".
+    The name is the graph key for every node of the repository.
+    """
+    lines = repo_info.splitlines()
+    if lines:
+        for prefix in ("Repository:", "Directory:"):
+            if lines[0].startswith(prefix):
+                return lines[0].replace(prefix, "", 1).strip() or "Unknown"
+    return "Unknown"
+
+
+def insert_repo_structure(
+    parsed_data: dict,
+    batch_size: Optional[int] = None,
+    dry_run: bool = False,
+    neo4j_driver=None,
+    blob_store: Optional[LocalBlobStore] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    extract_symbols: Optional[bool] = None,
+    search_index_store: Optional[SearchIndexStore] = None,
+    build_search_index: Optional[bool] = None,
+    snapshot_store: Optional[SnapshotStore] = None,
+):
     """
     Inserts repository data into Neo4j.
     Expects parsed_data with keys:
       - repo_info: string (e.g., "Repository: CodexAi/frontend...")
       - directory_structure: a text tree of directories/files.
-      - repo_code: a string containing code for multiple files, separated by
-                   delimiter lines "================================================"
-                   
+      - repo_code: the gitingest code dump, either as a string or as an iterable of
+                   lines (e.g. an open file), with files separated by delimiter lines
+                   "================================================"
+      - files (optional): instead of repo_code, an iterable of FileRecords such as
+                          RepoIngestStream.iter_records(); text records are stored like
+                          code blocks, the others only get File.skipped / size / sha256.
+      - source (optional): absolute path of the local checkout that was ingested.
+      - commit (optional): commit the checkout was at; recorded as Repository.last_commit
+                           so the next ingest of the same source can be incremental.
+      - snapshot (optional): True to also write a snapshot of the parsed repository
+                             for (source, commit), see repo_snapshot.
+
     This function:
       1. Extracts the repository name.
-      2. Builds a file-code mapping from repo_code.
-      3. Parses the directory_structure into a tree.
-      4. Creates a Repository node.
-      5. Recursively creates Directory and File nodes (with parent–child CONTAINS relationships).
-      6. Links the Repository node to its top-level directories.
-      
-    Returns a dict with the repository node's element id.
+      2. Parses the directory_structure into a tree and flattens it into row batches.
+      3. Creates a Repository node.
+      4. Creates Directory and File nodes keyed by (repo, full_path), then their CONTAINS relationships,
+         with a few UNWIND statements of at most batch_size rows each.
+      5. Links the Repository node to its top-level entries.
+      6. Streams (path, code) blocks out of repo_code, stores each file in the blob store
+         and sets File.content_hash / File.size in batches, so at most one batch of
+         file references is held in memory and the graph never holds source text.
+      7. Feeds the same stream to the symbol extraction pipeline (worker processes) and
+         writes the Class/Function nodes with their DEFINES and IMPORTS edges in batches.
+         extract_symbols=False (or SYMBOL_EXTRACTION=false) skips this step.
+      8. Adds every file to a trigram index that is written to the search index store
+         once the stream is consumed, replacing the repository's previous index.
+         build_search_index=False (or SEARCH_INDEX=false) skips this step.
+      9. If requested, appends every file to a snapshot data file and writes the
+         snapshot index once the stream is consumed (SNAPSHOTS=false disables this).
+     10. Sums file counts, bytes, line counts and extensions per directory while the
+         contents stream, rolls them up bottom-up once and stores the recursive totals
+         on every Directory and on the Repository node (see directory_stats).
+
+    With dry_run=True nothing is written and only the statement/row counts are reported.
+    `progress`, if given, receives the write statistics after every statement.
+    Tree parsing, code block parsing and every statement are recorded in app.core.metrics.
+
+    Returns a dict with the repository node's element id and the write statistics.
     """
     repo_info = parsed_data.get("repo_info", "")
     directory_structure_str = parsed_data.get("directory_structure", "")
     repo_code = parsed_data.get("repo_code", "")
 
-    # Extract repository name (assumes first line is "Repository: <name>")
-    repo_name = "Unknown"
-    lines = repo_info.splitlines()
-    if lines and lines[0].startswith("Repository:"):
-        repo_name = lines[0].replace("Repository:", "").strip()
-
-    # Build a mapping of file identifier to its code from repo_code.
-    # Store using both the full header and the base name.
-    file_code_mapping = {}
-    delimiter = "================================================"
-    blocks = repo_code.split(delimiter)
-    i = 0
-    while i < len(blocks):
-        header_block = blocks[i].strip()
-        if header_block.startswith("File:"):
-            header_content = header_block.replace("File:", "").strip()  # may be full path like "src/app/page.jsx"
-            base_filename = os.path.basename(header_content)
-            code = ""
-            if i + 1 < len(blocks):
-                code = blocks[i + 1].strip()
-            # Store code under both keys
-            file_code_mapping[header_content] = code
-            file_code_mapping[base_filename] = code
-            i += 2  # Skip header and code block.
-        else:
-            i += 1
-
-    print("blocks:", blocks)
-    print("File Code Mapping:", file_code_mapping)
-
-    # Parse the directory structure into a tree.
-    def parse_directory_structure(structure_str):
-        lines = structure_str.splitlines()
-        tree_nodes = []
-        stack = []
-        for line in lines:
-            if "──" not in line:
-                continue
-            # Determine indentation level (number of leading spaces)
-            indent = len(line) - len(line.lstrip(" "))
-            # Remove tree markers ("└──" or "├──") and extra spaces:
-            name = line.split("──", 1)[1].strip()
-            # Determine type: directory if name ends with '/', else file.
-            node_type = "directory" if name.endswith("/") else "file"
-            # Initialize the node; full_path will be updated based on hierarchy.
-            node = {"name": name, "type": node_type, "children": [], "full_path": name}
-            # Pop from stack until finding a parent with lower indent.
-            while stack and stack[-1]["indent"] >= indent:
-                stack.pop()
-            if stack:
-                parent_node = stack[-1]["node"]
-                node["full_path"] = parent_node["full_path"] + "/" + name
-                parent_node["children"].append(node)
-            else:
-                tree_nodes.append(node)
-            # Push the current node with its indent onto the stack.
-            stack.append({"node": node, "indent": indent})
-        return tree_nodes
-
-    tree = parse_directory_structure(directory_structure_str)
-
-    with driver.session() as session:
-        # Create or update the Repository node.
-        def create_repository(tx, name, info, structure):
-            query = """
-            MERGE (r:Repository {name: $name})
-            SET r.info = $info, r.directory_structure = $structure
-            RETURN r
-            """
-            result = tx.run(query, name=name, info=info, structure=structure)
-            record = result.single()
-            return record["r"] if record is not None else None
-
-        repo_node = session.write_transaction(create_repository, repo_name, repo_info, directory_structure_str)
-
-        # Create a node for a given tree entry (Directory or File).
-        def create_tree_node(tx, node):
-            if node["type"] == "directory":
-                query = """
-                MERGE (d:Directory {full_path: $full_path})
-                SET d.name = $name
-                RETURN d
-                """
-                result = tx.run(query, full_path=node["full_path"], name=node["name"])
-                record = result.single()
-                return record["d"] if record is not None else None
+    repo_name = extract_repo_name(repo_info)
+
+    with stage_timer("tree_parse"):
+        tree = parse_directory_structure(directory_structure_str)
+        root = get_tree_root(tree)
+        rows = flatten_tree(tree)
+    logger.info(
+        f"Writing {repo_name}: {len(rows['directories'])} directories, {len(rows['files'])} files"
+        f"{' (dry run)' if dry_run else ''}"
+    )
+
+    writer = GraphBatchWriter(neo4j_driver, batch_size=batch_size, dry_run=dry_run, progress=progress)
+    if not dry_run:
+        invalidate_repository(repo_name)
+    repo_record = writer.run(
+        MERGE_REPOSITORY_QUERY,
+        repo=repo_name,
+        info=repo_info,
+        structure=directory_structure_str,
+        root=root,
+        source=parsed_data.get("source"),
+        commit=parsed_data.get("commit"),
+    )
+    # Nodes first, so every edge batch can match both endpoints.
+    writer.write_rows(MERGE_DIRECTORIES_QUERY, rows["directories"], repo=repo_name)
+    writer.write_rows(MERGE_FILE_NODES_QUERY, rows["files"], repo=repo_name)
+    writer.write_rows(LINK_DIRECTORIES_QUERY, rows["directory_edges"], repo=repo_name)
+    writer.write_rows(LINK_FILES_QUERY, rows["file_edges"], repo=repo_name)
+    writer.write_rows(LINK_ROOT_DIRECTORIES_QUERY, rows["root_directories"], repo=repo_name)
+    writer.write_rows(LINK_ROOT_FILES_QUERY, rows["root_files"], repo=repo_name)
+    # File headers are relative to the repository root, so they map 1:1 onto full_path keys.
+    blob_store = blob_store or get_blob_store()
+    if extract_symbols is None:
+        extract_symbols = get_symbol_extraction_config()["enabled"]
+    if build_search_index is None:
+        build_search_index = get_search_index_config()["enabled"]
+    index_builder = TrigramIndexBuilder(repo_name, commit=parsed_data.get("commit")) if build_search_index else None
+    snapshot_writer = None
+    if (parsed_data.get("snapshot") and parsed_data.get("source") and parsed_data.get("commit")
+            and not dry_run and get_snapshot_config()["enabled"]):
+        snapshot_store = snapshot_store or get_snapshot_store()
+        snapshot_writer = snapshot_store.writer(
+            repo_name, parsed_data["source"], parsed_data["commit"], root, repo_info, directory_structure_str
+        )
+    known_files = {row["full_path"] for row in rows["files"]}
+    unmatched_blocks: List[str] = []
+    aggregator = DirectoryAggregator()
+    aggregator.add_files(row["full_path"] for row in rows["files"])
+    skipped_rows: List[Dict[str, Any]] = []
+    if parsed_data.get("files") is not None:
+        def iter_text_files(records: Iterable[FileRecord]):
+            for record in records:
+                if record.kind == TEXT:
+                    # Stripped like gitingest code blocks, so content hashes match either producer.
+                    yield record.path, record.content.strip()
+                else:
+                    full_path = to_full_path(root, record.path)
+                    skipped_rows.append({
+                        "full_path": full_path, "kind": record.kind, "size": record.size, "sha256": record.sha256,
+                    })
+                    aggregator.add_file(full_path, record.size, count=False)
+                    if snapshot_writer is not None:
+                        snapshot_writer.add_skipped(record.path, record.kind, record.size, record.sha256)
+
+        code_blocks = iter_text_files(parsed_data["files"])
+    else:
+        code_blocks = timed_iter(iter_code_blocks(repo_code), "code_blocks")
+    symbol_stats = None
+    search_index_stats = None
+    snapshot_stats = None
+    try:
+        symbol_writer = None
+        if extract_symbols:
+            known_paths = (row["full_path"][len(root) + 1:] if root else row["full_path"] for row in rows["files"])
+            delete_existing_symbols(writer, repo_name, (row["full_path"] for row in rows["files"]))
+            symbol_writer = SymbolWriter(writer, repo_name, root, known_paths, replace=False)
+        # Symbols are written chunk by chunk as extraction completes (File nodes already exist).
+        on_result = symbol_writer.add if symbol_writer is not None else None
+        with SymbolExtractionPipeline(on_result=on_result) as symbol_pipeline:
+            def content_rows():
+                for path, code in code_blocks:
+                    full_path = to_full_path(root, path)
+                    if full_path not in known_files:
+                        # SET_FILE_CONTENT_QUERY would MATCH nothing; count the block
+                        # instead of dropping it silently.
+                        unmatched_blocks.append(path)
+                        continue
+                    if extract_symbols:
+                        symbol_pipeline.add(path, code)
+                    stored = store_file_content(code, blob_store, dry_run)
+                    record_stage("code_blocks", files=1, size=stored["size"])
+                    if index_builder is not None:
+                        index_builder.add(path, stored["content_hash"], code)
+                    if snapshot_writer is not None:
+                        snapshot_writer.add(path, code, stored["content_hash"])
+                    aggregator.add_file(full_path, stored["size"], stored["line_count"], count=False)
+                    yield {"full_path": full_path, **stored}
+
+            writer.write_rows(SET_FILE_CONTENT_QUERY, content_rows(), repo=repo_name)
+            if unmatched_blocks:
+                logger.warning(
+                    f"{len(unmatched_blocks)} code blocks of {repo_name} match no file of the directory "
+                    f"structure and were not stored, e.g. {unmatched_blocks[:5]}"
+                )
+            writer.write_rows(SET_FILE_SKIPPED_QUERY, skipped_rows, repo=repo_name)
+            with stage_timer("aggregates"):
+                directory_aggregates, repository_aggregates = aggregator.rollup(
+                    row["full_path"] for row in rows["directories"]
+                )
+                writer.write_rows(SET_DIRECTORY_AGGREGATES_QUERY, directory_aggregates, repo=repo_name)
+                writer.run(SET_REPOSITORY_AGGREGATES_QUERY, repo=repo_name, **repository_aggregates.to_properties())
+            if symbol_writer is not None:
+                with stage_timer("symbols"):
+                    symbol_pipeline.flush()
+                    symbol_stats = symbol_writer.finish()
+    except BaseException:
+        if snapshot_writer is not None:
+            snapshot_writer.abort()
+        raise
+    finally:
+        # Reads served while the write was running may have cached a partial graph.
+        if not dry_run:
+            invalidate_repository(repo_name)
+    if index_builder is not None and not dry_run:
+        with stage_timer("search_index"):
+            search_index_stats = (search_index_store or get_search_index_store()).write(index_builder)
+    if snapshot_writer is not None:
+        with stage_timer("snapshot"):
+            # Snapshot paths are relative to the repository root, like the code block paths.
+            if root:
+                snapshot_tree = CompactTree.from_nested(root, tree[0]["children"])
             else:
-                # For file nodes, attach the code if available.
-                simple_name = node["name"]  # e.g., "page.jsx"
-                # Try matching by full_path then by simple name.
-                code = file_code_mapping.get(node["full_path"], file_code_mapping.get(simple_name, ""))
-                query = """
-                MERGE (f:File {full_path: $full_path})
-                SET f.name = $name, f.code = $code
-                RETURN f
-                """
-                result = tx.run(query, full_path=node["full_path"], name=node["name"], code=code)
-                record = result.single()
-                return record["f"] if record is not None else None
-
-        # Recursively traverse the tree to create nodes and relationships.
-        def traverse_tree(tx, node, parent_full_path=None):
-            created_node = create_tree_node(tx, node)
-            if parent_full_path:
-                rel_query = """
-                MATCH (parent {full_path: $parent_full_path}), (child {full_path: $child_full_path})
-                MERGE (parent)-[:CONTAINS]->(child)
-                """
-                tx.run(rel_query, parent_full_path=parent_full_path, child_full_path=node["full_path"])
-            for child in node.get("children", []):
-                traverse_tree(tx, child, node["full_path"])
-            return created_node
-
-        for root_node in tree:
-            session.write_transaction(traverse_tree, root_node)
-            session.write_transaction(lambda tx: tx.run(
-                """
-                MATCH (r:Repository {name: $repo_name}), (d {full_path: $full_path})
-                MERGE (r)-[:HAS_DIRECTORY]->(d)
-                """,
-                repo_name=repo_name,
-                full_path=root_node["full_path"]
-            ))
-
-        if repo_node:
-            repo_id = repo_node.element_id if hasattr(repo_node, "element_id") else repo_node.id
-            return {"repo_id": repo_id}
-        else:
-            return {"repo_id": None}
+                snapshot_tree = CompactTree.from_nested(repo_name, tree)
+            snapshot_stats = snapshot_store.finish(snapshot_writer, snapshot_tree)
+
+    repo_id = None
+    repo_node = repo_record["r"] if repo_record is not None else None
+    if repo_node:
+        repo_id = repo_node.element_id if hasattr(repo_node, "element_id") else repo_node.id
+    return {
+        "repo_id": repo_id,
+        "write_stats": writer.stats(),
+        "symbols": symbol_stats,
+        "search_index": search_index_stats,
+        "snapshot": snapshot_stats,
+        "unmatched_blocks": len(unmatched_blocks),
+    }
@@ -0,0 +1,502 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from app.core.config_provider import get_snapshot_config
+from app.services.compact_tree import CompactTree
+from app.modules.code_provider.local_repo.ingest_stream import TEXT, FileRecord
+
+logger = logging.getLogger(__name__)
+
+# A snapshot of a parsed repository at one commit is two files: an index file
+# with the tree and file table, and a data file with the contents of all files
+# back to back. Index layout (little-endian):
+#   header           magic, version, node count, segment count, file count,
+#                    segment bytes offset, file table offset, metadata offset
+#   node segments    uint32[node count], index into the segment table
+#   parents          int32[node count], -1 for the root
+#   kinds            uint8[node count] (compact_tree.DIRECTORY / FILE), padded to 4 bytes
+#   segment offsets  uint32[segment count + 1] into the segment bytes
+#   segment bytes    the interned path segments, utf-8, padded to 8 bytes
+#   file table       uint32[file count] node index, ascending
+#                    uint64[file count] content offset into the data file
+#                    uint64[file count] content size in bytes
+#                    32-byte sha256 per file (all zero when the file had no content)
+#   metadata         JSON {"repo", "source", "commit", "root", "built_at", "repo_info", "directory_structure",
+#                    "skipped": {path: [kind, size, sha256]} for files stored without content}
+_MAGIC = b"RSNP"
+_VERSION = 2
+_HEADER = struct.Struct("<4sIIIIQQQ")
+_INDEX_SUFFIX = ".rsnap"
+_DATA_SUFFIX = ".rdat"
+_NO_HASH = bytes(32)
+# Full sha1 or sha256 object names; snapshots are only written for resolved HEAD commits.
+_COMMIT_PATTERN = re.compile(r"^(?:[0-9a-f]{40}|[0-9a-f]{64})$")
+
+
+def is_valid_commit(commit: str) -> bool:
+    return bool(_COMMIT_PATTERN.match(commit))
+
+
+def _pad(length: int, alignment: int) -> int:
+    return -length % alignment
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _view(buffer: memoryview, start: int, end: int, typecode: str):
+    """
+    Zero-copy typed view of a little-endian table (a byte-swapped copy on big-endian hosts).
+    """
+    if sys.byteorder == "little":
+        return buffer[start:end].cast(typecode)
+    values = array(typecode, buffer[start:end])
+    values.byteswap()
+    return values
+
+
+class RepoSnapshotWriter:
+    """
+    Writes a snapshot while an ingest streams file contents: add() appends each
+    file to the data file right away, so contents are never held in memory, and
+    finish() writes the index once the tree is known. Both files are written
+    under temporary names and renamed into place, index last, so a snapshot is
+    visible only once complete.
+    """
+
+    def __init__(
+        self, index_path: str, data_path: str, repo_name: str, source: str, commit: str,
+        root: str = "", repo_info: str = "", directory_structure: str = "",
+    ):
+        self.index_path = index_path
+        self.data_path = data_path
+        self.meta = {
+            "repo": repo_name, "source": source, "commit": commit, "root": root,
+            "repo_info": repo_info, "directory_structure": directory_structure, "skipped": {},
+        }
+        self._files: Dict[str, Tuple[int, int, bytes]] = {}
+        self._offset = 0
+        directory = os.path.dirname(data_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, self._tmp_data_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        self._data = os.fdopen(fd, "wb")
+
+    def add(self, path: str, code: str, content_hash: Optional[str] = None):
+        """
+        Appends the content of a repository-relative path. Later duplicates are ignored.
+        """
+        if path in self._files:
+            return
+        data = code.encode("utf-8")
+        self._data.write(data)
+        digest = bytes.fromhex(content_hash) if content_hash else hashlib.sha256(data).digest()
+        self._files[path] = (self._offset, len(data), digest)
+        self._offset += len(data)
+
+    def add_skipped(self, path: str, kind: str, size: int, sha256: Optional[str] = None):
+        """
+        Records a file the ingest left without content (binary, oversized, ...) and why.
+        """
+        self.meta["skipped"].setdefault(path, [kind, size, sha256])
+
+    def abort(self):
+        self._data.close()
+        if os.path.exists(self._tmp_data_path):
+            os.unlink(self._tmp_data_path)
+
+    def finish(self, tree: CompactTree) -> Dict[str, Any]:
+        """
+        Writes the index for `tree`, whose relative paths are the paths passed to add().
+        Files of the tree without added content are recorded with size 0 and no hash.
+        """
+        try:
+            self._data.close()
+            file_nodes = array("I")
+            offsets = array("Q")
+            sizes = array("Q")
+            hashes = bytearray()
+            for index in tree.iter_files():
+                offset, size, digest = self._files.get(tree.relative_path(index), (0, 0, _NO_HASH))
+                file_nodes.append(index)
+                offsets.append(offset)
+                sizes.append(size)
+                hashes += digest
+
+            segment_bytes = bytearray()
+            segment_offsets = array("I", [0])
+            for segment in tree.segments:
+                segment_bytes += segment.encode("utf-8", errors="surrogateescape")
+                segment_offsets.append(len(segment_bytes))
+            node_count = len(tree)
+            kinds = bytes(tree.kinds) + bytes(_pad(node_count, 4))
+            segment_bytes += bytes(_pad(len(segment_bytes), 8))
+
+            tables_offset = _HEADER.size
+            segments_offset = tables_offset + node_count * 8 + len(kinds) + len(segment_offsets) * 4
+            files_offset = segments_offset + len(segment_bytes)
+            meta_offset = files_offset + len(file_nodes) * 4 + _pad(len(file_nodes) * 4, 8) + len(offsets) * 16 + len(hashes)
+            meta = json.dumps({**self.meta, "built_at": time.time()}).encode("utf-8")
+            header = _HEADER.pack(
+                _MAGIC, _VERSION, node_count, len(tree.segments), len(file_nodes),
+                segments_offset, files_offset, meta_offset,
+            )
+            parts = [
+                header,
+                _little_endian(array("I", tree.node_segments)),
+                _little_endian(array("i", tree.parents)),
+                kinds,
+                _little_endian(segment_offsets),
+                bytes(segment_bytes),
+                _little_endian(file_nodes),
+                bytes(_pad(len(file_nodes) * 4, 8)),
+                _little_endian(offsets),
+                _little_endian(sizes),
+                bytes(hashes),
+                meta,
+            ]
+            directory = os.path.dirname(self.index_path) or "."
+            fd, tmp_index_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for part in parts:
+                        f.write(part)
+                os.replace(self._tmp_data_path, self.data_path)
+                os.replace(tmp_index_path, self.index_path)
+            except BaseException:
+                if os.path.exists(tmp_index_path):
+                    os.unlink(tmp_index_path)
+                raise
+        except BaseException:
+            self.abort()
+            raise
+        return {"files": len(file_nodes), "nodes": node_count, "bytes": self._offset}
+
+
+class RepoSnapshot:
+    """
+    Read-only view of a snapshot. Both files are memory-mapped; the tree tables
+    are used in place through memoryviews and contents are sliced out of the data
+    map on demand, so opening a snapshot reads only the header, the segment table
+    and the metadata.
+
+    Snapshots shared through SnapshotStore are pinned while in use (acquire /
+    release, or a with block around a snapshot returned by SnapshotStore.open);
+    retire() closes a snapshot once its last user releases it.
+    """
+
+    def __init__(self, index_path: str, data_path: str):
+        self.index_path = index_path
+        self.data_path = data_path
+        self._users = 0
+        self._retired = False
+        self._users_lock = threading.Lock()
+        with open(index_path, "rb") as f:
+            self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, node_count, segment_count, file_count, segments_offset, files_offset, meta_offset = (
+            _HEADER.unpack_from(self._index, 0)
+        )
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{index_path} is not a version {_VERSION} repository snapshot")
+        view = memoryview(self._index)
+        position = _HEADER.size
+        node_segments = _view(view, position, position + node_count * 4, "I")
+        position += node_count * 4
+        parents = _view(view, position, position + node_count * 4, "i")
+        position += node_count * 4
+        kinds = view[position:position + node_count]
+        position += node_count + _pad(node_count, 4)
+        segment_offsets = _view(view, position, position + (segment_count + 1) * 4, "I")
+        position += (segment_count + 1) * 4
+        segments = [
+            bytes(view[position + segment_offsets[i]:position + segment_offsets[i + 1]]).decode(
+                "utf-8", errors="surrogateescape"
+            )
+            for i in range(segment_count)
+        ]
+        position = files_offset
+        self.file_nodes = _view(view, position, position + file_count * 4, "I")
+        position += file_count * 4 + _pad(file_count * 4, 8)
+        self._offsets = _view(view, position, position + file_count * 8, "Q")
+        position += file_count * 8
+        self._sizes = _view(view, position, position + file_count * 8, "Q")
+        position += file_count * 8
+        self._hashes = view[position:position + file_count * 32]
+        meta = json.loads(bytes(view[meta_offset:]).decode("utf-8"))
+        self.repo_name: str = meta["repo"]
+        self.source: str = meta["source"]
+        self.commit: str = meta["commit"]
+        self.root: str = meta.get("root", "")
+        self.built_at: float = meta.get("built_at", 0.0)
+        self.repo_info: str = meta.get("repo_info", "")
+        self.directory_structure: str = meta.get("directory_structure", "")
+        self.skipped: Dict[str, list] = meta.get("skipped", {})
+        self.tree = CompactTree.from_arrays(segments, node_segments, parents, kinds)
+
+        data_size = os.path.getsize(data_path)
+        if data_size:
+            with open(data_path, "rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._data = b""
+        if file_count and max(self._offsets[i] + self._sizes[i] for i in range(file_count)) > data_size:
+            raise ValueError(f"{data_path} is truncated")
+
+    def _file_position(self, node: int) -> Optional[int]:
+        position = bisect_left(self.file_nodes, node)
+        if position < len(self.file_nodes) and self.file_nodes[position] == node:
+            return position
+        return None
+
+    def content_bytes(self, node: int) -> Optional[memoryview]:
+        """
+        The content of a file node as a view into the data map, or None if the
+        node is not a file or had no content.
+        """
+        position = self._file_position(node)
+        if position is None or bytes(self._hashes[position * 32:position * 32 + 32]) == _NO_HASH:
+            return None
+        offset = self._offsets[position]
+        return memoryview(self._data)[offset:offset + self._sizes[position]]
+
+    def content_hash(self, node: int) -> Optional[str]:
+        position = self._file_position(node)
+        if position is None:
+            return None
+        digest = bytes(self._hashes[position * 32:position * 32 + 32])
+        return None if digest == _NO_HASH else digest.hex()
+
+    def read_text(self, relative_path: str) -> Optional[str]:
+        """
+        The content of the file at a repository-relative path, or None.
+        """
+        node = self.tree.find(relative_path)
+        if node is None:
+            return None
+        data = self.content_bytes(node)
+        return None if data is None else str(data, "utf-8")
+
+    def iter_files(self) -> Iterator[Tuple[str, str]]:
+        """
+        Yields (relative path, code) of every file with content, in tree order.
+        """
+        for node in self.file_nodes:
+            data = self.content_bytes(node)
+            if data is not None:
+                yield self.tree.relative_path(node), str(data, "utf-8")
+
+    def iter_records(self) -> Iterator[FileRecord]:
+        """
+        Yields a FileRecord per file in tree order, as RepoIngestStream.iter_records
+        does: TEXT records with the stored content, and the files stored without
+        content with the kind, size and sha256 recorded at ingest. Files that had
+        no content block at all are left out.
+        """
+        for node in self.file_nodes:
+            path = self.tree.relative_path(node)
+            skipped = self.skipped.get(path)
+            if skipped is not None:
+                kind, size, sha256 = skipped
+                yield FileRecord(path, kind, size, sha256=sha256)
+                continue
+            data = self.content_bytes(node)
+            if data is not None:
+                yield FileRecord(path, TEXT, len(data), content=str(data, "utf-8"))
+
+    def to_parsed_data(self) -> Dict[str, Any]:
+        """
+        The input insert_repo_structure expects, served from the snapshot.
+        """
+        return {
+            "repo_info": self.repo_info,
+            "directory_structure": self.directory_structure,
+            "files": self.iter_records(),
+            "source": self.source,
+            "commit": self.commit,
+        }
+
+    def acquire(self) -> "RepoSnapshot":
+        with self._users_lock:
+            if self._retired and not self._users:
+                raise ValueError(f"{self.index_path} is closed")
+            self._users += 1
+        return self
+
+    def release(self):
+        with self._users_lock:
+            self._users -= 1
+            close = self._retired and not self._users
+        if close:
+            self.close()
+
+    def retire(self):
+        """
+        Closes the snapshot now if nobody uses it, otherwise when the last user releases it.
+        """
+        with self._users_lock:
+            self._retired = True
+            close = not self._users
+        if close:
+            self.close()
+
+    def __enter__(self) -> "RepoSnapshot":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def close(self):
+        """
+        Unmaps both files. Views handed out by content_bytes must be released first.
+        """
+        for table in (self.file_nodes, self._offsets, self._sizes, self._hashes,
+                      self.tree.node_segments, self.tree.parents, self.tree.kinds):
+            if isinstance(table, memoryview):
+                table.release()
+        self._index.close()
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+
+class SnapshotStore:
+    """
+    Directory of snapshots, one subdirectory per checkout (named by the sha256 of
+    its source path) holding <commit>.rsnap / <commit>.rdat pairs. Opened snapshots
+    are cached, up to `max_open` of them, least recently opened first out; at most
+    `keep` commits are kept per checkout. Snapshots dropped from the cache, or
+    whose files are pruned, are closed once their last user releases them.
+    """
+
+    def __init__(self, root: Optional[str] = None, keep: Optional[int] = None, max_open: Optional[int] = None):
+        config = get_snapshot_config()
+        self.root = root or config["path"]
+        self.keep = keep or config["keep"]
+        self.max_open = max_open or config["max_open"]
+        self._open: "OrderedDict[Tuple[str, str], RepoSnapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _directory(self, source: str) -> str:
+        return os.path.join(self.root, hashlib.sha256(source.encode("utf-8")).hexdigest())
+
+    def paths_for(self, source: str, commit: str) -> Tuple[str, str]:
+        """
+        The index and data file paths of a snapshot. Raises ValueError unless
+        `commit` is a full hex commit id, so it cannot escape the store directory.
+        """
+        if not is_valid_commit(commit):
+            raise ValueError(f"Invalid commit id: {commit!r}")
+        base = os.path.join(self._directory(source), commit)
+        return base + _INDEX_SUFFIX, base + _DATA_SUFFIX
+
+    def exists(self, source: str, commit: str) -> bool:
+        return os.path.exists(self.paths_for(source, commit)[0])
+
+    def writer(
+        self, repo_name: str, source: str, commit: str, root: str = "",
+        repo_info: str = "", directory_structure: str = "",
+    ) -> RepoSnapshotWriter:
+        index_path, data_path = self.paths_for(source, commit)
+        return RepoSnapshotWriter(
+            index_path, data_path, repo_name, source, commit, root, repo_info, directory_structure
+        )
+
+    def finish(self, writer: RepoSnapshotWriter, tree: CompactTree) -> Dict[str, Any]:
+        """
+        Completes a writer and removes the checkout's oldest snapshots beyond `keep`.
+        """
+        stats = writer.finish(tree)
+        source, commit = writer.meta["source"], writer.meta["commit"]
+        self._evict((source, commit))
+        self._prune(source)
+        logger.info(f"Snapshot of {source}@{commit}: {stats['files']} files, {stats['bytes']} bytes")
+        return stats
+
+    def _prune(self, source: str):
+        directory = self._directory(source)
+        try:
+            indexes = [
+                e for e in os.scandir(directory)
+                if e.name.endswith(_INDEX_SUFFIX) and is_valid_commit(e.name[:-len(_INDEX_SUFFIX)])
+            ]
+        except FileNotFoundError:
+            return
+        indexes.sort(key=lambda e: e.stat().st_mtime_ns, reverse=True)
+        for entry in indexes[self.keep:]:
+            commit = entry.name[:-len(_INDEX_SUFFIX)]
+            self._evict((source, commit))
+            for path in self.paths_for(source, commit):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+    def _evict(self, key: Tuple[str, str]):
+        with self._lock:
+            snapshot = self._open.pop(key, None)
+        if snapshot is not None:
+            snapshot.retire()
+
+    def open(self, source: str, commit: str) -> Optional[RepoSnapshot]:
+        """
+        Returns the snapshot of `source` at `commit` pinned for the caller, or None
+        if there is none. Use it in a with block (or call release()) so it can be
+        closed once evicted.
+        """
+        key = (source, commit)
+        with self._lock:
+            snapshot = self._open.get(key)
+            if snapshot is not None:
+                self._open.move_to_end(key)
+                return snapshot.acquire()
+        index_path, data_path = self.paths_for(source, commit)
+        try:
+            snapshot = RepoSnapshot(index_path, data_path)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable snapshot {index_path}: {e}")
+            return None
+        evicted = []
+        with self._lock:
+            cached = self._open.get(key)
+            if cached is not None:
+                # Another thread opened it meanwhile; keep a single mapping.
+                self._open.move_to_end(key)
+                snapshot.close()
+                return cached.acquire()
+            self._open[key] = snapshot
+            snapshot.acquire()
+            while len(self._open) > self.max_open:
+                evicted.append(self._open.popitem(last=False)[1])
+        for stale in evicted:
+            stale.retire()
+        return snapshot
+
+
+_default_store: Optional[SnapshotStore] = None
+
+
+def get_snapshot_store() -> SnapshotStore:
+    """
+    Returns the process-wide snapshot store configured through SNAPSHOT_PATH.
+    """
+    global _default_store
+    if _default_store is None:
+        _default_store = SnapshotStore()
+    return _default_store
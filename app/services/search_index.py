@@ -0,0 +1,395 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from app.core.config_provider import get_search_index_config
+from app.services.blob_store import LocalBlobStore, get_blob_store
+
+logger = logging.getLogger(__name__)
+
+# File layout (little-endian):
+#   header      magic, version, doc count, trigram count, postings offset, docs offset
+#   keys        uint32[trigram count], sorted; a trigram is its three bytes as b0<<16|b1<<8|b2
+#   offsets     uint32[trigram count + 1] into the postings section
+#   postings    per trigram the ascending doc ids, delta- and varint-encoded
+#   docs        JSON {"repo", "commit", "built_at", "docs": [[path, content_hash], ...]}
+_MAGIC = b"TGRM"
+_VERSION = 1
+_HEADER = struct.Struct("<4sIIIQQ")
+_INDEX_SUFFIX = ".tgi"
+_LINE_PREVIEW_CHARS = 500
+
+
+def _normalize(text: str) -> bytes:
+    # Trigrams are case-folded so one index serves case-sensitive and -insensitive
+    # queries; casefold() maps characters one by one, so a substring of the text
+    # always folds to a substring of the folded text.
+    return text.casefold().encode("utf-8", errors="surrogatepass")
+
+
+def trigrams(text: str) -> Set[int]:
+    data = _normalize(text)
+    return {(a << 16) | (b << 8) | c for a, b, c in set(zip(data, data[1:], data[2:]))}
+
+
+def _encode_postings(doc_ids: Iterable[int]) -> bytes:
+    out = bytearray()
+    previous = 0
+    for doc_id in doc_ids:
+        delta = doc_id - previous
+        previous = doc_id
+        while delta >= 0x80:
+            out.append((delta & 0x7F) | 0x80)
+            delta >>= 7
+        out.append(delta)
+    return bytes(out)
+
+
+def _decode_postings(data) -> List[int]:
+    doc_ids = []
+    value = shift = previous = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        previous += value
+        doc_ids.append(previous)
+        value = shift = 0
+    return doc_ids
+
+
+def _required_literals(parsed) -> List[str]:
+    """
+    Literal runs every match of a parsed regex must contain. Only concatenations
+    are followed (including groups and repeats with a minimum of one); anything
+    that can match different text (classes, alternations, optional parts) ends
+    the current run, which keeps the result a safe lower bound.
+    """
+    runs: List[str] = []
+    current: List[str] = []
+
+    def flush():
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    for op, value in parsed:
+        if op is sre_parse.LITERAL:
+            current.append(chr(value))
+            continue
+        flush()
+        if op is sre_parse.SUBPATTERN:
+            runs.extend(_required_literals(value[-1]))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, "POSSESSIVE_REPEAT", None)):
+            low, _, item = value
+            if low >= 1:
+                runs.extend(_required_literals(item))
+        elif op is getattr(sre_parse, "ATOMIC_GROUP", None):
+            runs.extend(_required_literals(value))
+    flush()
+    return runs
+
+
+def query_trigrams(pattern: str, regex: bool = False) -> Set[int]:
+    """
+    Trigrams a file must contain to possibly match the query. An empty set means
+    the index cannot narrow the query down and every file is a candidate.
+    """
+    if not regex:
+        return trigrams(pattern)
+    required: Set[int] = set()
+    for literal in _required_literals(sre_parse.parse(pattern)):
+        required |= trigrams(literal)
+    return required
+
+
+class TrigramIndexBuilder:
+    """
+    Accumulates the trigram postings of a repository's files in memory and writes
+    them as one index file. Doc ids are assigned in insertion order, so every
+    posting list stays sorted without a final sort.
+    """
+
+    def __init__(self, repo_name: str, commit: Optional[str] = None):
+        self.repo_name = repo_name
+        self.commit = commit
+        self._docs: List[Tuple[str, str]] = []
+        self._paths: Set[str] = set()
+        self._postings: Dict[int, array] = defaultdict(lambda: array("I"))
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, path: str, content_hash: str, code: str):
+        if path in self._paths:
+            return
+        doc_id = len(self._docs)
+        self._docs.append((path, content_hash))
+        self._paths.add(path)
+        for trigram in trigrams(code):
+            self._postings[trigram].append(doc_id)
+
+    def add_from(self, index: "TrigramIndex", exclude_paths: Iterable[str] = ()):
+        """
+        Copies the files of an existing index, except exclude_paths, without
+        re-reading their contents. Used by incremental ingest.
+        """
+        exclude_paths = set(exclude_paths)
+        remap: Dict[int, int] = {}
+        for old_id, (path, content_hash) in enumerate(index.docs):
+            if path in exclude_paths or path in self._paths:
+                continue
+            remap[old_id] = len(self._docs)
+            self._docs.append((path, content_hash))
+            self._paths.add(path)
+        for position in range(index.trigram_count):
+            doc_ids = [remap[d] for d in index.postings_at(position) if d in remap]
+            if doc_ids:
+                self._postings[index.keys[position]].extend(doc_ids)
+
+    def write(self, path: str) -> Dict[str, Any]:
+        """
+        Writes the index to `path` through a temporary file and an atomic rename,
+        so concurrent searches keep reading the previous version until they reopen.
+        """
+        keys = sorted(self._postings)
+        offsets = array("I", [0])
+        postings = bytearray()
+        for key in keys:
+            postings += _encode_postings(self._postings[key])
+            offsets.append(len(postings))
+        key_array = array("I", keys)
+        if sys.byteorder != "little":
+            key_array.byteswap()
+            offsets.byteswap()
+        docs = json.dumps({
+            "repo": self.repo_name,
+            "commit": self.commit,
+            "built_at": time.time(),
+            "docs": self._docs,
+        }).encode("utf-8")
+
+        if len(postings) > 0xFFFFFFFF:
+            raise ValueError(f"Postings of {self.repo_name} exceed the 4 GiB index format limit")
+        keys_bytes = key_array.tobytes()
+        postings_offset = _HEADER.size + len(keys_bytes) + len(offsets) * offsets.itemsize
+        docs_offset = postings_offset + len(postings)
+        header = _HEADER.pack(_MAGIC, _VERSION, len(self._docs), len(keys), postings_offset, docs_offset)
+
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for part in (header, keys_bytes, offsets.tobytes(), postings, docs):
+                    f.write(part)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return {"files": len(self._docs), "trigrams": len(keys), "bytes": docs_offset + len(docs)}
+
+
+class TrigramIndex:
+    """
+    Read-only view of an index file. The key and offset tables are used straight
+    from the memory map and posting lists are decoded on demand, so opening an
+    index costs one mmap and the JSON doc table.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, doc_count, trigram_count, postings_offset, docs_offset = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a version {_VERSION} trigram index")
+        self.trigram_count = trigram_count
+        self._postings_offset = postings_offset
+        keys_end = _HEADER.size + trigram_count * 4
+        view = memoryview(self._mmap)
+        if sys.byteorder == "little":
+            self.keys = view[_HEADER.size:keys_end].cast("I")
+            self._offsets = view[keys_end:postings_offset].cast("I")
+        else:
+            self.keys = array("I", view[_HEADER.size:keys_end])
+            self.keys.byteswap()
+            self._offsets = array("I", view[keys_end:postings_offset])
+            self._offsets.byteswap()
+        meta = json.loads(bytes(view[docs_offset:]).decode("utf-8"))
+        self.repo_name: str = meta["repo"]
+        self.commit: Optional[str] = meta.get("commit")
+        self.built_at: float = meta.get("built_at", 0.0)
+        self.docs: List[Tuple[str, str]] = [tuple(doc) for doc in meta["docs"]]
+        if len(self.docs) != doc_count:
+            raise ValueError(f"{path} is truncated")
+
+    def postings_at(self, position: int) -> List[int]:
+        start = self._postings_offset + self._offsets[position]
+        end = self._postings_offset + self._offsets[position + 1]
+        return _decode_postings(self._mmap[start:end])
+
+    def postings(self, trigram: int) -> List[int]:
+        position = bisect_left(self.keys, trigram)
+        if position < self.trigram_count and self.keys[position] == trigram:
+            return self.postings_at(position)
+        return []
+
+    def candidates(self, required: Set[int]) -> Optional[List[int]]:
+        """
+        Doc ids containing every required trigram, or None if nothing is required.
+        Lists are intersected shortest first, judged by their encoded size.
+        """
+        if not required:
+            return None
+        positions = []
+        for trigram in required:
+            position = bisect_left(self.keys, trigram)
+            if position >= self.trigram_count or self.keys[position] != trigram:
+                return []
+            positions.append(position)
+        positions.sort(key=lambda p: self._offsets[p + 1] - self._offsets[p])
+        result = self.postings_at(positions[0])
+        for position in positions[1:]:
+            if not result:
+                break
+            other = set(self.postings_at(position))
+            result = [doc_id for doc_id in result if doc_id in other]
+        return result
+
+    def search(
+        self,
+        query: str,
+        regex: bool = False,
+        case_sensitive: bool = True,
+        max_results: Optional[int] = None,
+        blob_store: Optional[LocalBlobStore] = None,
+    ) -> Dict[str, Any]:
+        """
+        Finds `query` (a substring, or a Python regex with regex=True) in the indexed
+        files. Candidates from the index are verified against their blob contents,
+        so results never include false positives. Raises re.error for bad patterns.
+        """
+        max_results = max_results or get_search_index_config()["max_results"]
+        blob_store = blob_store or get_blob_store()
+        flags = re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE
+        matcher = re.compile(query if regex else re.escape(query), flags)
+        candidates = self.candidates(query_trigrams(query, regex))
+        doc_ids = range(len(self.docs)) if candidates is None else candidates
+
+        matches: List[Dict[str, Any]] = []
+        files_scanned = 0
+        missing = 0
+        truncated = False
+        for doc_id in doc_ids:
+            path, content_hash = self.docs[doc_id]
+            try:
+                content = blob_store.get_text(content_hash)
+            except KeyError:
+                missing += 1
+                continue
+            files_scanned += 1
+            line = 1
+            position = 0
+            for match in matcher.finditer(content):
+                line += content.count("\n", position, match.start())
+                position = match.start()
+                line_start = content.rfind("\n", 0, position) + 1
+                line_end = content.find("\n", position)
+                text = content[line_start:line_end if line_end != -1 else len(content)]
+                matches.append({
+                    "path": path,
+                    "line": line,
+                    "column": position - line_start + 1,
+                    "text": text[:_LINE_PREVIEW_CHARS],
+                })
+                if len(matches) >= max_results:
+                    truncated = True
+                    break
+            if truncated:
+                break
+        if missing:
+            logger.warning(f"Search in {self.repo_name}: {missing} candidate blobs missing from the blob store")
+        return {
+            "repo": self.repo_name,
+            "query": query,
+            "regex": regex,
+            "case_sensitive": case_sensitive,
+            "indexed": candidates is not None,
+            "total_files": len(self.docs),
+            "candidate_files": len(doc_ids),
+            "files_scanned": files_scanned,
+            "matches": matches,
+            "truncated": truncated,
+        }
+
+
+class SearchIndexStore:
+    """
+    Directory of per-repository index files, named by the sha256 of the repository
+    name. Opened indexes are cached and reopened when their file is replaced.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or get_search_index_config()["path"]
+        self._open: Dict[str, Tuple[Tuple[int, int], TrigramIndex]] = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, repo_name: str) -> str:
+        return os.path.join(self.root, hashlib.sha256(repo_name.encode("utf-8")).hexdigest() + _INDEX_SUFFIX)
+
+    def write(self, builder: TrigramIndexBuilder) -> Dict[str, Any]:
+        stats = builder.write(self.path_for(builder.repo_name))
+        logger.info(f"Search index for {builder.repo_name}: {stats['files']} files, {stats['trigrams']} trigrams")
+        return stats
+
+    def open(self, repo_name: str) -> Optional[TrigramIndex]:
+        """
+        Returns the repository's index, or None if it has not been built.
+        """
+        path = self.path_for(repo_name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_ino, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._open.get(repo_name)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+        index = TrigramIndex(path)
+        with self._lock:
+            self._open[repo_name] = (stamp, index)
+        return index
+
+
+_default_store: Optional[SearchIndexStore] = None
+
+
+def get_search_index_store() -> SearchIndexStore:
+    """
+    Returns the process-wide index store configured through SEARCH_INDEX_PATH.
+    """
+    global _default_store
+    if _default_store is None:
+        _default_store = SearchIndexStore()
+    return _default_store
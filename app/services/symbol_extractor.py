@@ -0,0 +1,253 @@
+import ast
+import logging
+import multiprocessing
+import os
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.core.config_provider import get_symbol_extraction_config
+
+logger = logging.getLogger(__name__)
+
+CLASS = "class"
+FUNCTION = "function"
+
+
+class LanguageExtractor(ABC):
+    """
+    Extracts symbol definitions and imports from the source of one language.
+
+    extract() returns {"symbols": [...], "imports": [...]} where every symbol is
+    { kind ("class" | "function"), name, qualified_name, line, end_line } and every
+    import is { module, names, level } (level > 0 for relative imports).
+    Subclasses are registered for their file extensions with register_extractor.
+    """
+    language = ""
+    extensions: Tuple[str, ...] = ()
+
+    @abstractmethod
+    def extract(self, path: str, code: str) -> Dict[str, List[Dict[str, Any]]]:
+        ...
+
+    def resolve_import(self, importing_path: str, record: Dict[str, Any], known_paths: Set[str]) -> List[str]:
+        """
+        Maps an import record to repository-relative file paths; empty if external.
+        """
+        return []
+
+
+class PythonExtractor(LanguageExtractor):
+    language = "python"
+    extensions = (".py", ".pyi")
+
+    def extract(self, path: str, code: str) -> Dict[str, List[Dict[str, Any]]]:
+        tree = ast.parse(code, filename=path)
+        symbols: List[Dict[str, Any]] = []
+        imports: List[Dict[str, Any]] = []
+        stack: List[Tuple[ast.AST, str]] = [(tree, "")]
+        while stack:
+            node, scope = stack.pop()
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                    qualified_name = f"{scope}.{child.name}" if scope else child.name
+                    symbols.append({
+                        "kind": CLASS if isinstance(child, ast.ClassDef) else FUNCTION,
+                        "name": child.name,
+                        "qualified_name": qualified_name,
+                        "line": child.lineno,
+                        "end_line": getattr(child, "end_lineno", child.lineno),
+                    })
+                    stack.append((child, qualified_name))
+                elif isinstance(child, ast.Import):
+                    for alias in child.names:
+                        imports.append({"module": alias.name, "names": [], "level": 0})
+                elif isinstance(child, ast.ImportFrom):
+                    imports.append({
+                        "module": child.module or "",
+                        "names": [alias.name for alias in child.names if alias.name != "*"],
+                        "level": child.level,
+                    })
+                else:
+                    # Descend into blocks (if/try/with, ...) that may hold definitions or imports.
+                    stack.append((child, scope))
+        return {"symbols": symbols, "imports": imports}
+
+    def resolve_import(self, importing_path: str, record: Dict[str, Any], known_paths: Set[str]) -> List[str]:
+        base_parts: List[str] = []
+        if record["level"]:
+            package_parts = importing_path.split("/")[:-1]
+            drop = record["level"] - 1
+            if drop > len(package_parts):
+                return []
+            base_parts = package_parts[:len(package_parts) - drop] if drop else package_parts
+        module_parts = base_parts + [part for part in record["module"].split(".") if part]
+
+        def module_file(parts: List[str]) -> Optional[str]:
+            if not parts:
+                return None
+            stem = "/".join(parts)
+            for candidate in (f"{stem}.py", f"{stem}/__init__.py", f"{stem}.pyi"):
+                if candidate in known_paths:
+                    return candidate
+            return None
+
+        resolved = []
+        for name in record["names"]:
+            # "from pkg import mod" may name a submodule rather than an attribute.
+            submodule = module_file(module_parts + [name])
+            if submodule:
+                resolved.append(submodule)
+        if len(resolved) < len(record["names"]) or not record["names"]:
+            module = module_file(module_parts)
+            if module:
+                resolved.append(module)
+        return sorted(set(resolved))
+
+
+_extractors: Dict[str, LanguageExtractor] = {}
+
+
+def register_extractor(extractor: LanguageExtractor):
+    for extension in extractor.extensions:
+        _extractors[extension] = extractor
+
+
+def get_extractor(path: str) -> Optional[LanguageExtractor]:
+    return _extractors.get(os.path.splitext(path)[1].lower())
+
+
+register_extractor(PythonExtractor())
+
+
+def extract_file_symbols(path: str, code: str) -> Dict[str, Any]:
+    """
+    Extracts symbols of one file. Returns { path, symbols, imports, error }.
+    """
+    extractor = get_extractor(path)
+    if extractor is None:
+        return {"path": path, "symbols": [], "imports": [], "error": None}
+    try:
+        result = extractor.extract(path, code)
+        return {"path": path, "symbols": result["symbols"], "imports": result["imports"], "error": None}
+    except (SyntaxError, ValueError, RecursionError) as e:
+        return {"path": path, "symbols": [], "imports": [], "error": f"{type(e).__name__}: {e}"}
+
+
+def _extract_chunk(chunk: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    # Runs in worker processes; must stay a module-level function to be picklable.
+    return [extract_file_symbols(path, code) for path, code in chunk]
+
+
+class SymbolExtractionPipeline:
+    """
+    Extracts symbols from a stream of (path, code) pairs on a process pool.
+
+    Files with a registered extractor are grouped into chunks of chunk_size and
+    parsed in worker processes; at most 2 * max_workers chunks are in flight, so
+    the amount of buffered source stays bounded however long the stream is.
+    Streams smaller than one chunk are parsed inline without starting a pool.
+    Use as a context manager, feed files with add() and collect results().
+
+    With `on_result`, each result is handed to it on the calling thread as soon as
+    its chunk completes (checked on every add) instead of being collected, so
+    nothing is held for the whole repository; results() then only waits for the
+    remaining chunks.
+    """
+
+    def __init__(
+        self, max_workers: Optional[int] = None, chunk_size: Optional[int] = None,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ):
+        config = get_symbol_extraction_config()
+        self.max_workers = max_workers or config["max_workers"]
+        self.chunk_size = chunk_size or config["chunk_size"]
+        self.on_result = on_result
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._chunk: List[Tuple[str, str]] = []
+        self._in_flight: Deque[Future] = deque()
+        self._results: List[Dict[str, Any]] = []
+
+    def __enter__(self) -> "SymbolExtractionPipeline":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, path: str, code: str):
+        if get_extractor(path) is None:
+            return
+        self._chunk.append((path, code))
+        if len(self._chunk) >= self.chunk_size:
+            self._submit()
+        while self._in_flight and self._in_flight[0].done():
+            self._collect(self._in_flight.popleft().result())
+
+    def add_all(self, files: Iterable[Tuple[str, str]]):
+        for path, code in files:
+            self.add(path, code)
+
+    def _submit(self):
+        chunk, self._chunk = self._chunk, []
+        if self._executor is None:
+            # spawn: ingest runs on worker threads, and forking a threaded process is unsafe.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        while len(self._in_flight) >= 2 * self.max_workers:
+            self._collect(self._in_flight.popleft().result())
+        self._in_flight.append(self._executor.submit(_extract_chunk, chunk))
+
+    def _collect(self, results: List[Dict[str, Any]]):
+        for result in results:
+            if result["error"]:
+                logger.debug(f"Symbol extraction skipped {result['path']}: {result['error']}")
+            if self.on_result is not None:
+                self.on_result(result)
+            else:
+                self._results.append(result)
+
+    def flush(self):
+        """
+        Waits for all submitted files, passing their results to on_result if set.
+        """
+        if self._chunk:
+            if self._executor is None:
+                self._collect(_extract_chunk(self._chunk))
+                self._chunk = []
+            else:
+                self._submit()
+        while self._in_flight:
+            self._collect(self._in_flight.popleft().result())
+
+    def results(self) -> Iterator[Dict[str, Any]]:
+        """
+        Waits for all submitted files and yields one result per file not already
+        passed to on_result.
+        """
+        self.flush()
+        results, self._results = self._results, []
+        yield from results
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+def resolve_imports(result: Dict[str, Any], known_paths: Set[str]) -> Tuple[List[str], List[str]]:
+    """
+    Splits the imports of one file result into (repository files, external module names).
+    """
+    extractor = get_extractor(result["path"])
+    files: Set[str] = set()
+    modules: Set[str] = set()
+    for record in result["imports"]:
+        targets = extractor.resolve_import(result["path"], record, known_paths) if extractor else []
+        if targets:
+            files.update(targets)
+        elif not record["level"] and record["module"]:
+            modules.add(record["module"])
+    files.discard(result["path"])
+    return sorted(files), sorted(modules)
@@ -1,7 +1,6 @@
 import asyncio
 from typing import Optional
 
-from langchain_core.tools import StructuredTool
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
@@ -9,4 +8,8 @@ from app.modules.code_provider.code_provider_service import CodeProviderService
 
 
 class RepoStructureRequest(BaseModel):
-    path: Optional[str] = None
\ No newline at end of file
+    # Project whose repository is read by the local code provider.
+    project_id: Optional[str] = None
+    path: Optional[str] = None
+    # Only re-ingest files changed since the last ingested commit (local git checkouts).
+    incremental: bool = False
@@ -0,0 +1,98 @@
+"""
+Memory benchmark for CompactTree against the dict output of parse_file_structure.
+
+Builds a synthetic repository tree in memory and measures, with tracemalloc, the
+peak and retained memory of
+  - dict:    parse_file_structure on the rendered text, enriched with "code" per
+             file and a file_contents mapping, as get_structure_and_code returns it
+  - compact: CompactTree.from_tree_node with set_content per file
+File contents are generated up front and shared by both, so the numbers compare
+the structure overhead only.
+
+    python -m benchmarks.bench_compact_tree [--depth 4] [--fan-out 8] [--files 12]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import List
+
+from app.modules.code_provider.tree_node import DIRECTORY, FILE, TreeNode, render_tree
+from app.services.compact_tree import CompactTree
+from app.services.github_parser import parse_file_structure
+
+FILE_NAMES = ["__init__.py", "index.ts", "utils.py", "README.md", "models.py", "test_api.py", "types.d.ts"]
+
+
+def build_tree(depth: int, fan_out: int, files_per_dir: int) -> TreeNode:
+    root = TreeNode(name="synthetic", type=DIRECTORY, path="")
+    stack = [(root, 0)]
+    while stack:
+        directory, level = stack.pop()
+        prefix = f"{directory.path}/" if directory.path else ""
+        for i in range(files_per_dir):
+            name = FILE_NAMES[i] if i < len(FILE_NAMES) else f"module_{i}.py"
+            directory.children.append(TreeNode(name=name, type=FILE, path=f"{prefix}{name}"))
+        if level < depth:
+            for i in range(fan_out):
+                name = f"pkg_{i}"
+                child = TreeNode(name=name, type=DIRECTORY, path=f"{prefix}{name}")
+                directory.children.append(child)
+                stack.append((child, level + 1))
+    return root
+
+
+def build_dict(text: str, contents: List[str]) -> dict:
+    parsed = parse_file_structure(text)
+    for file_node, code in zip(parsed["files"], contents):
+        file_node["code"] = code
+    parsed["file_contents"] = {fn["path"]: fn.get("code", "") for fn in parsed["files"]}
+    return parsed
+
+
+def build_compact(tree: TreeNode, contents: List[str]) -> CompactTree:
+    compact = CompactTree.from_tree_node(tree)
+    for index, code in zip(compact.iter_files(), contents):
+        compact.set_content(index, code)
+    return compact
+
+
+def measure(build, *args):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build(*args)
+    elapsed = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, retained, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fan-out", type=int, default=8)
+    parser.add_argument("--files", type=int, default=12, help="files per directory")
+    parser.add_argument("--file-bytes", type=int, default=200)
+    args = parser.parse_args()
+
+    tree = build_tree(args.depth, args.fan_out, args.files)
+    text = render_tree(tree)
+    file_count = sum(1 for node, _ in tree.iter_nodes() if not node.is_directory)
+    contents = [f"# file {i}\n" + "x" * args.file_bytes for i in range(file_count)]
+
+    parsed, dict_time, dict_retained, dict_peak = measure(build_dict, text, contents)
+    compact, compact_time, compact_retained, compact_peak = measure(build_compact, tree, contents)
+
+    assert len(parsed["files"]) == file_count == len(compact.contents)
+    assert len(parsed["relationships"]) == sum(1 for _ in compact.iter_edges())
+    assert {f["path"] for f in parsed["files"]} == {compact.path(i) for i in compact.iter_files()}
+
+    print(f"tree: {len(compact)} nodes, {file_count} files, {len(compact.segments)} distinct names")
+    print(f"dict    : {dict_retained / 1e6:8.1f} MB retained, {dict_peak / 1e6:8.1f} MB peak, {dict_time:6.2f} s")
+    print(f"compact : {compact_retained / 1e6:8.1f} MB retained, {compact_peak / 1e6:8.1f} MB peak, {compact_time:6.2f} s")
+    print(f"compact retains {dict_retained / compact_retained:.1f}x less")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+End-to-end ingest benchmark on a synthetic repository, runnable offline.
+
+Generates a repository of the requested shape on disk together with its gitingest
+dump (see benchmarks.synthetic_repo), then times each stage of the pipeline:
+
+  walk         RepoWalker tree scan (LocalRepoService._build_directory_tree)
+  tree_text    render_tree + parse_file_structure (the text round trip)
+  tree_nodes   tree_to_parsed_structure on the walked tree
+  code_blocks  iter_code_blocks over the code dump, streamed from disk
+  file_stream  RepoIngestStream: walk plus classified, hashed reads of every file
+               (the native replacement for the gitingest dump)
+  structure_code  get_structure_and_code: tree scan plus concurrent file reads through
+               LocalRepoService, with the project resolved to the synthetic checkout
+  graph_write  insert_repo_structure against FakeNeo4jDriver, with a temporary
+               blob store and search index
+
+Every stage is run once for timing and, unless --no-memory is given, once more
+under tracemalloc for its peak memory, so tracing overhead does not distort the
+throughput numbers. graph_write also reports the statements, rows and
+transactions it sent, per query.
+
+    python -m benchmarks.bench_ingest [--depth 3] [--fan-out 6] [--files 10] [--file-size 2048]
+                                      [--batch-size 1000] [--symbols] [--json]
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from app.modules.code_provider.local_repo.ingest_stream import RepoIngestStream
+from app.modules.code_provider.local_repo.local_repo_service import LocalRepoService
+from app.modules.code_provider.local_repo.repo_walker import RepoWalker
+from app.modules.code_provider.tree_node import render_tree
+from app.services import neo4j_service
+from app.services.blob_store import LocalBlobStore
+from app.services.github_parser import get_structure_and_code, parse_file_structure, tree_to_parsed_structure
+from app.services.gitingest_parser import iter_code_blocks
+from app.services.search_index import SearchIndexStore
+from app.tools.get_code_file_structure_tool import RepoStructureRequest
+from benchmarks.fake_neo4j import FakeNeo4jDriver
+from benchmarks.synthetic_repo import RepoShape, render_summary, render_tree_text, write_code_dump, write_repo
+
+QUERY_NAMES = {
+    value: name for name, value in vars(neo4j_service).items()
+    if name.endswith("_QUERY") and isinstance(value, str)
+}
+
+
+@dataclass
+class StageResult:
+    name: str
+    seconds: float
+    items: int
+    bytes: int = 0
+    peak_bytes: Optional[int] = None
+    queries: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.seconds if self.seconds else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes / 1e6 / self.seconds if self.seconds else 0.0
+
+
+def run_stage(name: str, fn: Callable[[], Any], items: int, size: int, measure_memory: bool) -> StageResult:
+    gc.collect()
+    started = time.perf_counter()
+    fn()
+    result = StageResult(name=name, seconds=time.perf_counter() - started, items=items, bytes=size)
+    if measure_memory:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        result.peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def count_blocks(dump_path: str) -> int:
+    with open(dump_path, "r", encoding="utf-8") as f:
+        return sum(1 for _ in iter_code_blocks(f))
+
+
+def count_records(repo_path: str) -> int:
+    stream = RepoIngestStream(repo_path, walker=RepoWalker(exclude_globs=[]))
+    return sum(1 for _ in stream.iter_records())
+
+
+class CheckoutRepoService(LocalRepoService):
+    """
+    LocalRepoService whose every project resolves to one checkout, so the provider
+    path runs without a project database.
+    """
+
+    def __init__(self, repo_path: str):
+        super().__init__(db=None)
+        self.repo_path = repo_path
+
+    def _get_repo_path(self, project_id: str) -> str:
+        return self.repo_path
+
+
+def structure_and_code(repo_path: str) -> int:
+    service = CheckoutRepoService(repo_path)
+    parsed = asyncio.run(get_structure_and_code(
+        RepoStructureRequest(project_id="bench"), None, "main", local_service=service
+    ))
+    return len(parsed["file_contents"])
+
+
+def write_graph(parsed: Dict[str, str], dump_path: str, batch_size: int, symbols: bool) -> FakeNeo4jDriver:
+    driver = FakeNeo4jDriver()
+    with tempfile.TemporaryDirectory() as scratch, open(dump_path, "r", encoding="utf-8") as repo_code:
+        neo4j_service.insert_repo_structure(
+            {**parsed, "repo_code": repo_code},
+            batch_size=batch_size,
+            neo4j_driver=driver,
+            blob_store=LocalBlobStore(os.path.join(scratch, "blobs")),
+            search_index_store=SearchIndexStore(os.path.join(scratch, "search")),
+            extract_symbols=symbols,
+        )
+    return driver
+
+
+def run(shape: RepoShape, batch_size: int, symbols: bool, measure_memory: bool) -> Dict[str, Any]:
+    results: List[StageResult] = []
+    with tempfile.TemporaryDirectory() as directory:
+        repo_bytes = write_repo(shape, directory)
+        repo_path = os.path.join(directory, shape.name)
+        dump_path = os.path.join(directory, "dump.txt")
+        dump_bytes = write_code_dump(shape, dump_path)
+        entries = shape.file_count + shape.directory_count
+
+        results.append(run_stage(
+            "walk", lambda: RepoWalker(exclude_globs=[]).build_tree(repo_path, None, repo_path),
+            entries, 0, measure_memory,
+        ))
+        tree = RepoWalker(exclude_globs=[]).build_tree(repo_path, None, repo_path)
+        text = render_tree(tree)
+        results.append(run_stage(
+            "tree_text", lambda: parse_file_structure(render_tree(tree)), entries, len(text), measure_memory,
+        ))
+        results.append(run_stage(
+            "tree_nodes", lambda: tree_to_parsed_structure(tree), entries, 0, measure_memory,
+        ))
+        results.append(run_stage(
+            "code_blocks", lambda: count_blocks(dump_path), shape.file_count, dump_bytes, measure_memory,
+        ))
+
+        results.append(run_stage(
+            "structure_code", lambda: structure_and_code(repo_path), shape.file_count, repo_bytes, measure_memory,
+        ))
+        results.append(run_stage(
+            "file_stream", lambda: count_records(repo_path), shape.file_count, repo_bytes, measure_memory,
+        ))
+
+        parsed = {"repo_info": render_summary(shape), "directory_structure": render_tree_text(shape)}
+        drivers: List[FakeNeo4jDriver] = []
+        graph = run_stage(
+            "graph_write", lambda: drivers.append(write_graph(parsed, dump_path, batch_size, symbols)),
+            shape.file_count, dump_bytes, measure_memory,
+        )
+        graph.queries = drivers[0].stats(QUERY_NAMES)
+        results.append(graph)
+
+    return {
+        "shape": asdict(shape),
+        "files": shape.file_count,
+        "directories": shape.directory_count,
+        "repo_bytes": repo_bytes,
+        "batch_size": batch_size,
+        "symbols": symbols,
+        "stages": [
+            {**asdict(r), "items_per_second": r.items_per_second, "megabytes_per_second": r.megabytes_per_second}
+            for r in results
+        ],
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print(
+        f"repo: {report['files']} files, {report['directories']} directories, "
+        f"{report['repo_bytes'] / 1e6:.1f} MB; batch size {report['batch_size']}, "
+        f"symbols {'on' if report['symbols'] else 'off'}"
+    )
+    print(f"{'stage':<14} {'seconds':>9} {'items/s':>11} {'MB/s':>8} {'peak MB':>9}")
+    for stage in report["stages"]:
+        peak = f"{stage['peak_bytes'] / 1e6:9.1f}" if stage["peak_bytes"] is not None else f"{'-':>9}"
+        rate = f"{stage['megabytes_per_second']:8.1f}" if stage["bytes"] else f"{'-':>8}"
+        print(f"{stage['name']:<14} {stage['seconds']:9.3f} {stage['items_per_second']:11.0f} {rate} {peak}")
+        queries = stage["queries"]
+        if queries:
+            print(
+                f"  {queries['statements']} statements, {queries['rows']} rows, "
+                f"{queries['transactions']} transactions"
+            )
+            for name, counts in queries["by_query"].items():
+                print(f"    {name:<32} {counts['statements']:6d} statements {counts['rows']:9d} rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--fan-out", type=int, default=6)
+    parser.add_argument("--files", type=int, default=10, help="files per directory")
+    parser.add_argument("--file-size", type=int, default=2048, help="mean file size in bytes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--symbols", action="store_true", help="include symbol extraction in graph_write")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    shape = RepoShape(
+        depth=args.depth, fan_out=args.fan_out, files_per_dir=args.files,
+        file_size=args.file_size, seed=args.seed,
+    )
+    report = run(shape, args.batch_size, args.symbols, not args.no_memory)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
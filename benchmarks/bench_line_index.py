@@ -0,0 +1,66 @@
+"""
+Benchmark for range reads served from the line-offset index.
+
+Compares the previous readlines()-based slicing with LineIndexCache.read_range on
+a generated file, reporting the first hit (index build + read) and warm hits.
+
+    python -m benchmarks.bench_line_index [--lines 500000] [--range 50] [--repeat 200]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app.modules.code_provider.local_repo.line_index import LineIndexCache
+
+
+def readlines_range(path: str, start_line: int, end_line: int) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    start = max(start_line - 1, 0)
+    end = end_line if end_line <= len(lines) else len(lines)
+    return "".join(lines[start:end])
+
+
+def write_file(path: str, line_count: int):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(line_count):
+            f.write(f"export const generated_{i} = {{ id: {i}, value: 'x{'y' * (i % 80)}' }};\n")
+
+
+def timed(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=500_000)
+    parser.add_argument("--range", type=int, default=50, help="lines per request")
+    parser.add_argument("--repeat", type=int, default=200, help="warm requests to time")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "generated.js")
+        write_file(path, args.lines)
+        size_mb = os.path.getsize(path) / 1e6
+        starts = [random.randint(1, args.lines - args.range) for _ in range(args.repeat)]
+
+        cache = LineIndexCache(max_entries=4)
+        first_hit = timed(cache.read_range, path, starts[0], starts[0] + args.range)
+        warm = sum(timed(cache.read_range, path, s, s + args.range) for s in starts) / len(starts)
+        baseline = sum(timed(readlines_range, path, s, s + args.range) for s in starts[:20]) / 20
+
+        for s in starts[:20]:
+            assert cache.read_range(path, s, s + args.range) == readlines_range(path, s, s + args.range)
+
+    print(f"file: {args.lines} lines, {size_mb:.1f} MB; {args.range}-line ranges")
+    print(f"readlines baseline : {baseline * 1e3:9.3f} ms/request")
+    print(f"index first hit    : {first_hit * 1e3:9.3f} ms")
+    print(f"index warm hit     : {warm * 1e3:9.3f} ms/request ({baseline / warm:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
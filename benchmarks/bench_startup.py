@@ -0,0 +1,88 @@
+"""
+Cold-start benchmark for the FastAPI app.
+
+Starts fresh interpreters and measures, in each, the time to import app.main and
+to run the app's lifespan startup, then checks which heavy dependencies the
+import pulled in (none of neo4j, gitingest, langchain_core or GitPython should
+be loaded before a route needs them). With --importtime, the slowest modules of
+one import are listed from python -X importtime.
+
+    python -m benchmarks.bench_startup [--runs 10] [--importtime 15]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("neo4j", "gitingest", "langchain_core", "git")
+
+PROBE = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def start():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        return time.perf_counter()
+
+ready = asyncio.run(start())
+import app.db.session, app.services.neo4j_service
+print(json.dumps({
+    "import": imported - started,
+    "startup": ready - imported,
+    "loaded": [name for name in %r if name in sys.modules],
+    "engine_created": app.db.session._state is not None,
+}))
+""" % (HEAVY_MODULES,)
+
+
+def run_probe(env) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], capture_output=True, text=True, check=True, env=env
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(env, count: int):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, check=True, env=env,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--importtime", type=int, default=0, help="list the N slowest imports")
+    parser.add_argument("--warmup", action="store_true", help="keep STARTUP_WARMUP enabled")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if not args.warmup:
+        env["STARTUP_WARMUP"] = "false"
+    results = [run_probe(env) for _ in range(args.runs)]
+    imports = [r["import"] * 1e3 for r in results]
+    startups = [r["startup"] * 1e3 for r in results]
+    print(f"{args.runs} cold starts, warmup {'on' if args.warmup else 'off'}")
+    print(f"import app.main : median {statistics.median(imports):8.1f} ms, max {max(imports):8.1f} ms")
+    print(f"lifespan startup: median {statistics.median(startups):8.1f} ms, max {max(startups):8.1f} ms")
+    print(f"heavy modules loaded by import: {', '.join(results[0]['loaded']) or 'none'}")
+    print(f"database engine created at startup: {results[0]['engine_created']}")
+    if args.importtime:
+        print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+        for cumulative_us, self_us, name in slowest_imports(env, args.importtime):
+            print(f"{cumulative_us / 1e3:14.1f} {self_us / 1e3:8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
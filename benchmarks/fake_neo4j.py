@@ -0,0 +1,149 @@
+"""
+In-memory stand-in for the neo4j driver, for running the graph writers offline.
+
+FakeNeo4jDriver implements the parts of the driver API the services use
+(session(), execute_write/execute_read, tx.run(...).single()/.consume()/iteration)
+and records every statement with its parameters' row count and transaction
+instead of talking to a database. Reads return no records unless a responder
+is given.
+"""
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class RecordedStatement:
+    query: str
+    rows: int
+    transaction: int
+    params: Dict[str, Any]
+
+
+class FakeResult:
+    def __init__(self, records: List[Any]):
+        self._records = records
+
+    def single(self) -> Optional[Any]:
+        return self._records[0] if self._records else None
+
+    def consume(self) -> None:
+        return None
+
+    def data(self) -> List[Any]:
+        return list(self._records)
+
+    def __iter__(self):
+        return iter(self._records)
+
+
+class FakeTransaction:
+    def __init__(self, driver: "FakeNeo4jDriver", transaction: int):
+        self.driver = driver
+        self.transaction = transaction
+
+    def run(self, query: str, parameters: Optional[Dict[str, Any]] = None, **params) -> FakeResult:
+        return self.driver._record(query, {**(parameters or {}), **params}, self.transaction)
+
+
+class FakeSession:
+    def __init__(self, driver: "FakeNeo4jDriver"):
+        self.driver = driver
+
+    def __enter__(self) -> "FakeSession":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        pass
+
+    def execute_write(self, work: Callable, *args, **kwargs):
+        return work(FakeTransaction(self.driver, self.driver._begin(write=True)), *args, **kwargs)
+
+    def execute_read(self, work: Callable, *args, **kwargs):
+        return work(FakeTransaction(self.driver, self.driver._begin(write=False)), *args, **kwargs)
+
+    def run(self, query: str, parameters: Optional[Dict[str, Any]] = None, **params) -> FakeResult:
+        # Auto-commit statements run in a transaction of their own.
+        return FakeTransaction(self.driver, self.driver._begin(write=True)).run(query, parameters, **params)
+
+
+class FakeNeo4jDriver:
+    """
+    Records statements instead of executing them. `responder(query, params)` may
+    return the records for a statement; by default every statement returns none.
+    Parameters are only kept when keep_params is set, so large ingests do not hold
+    every row batch in memory.
+    """
+
+    def __init__(self, responder: Optional[Callable[[str, Dict[str, Any]], List[Any]]] = None,
+                 keep_params: bool = False):
+        self.responder = responder
+        self.keep_params = keep_params
+        self.statements: List[RecordedStatement] = []
+        self.write_transactions = 0
+        self.read_transactions = 0
+        self.sessions = 0
+        self.closed = False
+
+    def session(self, **config) -> FakeSession:
+        self.sessions += 1
+        return FakeSession(self)
+
+    def verify_connectivity(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def _begin(self, write: bool) -> int:
+        if write:
+            self.write_transactions += 1
+        else:
+            self.read_transactions += 1
+        return self.write_transactions + self.read_transactions
+
+    def _record(self, query: str, params: Dict[str, Any], transaction: int) -> FakeResult:
+        rows = params.get("rows")
+        self.statements.append(RecordedStatement(
+            query=query,
+            rows=len(rows) if isinstance(rows, list) else 0,
+            transaction=transaction,
+            params=params if self.keep_params else {},
+        ))
+        return FakeResult(self.responder(query, params) if self.responder else [])
+
+    @property
+    def transactions(self) -> int:
+        return self.write_transactions + self.read_transactions
+
+    @property
+    def rows(self) -> int:
+        return sum(statement.rows for statement in self.statements)
+
+    def reset(self):
+        self.statements = []
+        self.write_transactions = self.read_transactions = self.sessions = 0
+
+    def stats(self, names: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Statement, row and transaction counts, with a per-query breakdown. `names`
+        maps query text to a readable name (e.g. the *_QUERY constant it came from).
+        """
+        names = names or {}
+        statements: Counter = Counter()
+        rows: Counter = Counter()
+        for statement in self.statements:
+            name = names.get(statement.query) or " ".join(statement.query.split())[:60]
+            statements[name] += 1
+            rows[name] += statement.rows
+        return {
+            "statements": len(self.statements),
+            "rows": self.rows,
+            "transactions": self.transactions,
+            "write_transactions": self.write_transactions,
+            "read_transactions": self.read_transactions,
+            "by_query": {name: {"statements": statements[name], "rows": rows[name]} for name in statements},
+        }
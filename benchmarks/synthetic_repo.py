@@ -0,0 +1,160 @@
+"""
+Generators for synthetic repositories used by the benchmarks.
+
+A RepoShape describes a tree by depth, fan-out and files per directory; file
+contents are Python-like source of roughly file_size bytes, generated
+deterministically from the seed. The same shape can be written to disk (for the
+walker and file reads) or rendered as a gitingest dump (summary, tree, code) for
+the parsing and graph-writing stages, without needing gitingest itself.
+"""
+import os
+import random
+from dataclasses import dataclass
+from typing import Iterator, List, Tuple
+
+from app.services.gitingest_parser import BLOCK_DELIMITER
+
+
+@dataclass
+class RepoShape:
+    depth: int = 3
+    fan_out: int = 4
+    files_per_dir: int = 8
+    # Mean file size in bytes; each file varies by up to +/- size_jitter of it.
+    file_size: int = 2048
+    size_jitter: float = 0.5
+    seed: int = 0
+    name: str = "synthetic"
+
+    @property
+    def directory_count(self) -> int:
+        return sum(self.fan_out ** level for level in range(self.depth + 1))
+
+    @property
+    def file_count(self) -> int:
+        return self.directory_count * self.files_per_dir
+
+
+def iter_entries(shape: RepoShape) -> Iterator[Tuple[str, bool, int]]:
+    """
+    Yields (relative path, is_directory, depth) in pre-order, files before
+    subdirectories and both sorted by name, the order gitingest renders a tree in.
+    The repository root itself is not yielded.
+    """
+    def children(directory: str, level: int) -> List[Tuple[str, bool, int]]:
+        prefix = f"{directory}/" if directory else ""
+        entries = [(f"{prefix}module_{i:03d}.py", False, level + 1) for i in range(shape.files_per_dir)]
+        if level < shape.depth:
+            entries.extend((f"{prefix}pkg_{i:03d}", True, level + 1) for i in range(shape.fan_out))
+        return entries
+
+    stack = list(reversed(children("", 0)))
+    while stack:
+        path, is_directory, level = stack.pop()
+        yield path, is_directory, level
+        if is_directory:
+            stack.extend(reversed(children(path, level)))
+
+
+def iter_files(shape: RepoShape) -> Iterator[Tuple[str, str]]:
+    """
+    Yields (relative path, content) for every file of the shape, in tree order.
+    """
+    rng = random.Random(shape.seed)
+    for path, is_directory, _ in iter_entries(shape):
+        if not is_directory:
+            yield path, generate_source(rng, path, shape.file_size, shape.size_jitter)
+
+
+def generate_source(rng: random.Random, path: str, file_size: int, size_jitter: float = 0.0) -> str:
+    """
+    Python source of about file_size bytes: a few imports, then classes with
+    methods, so symbol extraction and the search index see realistic text.
+    """
+    target = max(64, int(file_size * (1 + rng.uniform(-size_jitter, size_jitter))))
+    module = path.rsplit(".", 1)[0].replace("/", ".")
+    parts = [f'"""{module}"""\nimport os\nfrom typing import Any, Dict\n\n']
+    size = len(parts[0])
+    class_index = 0
+    while size < target:
+        block = [f"\nclass Generated{class_index}:\n"]
+        for method in range(4):
+            block.append(
+                f"    def method_{method}(self, value: int) -> Dict[str, Any]:\n"
+                f"        key = \"{module}.{class_index}.{method}\"\n"
+                f"        return {{key: value * {rng.randint(1, 997)}, \"env\": os.getenv(key)}}\n\n"
+            )
+        text = "".join(block)
+        parts.append(text)
+        size += len(text)
+        class_index += 1
+    return "".join(parts)
+
+
+def write_repo(shape: RepoShape, root: str) -> int:
+    """
+    Writes the shape below root/<shape.name> and returns the bytes written.
+    """
+    base = os.path.join(root, shape.name)
+    os.makedirs(base, exist_ok=True)
+    written = 0
+    for path, is_directory, _ in iter_entries(shape):
+        if is_directory:
+            os.makedirs(os.path.join(base, path), exist_ok=True)
+    for path, content in iter_files(shape):
+        with open(os.path.join(base, path), "w", encoding="utf-8") as f:
+            written += f.write(content)
+    return written
+
+
+def render_summary(shape: RepoShape) -> str:
+    return (
+        f"Directory: {shape.name}\n"
+        f"Files analyzed: {shape.file_count}\n"
+    )
+
+
+def render_tree_text(shape: RepoShape) -> str:
+    """
+    The gitingest directory tree: "└── name/" for the root, then "├── " / "└── "
+    markers with "│   " or four-space continuation prefixes per level.
+    """
+    entries = list(iter_entries(shape))
+    lines = ["Directory structure:", f"└── {shape.name}/"]
+    # An entry is the last of its directory when no later entry shares its depth
+    # before the walk climbs above it.
+    last = [False] * len(entries)
+    next_depth_seen = {}
+    for i in range(len(entries) - 1, -1, -1):
+        depth = entries[i][2]
+        last[i] = next_depth_seen.get(depth) is None
+        next_depth_seen[depth] = i
+        for deeper in [d for d in next_depth_seen if d > depth]:
+            del next_depth_seen[deeper]
+    open_levels: List[bool] = []
+    for (path, is_directory, depth), is_last in zip(entries, last):
+        del open_levels[depth - 1:]
+        prefix = "".join("│   " if still_open else "    " for still_open in open_levels)
+        name = path.rsplit("/", 1)[-1] + ("/" if is_directory else "")
+        lines.append(f"    {prefix}{'└── ' if is_last else '├── '}{name}")
+        open_levels.append(not is_last)
+    return "\n".join(lines) + "\n"
+
+
+def iter_code_dump(shape: RepoShape) -> Iterator[str]:
+    """
+    Yields the gitingest code dump file by file, in the delimiter/header/delimiter framing.
+    """
+    for path, content in iter_files(shape):
+        yield f"{BLOCK_DELIMITER}\nFILE: {path}\n{BLOCK_DELIMITER}\n{content}\n\n"
+
+
+def write_code_dump(shape: RepoShape, path: str) -> int:
+    """
+    Writes the gitingest code dump to path and returns its size in bytes.
+    """
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk in iter_code_dump(shape):
+            written += f.write(chunk)
+    return written